@@ -0,0 +1,17 @@
+import os
+import sqlite3
+
+
+# ===============================
+# Banco local (pontos.db)
+# ===============================
+CAMINHO_BANCO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pontos.db")
+
+
+def conectar(caminho=CAMINHO_BANCO):
+    """Abre uma conexão com o pontos.db (uma por operação; sqlite3 não compartilha entre threads)"""
+    con = sqlite3.connect(caminho, timeout=30)
+    # WAL permite leituras de outras sessões enquanto uma delas grava
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
@@ -0,0 +1,78 @@
+"""Benchmark dos links de compartilhamento: JSON + zlib (v1) x formato compacto.
+
+Abaixo de codec.MINIMO_PONTOS_COMPACTO o formato compacto cai para o v1; essas
+linhas saem marcadas com "(v1)".
+
+Uso: python benchmarks/bench_codec.py [pontos ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from codec import PREFIXO_COMPACTO, decode_data, encode_data, encode_data_compacto
+
+
+def gerar_pontos(quantidade, semente=42):
+    """Mapa sintético no formato de st.session_state.pontos.
+
+    Como num extrato real, a maioria são torres importadas em ordem cronológica,
+    repetindo poucas ERBs; o restante são pontos e círculos cadastrados à mão.
+    """
+    rnd = random.Random(semente)
+    erbs = [
+        (round(-3.73 + rnd.uniform(-0.2, 0.2), 6), round(-38.52 + rnd.uniform(-0.2, 0.2), 6), az)
+        for _ in range(max(1, quantidade // 50))
+        for az in (0, 120, 240)
+    ]
+    segundos = 0
+    pontos = []
+    for i in range(quantidade):
+        sorteio = rnd.random()
+        if sorteio < 0.9:
+            lat, lng, azimute = rnd.choice(erbs)
+            segundos += rnd.randint(30, 900)
+            dia, resto = divmod(segundos, 86400)
+            pontos.append({
+                "lat": lat, "lng": lng,
+                "nome": f"{dia % 28 + 1:02d}/01/2024 - {resto // 3600:02d}:{resto % 3600 // 60:02d}:{resto % 60:02d}",
+                "visivel": True, "margem": 120, "azimute": azimute,
+                "distancia": 1500, "tipo": "torre",
+            })
+        else:
+            lat = round(-3.73 + rnd.uniform(-0.2, 0.2), 6)
+            lng = round(-38.52 + rnd.uniform(-0.2, 0.2), 6)
+            if sorteio < 0.95:
+                pontos.append({"lat": lat, "lng": lng, "nome": f"Ponto {i}", "visivel": True, "tipo": "ponto"})
+            else:
+                pontos.append({"lat": lat, "lng": lng, "nome": f"Raio {i}", "raio": "500",
+                               "visivel": rnd.random() < 0.5, "tipo": "circulo"})
+    return pontos
+
+def cronometrar(funcao, argumento, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao(argumento)
+    return resultado, (time.perf_counter() - inicio) / repeticoes * 1000
+
+def main(tamanhos):
+    print(f"{'pontos':>7} {'v1 bytes':>10} {'comp bytes':>10} {'razão':>6} "
+          f"{'v1 enc ms':>10} {'comp enc ms':>11} {'v1 dec ms':>10} {'comp dec ms':>11}")
+    for quantidade in tamanhos:
+        data = {"pontos": gerar_pontos(quantidade)}
+        repeticoes = max(1, 2000 // max(quantidade, 1))
+
+        v1, t_enc_v1 = cronometrar(encode_data, data, repeticoes)
+        compacto, t_enc_compacto = cronometrar(encode_data_compacto, data, repeticoes)
+        _, t_dec_v1 = cronometrar(decode_data, v1, repeticoes)
+        decodificado, t_dec_compacto = cronometrar(decode_data, compacto, repeticoes)
+        assert len(decodificado["pontos"]) == quantidade
+
+        marca = "" if compacto.startswith(PREFIXO_COMPACTO) else "  (v1)"
+        print(f"{quantidade:>7} {len(v1):>10,} {len(compacto):>10,} {len(v1) / len(compacto):>5.1f}x "
+              f"{t_enc_v1:>10.2f} {t_enc_compacto:>11.2f} {t_dec_v1:>10.2f} {t_dec_compacto:>11.2f}{marca}")
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 1_000, 10_000])
@@ -0,0 +1,76 @@
+"""Benchmark do importador VIVO: laço linha a linha x extração vetorizada.
+
+Uso: python benchmarks/bench_extrato.py [linhas ...]
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extrato import extrair_coordenadas_vivo, processar_extrato_vivo
+
+
+def gerar_gms(valor):
+    """Formata um valor decimal no padrão GMS da VIVO"""
+    sinal = '-' if valor < 0 else ''
+    valor = abs(valor)
+    graus = int(valor)
+    minutos = int((valor - graus) * 60)
+    segundos = (valor - graus - minutos / 60) * 3600
+    return f"{sinal}{graus:02d}-{minutos:02d}-{segundos:05.2f}"
+
+def gerar_colunas(linhas, semente=42):
+    """Gera colunas sintéticas de endereço, data e hora de um extrato VIVO"""
+    rnd = random.Random(semente)
+    enderecos, datas, horas = [], [], []
+    for _ in range(linhas):
+        lat = -3.73 + rnd.uniform(-0.2, 0.2)
+        lng = -38.52 + rnd.uniform(-0.2, 0.2)
+        enderecos.append(
+            f"RUA EXEMPLO, {rnd.randint(1, 999)} - FORTALEZA/CE "
+            f"LATITUDE {gerar_gms(lat)} LONGITUDE {gerar_gms(lng)} AZIMUTE {rnd.choice([0, 120, 240])}"
+        )
+        datas.append(f"{rnd.randint(1, 28):02d}/01/2024")
+        horas.append(f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}")
+    return pd.Series(enderecos), pd.Series(datas), pd.Series(horas)
+
+def processar_por_linha(endereco, data, hora):
+    """Implementação anterior: regex e conversão GMS linha a linha"""
+    torres = []
+    for texto, v_data, v_hora in zip(endereco, data, hora):
+        if pd.isna(texto):
+            continue
+        lat, lon, az = extrair_coordenadas_vivo(str(texto))
+        if lat is not None and lon is not None and az is not None:
+            torres.append({
+                "lat": lat,
+                "lng": lon,
+                "nome": v_data + ' - ' + v_hora,
+                "visivel": True,
+                "margem": 120,
+                "azimute": int(az),
+                "distancia": 1500,
+                "tipo": "torre"
+            })
+    return torres
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+def main(tamanhos):
+    print(f"{'linhas':>8} {'por linha (l/s)':>16} {'vetorizado (l/s)':>17} {'ganho':>7}")
+    for linhas in tamanhos:
+        colunas = gerar_colunas(linhas)
+        antigo, t_antigo = cronometrar(processar_por_linha, *colunas)
+        novo, t_novo = cronometrar(processar_extrato_vivo, *colunas)
+        assert antigo == novo, "Resultados divergentes entre as implementações"
+        print(f"{linhas:>8} {linhas / t_antigo:>16,.0f} {linhas / t_novo:>17,.0f} {t_antigo / t_novo:>6.1f}x")
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,342 @@
+"""Suíte de benchmarks do mapa: importação, estado, geometria do mapa e execução do script.
+
+Gera extratos VIVO (XLSX) e listas de pontos sintéticos em várias escalas e,
+para cada cenário, mede o tempo (mediana de várias repetições), a vazão, a memória de pico
+(tracemalloc) e o tamanho do que é produzido (planilha, link, payload do mapa).
+Os resultados são comparados com benchmarks/baseline.json: medições mais
+lentas ou mais pesadas que a tolerância são marcadas como regressão e o
+processo sai com código 1. O tempo tem tolerância maior que memória e
+tamanho, que quase não variam entre execuções.
+
+Uso:
+    python benchmarks/suite.py                          # 10, 1k, 10k e 100k
+    python benchmarks/suite.py --tamanhos 10 1000 --cenarios codec mapa
+    python benchmarks/suite.py --salvar-baseline        # grava a nova referência
+    python benchmarks/suite.py --saida resultados.json  # resultados em JSON
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from io import BytesIO
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(DIRETORIO)
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, DIRETORIO)
+
+from openpyxl import Workbook
+
+from bench_codec import gerar_pontos
+from bench_extrato import gerar_colunas
+from codec import PREFIXO_COMPACTO, decode_data, encode_data, encode_data_compacto
+from estado import garantir_ids
+from eventos import agregar_torres
+from extrato import (
+    CELULA_OPERADORA,
+    COLUNA_DATA,
+    COLUNA_ENDERECO,
+    COLUNA_HORA,
+    LINHA_INICIO_DADOS,
+    extrair_coordenadas_vivo,
+    extrair_coordenadas_vivo_vetorizado,
+    listar_abas,
+)
+from geometria import CacheGeometria, preparar_geometria
+from importacao import _processar_aba
+from tabela_pontos import normalizar_pontos
+
+
+# ===============================
+# Configurações
+# ===============================
+TAMANHOS_PADRAO = [10, 1_000, 10_000, 100_000]
+CAMINHO_BASELINE = os.path.join(DIRETORIO, "baseline.json")
+SCRIPT_MAPA = os.path.join(RAIZ, "7_Mapa.py")
+
+# Cada medição repete até somar este tempo (s) ou REPETICOES_MAXIMAS vezes,
+# e no mínimo REPETICOES_MINIMAS vezes (a mediana precisa de algumas amostras)
+ORCAMENTO_SEGUNDOS = 1.0
+REPETICOES_MINIMAS = 3
+REPETICOES_MAXIMAS = 7
+
+# Regressão: pior que a baseline por mais que a tolerância relativa E mais que
+# o limiar absoluto (abaixo dele a diferença é ruído de medição). O tempo
+# oscila com a carga da máquina; memória e bytes são quase determinísticos
+TOLERANCIA_TEMPO = 0.5
+TOLERANCIA = 0.3
+LIMIAR_MS = 5.0
+LIMIAR_MIB = 1.0
+
+NOME_ABA = "Chamadas"
+# Setores distintos no extrato "aba_setores_repetidos" (num extrato real, poucas
+# torres se repetem ao longo de milhares de ligações)
+SETORES_REPETIDOS = 50
+COLUNAS_PLANILHA = max(COLUNA_DATA, COLUNA_HORA, COLUNA_ENDERECO)
+
+
+# ===============================
+# Dados sintéticos
+# ===============================
+def gerar_xlsx(linhas, setores=None) -> bytes:
+    """Extrato VIVO sintético: cabeçalho com a operadora e as linhas a partir de LINHA_INICIO_DADOS.
+
+    Sem setores, cada linha tem um endereço (setor) próprio; com setores, as
+    linhas se revezam entre esse número de endereços.
+    """
+    endereco, data, hora = gerar_colunas(linhas)
+    if setores:
+        enderecos = gerar_colunas(setores)[0].tolist()
+        endereco = [enderecos[i % setores] for i in range(linhas)]
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet(NOME_ABA)
+    for numero in range(1, LINHA_INICIO_DADOS):
+        linha = [None] * COLUNAS_PLANILHA
+        if numero == CELULA_OPERADORA[0]:
+            linha[CELULA_OPERADORA[1] - 1] = "TELEFONICA VIVO"
+        planilha.append(linha)
+    for texto, v_data, v_hora in zip(endereco, data, hora):
+        linha = [None] * COLUNAS_PLANILHA
+        linha[COLUNA_DATA - 1] = v_data
+        linha[COLUNA_HORA - 1] = v_hora
+        linha[COLUNA_ENDERECO - 1] = texto
+        planilha.append(linha)
+    buffer = BytesIO()
+    livro.save(buffer)
+    return buffer.getvalue()
+
+
+# ===============================
+# Cenários
+# ===============================
+# nome -> função(tamanho) que retorna {medida: (função sem argumentos, bytes produzidos ou None)}
+CENARIOS = {}
+
+
+def cenario(nome):
+    def registrar(funcao):
+        CENARIOS[nome] = funcao
+        return funcao
+    return registrar
+
+
+@cenario("extracao")
+def cenario_extracao(tamanho):
+    """Coordenadas do endereço VIVO: regex + GMS linha a linha x colunas vetorizadas"""
+    endereco, _, _ = gerar_colunas(tamanho)
+    textos = endereco.astype(str).tolist()
+
+    def por_linha():
+        return [extrair_coordenadas_vivo(texto) for texto in textos]
+
+    return {
+        "por_linha": (por_linha, None),
+        "vetorizada": (lambda: extrair_coordenadas_vivo_vetorizado(endereco), None),
+    }
+
+
+@cenario("importacao")
+def cenario_importacao(tamanho):
+    """Importação de uma aba: abas, detecção, leitura em blocos e agregação por setor"""
+    def importar(dados):
+        abas = listar_abas(BytesIO(dados))
+        operadora, torres, _ = _processar_aba(dados, abas[0])
+        assert operadora == "VIVO"
+        return torres
+
+    dados = gerar_xlsx(tamanho)
+    repetidos = gerar_xlsx(tamanho, setores=SETORES_REPETIDOS)
+    return {
+        "aba": (lambda: importar(dados), len(dados)),
+        "aba_setores_repetidos": (lambda: importar(repetidos), len(repetidos)),
+    }
+
+
+@cenario("codec")
+def cenario_codec(tamanho):
+    """Estado do mapa no link: JSON + zlib (v1) e formato compacto, ida e volta.
+
+    Mapas abaixo de codec.MINIMO_PONTOS_COMPACTO saem em v1 mesmo pelo
+    encode_data_compacto; nesses tamanhos as medições do compacto repetiriam
+    as do v1 e ficam de fora.
+    """
+    data = {"pontos": gerar_pontos(tamanho)}
+    v1, compacto = encode_data(data), encode_data_compacto(data)
+    agregado = {"pontos": agregar_torres(data["pontos"])}
+    compacto_agregado = encode_data_compacto(agregado)
+    medidas = {
+        "encode_v1": (lambda: encode_data(data), len(v1)),
+        "decode_v1": (lambda: decode_data(v1), None),
+    }
+    if compacto.startswith(PREFIXO_COMPACTO):
+        medidas["encode_compacto"] = (lambda: encode_data_compacto(data), len(compacto))
+        medidas["decode_compacto"] = (lambda: decode_data(compacto), None)
+    if compacto_agregado.startswith(PREFIXO_COMPACTO):
+        medidas["encode_compacto_agregado"] = (lambda: encode_data_compacto(agregado), len(compacto_agregado))
+    return medidas
+
+
+@cenario("mapa")
+def cenario_mapa(tamanho):
+    """Payload do componente do mapa com todos os pontos: contornos (cache frio e quente) e JSON.
+
+    Cada torre tem um setor próprio, como no mapa depois da agregação: os
+    contornos não se repetem dentro da chamada e só o cache evita refazê-los.
+    """
+    pontos = garantir_ids([
+        dict(ponto, lat=round(ponto["lat"] + i * 1e-6, 6)) if ponto["tipo"] == "torre" else ponto
+        for i, ponto in enumerate(gerar_pontos(tamanho))
+    ])
+    cache_quente = CacheGeometria()
+    preparados = preparar_geometria(pontos, cache=cache_quente)
+    payload = json.dumps(preparados)
+
+    return {
+        "contornos_cache_frio": (lambda: preparar_geometria(pontos, cache=CacheGeometria()), None),
+        "contornos_cache_quente": (lambda: preparar_geometria(pontos, cache=cache_quente), None),
+        "json": (lambda: json.dumps(preparados), len(payload)),
+    }
+
+
+@cenario("script")
+def cenario_script(tamanho):
+    """Execução completa do 7_Mapa.py pelo AppTest, com o mapa já na sessão"""
+    from streamlit.testing.v1 import AppTest
+
+    # Já no formato da sessão; a conversão na entrada não entra na medição
+    pontos = normalizar_pontos(gerar_pontos(tamanho))
+
+    def nova_sessao():
+        app = AppTest.from_file(SCRIPT_MAPA, default_timeout=600)
+        app.session_state.pontos = list(pontos)
+        return app
+
+    def primeira_execucao():
+        app = nova_sessao().run()
+        assert not app.exception, app.exception
+        return app
+
+    app_rerun = primeira_execucao()
+
+    def rerun():
+        app_rerun.run()
+        assert not app_rerun.exception, app_rerun.exception
+
+    return {"primeira_execucao": (primeira_execucao, None), "rerun": (rerun, None)}
+
+
+# ===============================
+# Medição
+# ===============================
+def medir(funcao):
+    """(mediana do tempo em ms, pico de memória em MiB); o pico é medido numa execução à parte.
+
+    A mediana não se deixa levar por uma repetição isolada muito rápida ou
+    muito lenta, como o melhor tempo e a média.
+    """
+    gc.collect()
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tempos = []
+    while len(tempos) < REPETICOES_MINIMAS or (len(tempos) < REPETICOES_MAXIMAS and sum(tempos) < ORCAMENTO_SEGUNDOS):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000, pico / 2**20
+
+
+def comparar(resultado, referencia, tolerancia, tolerancia_tempo=TOLERANCIA_TEMPO):
+    """Lista dos problemas do resultado frente à baseline (vazia se não houver regressão)"""
+    if referencia is None:
+        return []
+    problemas = []
+    ms, ms_base = resultado["ms"], referencia["ms"]
+    if ms > ms_base * (1 + tolerancia_tempo) and ms - ms_base > LIMIAR_MS:
+        problemas.append(f"tempo {ms / ms_base:.2f}x")
+    mib, mib_base = resultado["pico_mib"], referencia["pico_mib"]
+    if mib > mib_base * (1 + tolerancia) and mib - mib_base > LIMIAR_MIB:
+        problemas.append(f"memória {mib / mib_base:.2f}x")
+    if resultado.get("bytes") and referencia.get("bytes") and resultado["bytes"] > referencia["bytes"] * (1 + tolerancia):
+        problemas.append(f"tamanho {resultado['bytes'] / referencia['bytes']:.2f}x")
+    return problemas
+
+
+def carregar_baseline(caminho):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo).get("resultados", {})
+
+
+def salvar_resultados(caminho, resultados):
+    conteudo = {
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "resultados": resultados,
+    }
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(conteudo, arquivo, indent=2, ensure_ascii=False, sort_keys=True)
+        arquivo.write("\n")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do mapa com comparação contra a baseline")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="memória e bytes")
+    parser.add_argument("--tolerancia-tempo", type=float, default=TOLERANCIA_TEMPO)
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados como nova baseline")
+    parser.add_argument("--saida", help="arquivo JSON para os resultados desta execução")
+    args = parser.parse_args(argumentos)
+
+    baseline = carregar_baseline(args.baseline)
+    resultados = {}
+    regressoes = 0
+
+    print(f"{'medição':<34} {'tamanho':>8} {'ms':>10} {'itens/s':>12} {'pico MiB':>9} {'bytes':>12}  baseline")
+    for nome in args.cenarios:
+        for tamanho in args.tamanhos:
+            medidas = CENARIOS[nome](tamanho)
+            for medida, (funcao, tamanho_bytes) in medidas.items():
+                ms, pico = medir(funcao)
+                chave = f"{nome}/{medida}/{tamanho}"
+                resultado = {"ms": round(ms, 3), "pico_mib": round(pico, 3), "itens_por_s": round(tamanho / ms * 1000, 1)}
+                if tamanho_bytes is not None:
+                    resultado["bytes"] = tamanho_bytes
+                resultados[chave] = resultado
+
+                referencia = baseline.get(chave)
+                problemas = comparar(resultado, referencia, args.tolerancia, args.tolerancia_tempo)
+                if problemas:
+                    regressoes += 1
+                    situacao = "REGRESSÃO: " + ", ".join(problemas)
+                elif referencia is None:
+                    situacao = "-"
+                else:
+                    situacao = f"ok ({ms / referencia['ms']:.2f}x)"
+                print(f"{nome + '/' + medida:<34} {tamanho:>8,} {ms:>10.2f} {resultado['itens_por_s']:>12,.0f} "
+                      f"{pico:>9.1f} {tamanho_bytes or '':>12}  {situacao}")
+
+    if args.saida:
+        salvar_resultados(args.saida, resultados)
+    if args.salvar_baseline:
+        # Mantém as medições da baseline que não foram refeitas nesta execução
+        salvar_resultados(args.baseline, {**baseline, **resultados})
+        print(f"Baseline gravada em {args.baseline}")
+    elif regressoes:
+        print(f"{regressoes} medição(ões) com regressão frente à baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+from contextlib import closing
+
+from banco import CAMINHO_BANCO, conectar
+
+
+# ===============================
+# Configurações
+# ===============================
+# Limites aproximados, medidos pelo tamanho do JSON de cada entrada
+TAMANHO_MAXIMO_MEMORIA = 256 * 1024 * 1024
+TAMANHO_MAXIMO_DISCO = 1024 * 1024 * 1024
+
+
+# ===============================
+# Cache de resultados de extratos
+# ===============================
+class CacheExtratos:
+    """Cache em duas camadas (LRU em memória + tabela no pontos.db) para extratos processados.
+
+    Os valores precisam ser serializáveis em JSON. A camada em memória guarda os
+    objetos já decodificados; quem for alterá-los deve trabalhar sobre uma cópia.
+    """
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO, tamanho_memoria=TAMANHO_MAXIMO_MEMORIA,
+                 tamanho_disco=TAMANHO_MAXIMO_DISCO):
+        self.caminho_banco = caminho_banco
+        self.tamanho_memoria = tamanho_memoria
+        self.tamanho_disco = tamanho_disco
+        self._memoria = OrderedDict()  # chave -> (valor, tamanho)
+        self._ocupado = 0
+        self._trava = threading.Lock()
+        self._tabela_criada = False
+
+    def _conectar(self):
+        con = conectar(self.caminho_banco)
+        if not self._tabela_criada:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS cache_extratos (
+                    chave TEXT PRIMARY KEY,
+                    tamanho INTEGER NOT NULL,
+                    acessado_em REAL NOT NULL,
+                    dados BLOB NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_cache_extratos_acesso ON cache_extratos (acessado_em)")
+            con.commit()
+            self._tabela_criada = True
+        return con
+
+    def _guardar_memoria(self, chave, valor, tamanho):
+        with self._trava:
+            if chave in self._memoria:
+                self._ocupado -= self._memoria.pop(chave)[1]
+            if tamanho > self.tamanho_memoria:
+                return
+            self._memoria[chave] = (valor, tamanho)
+            self._ocupado += tamanho
+            # Remove as entradas menos usadas até caber no limite
+            while self._ocupado > self.tamanho_memoria:
+                _, (_, removido) = self._memoria.popitem(last=False)
+                self._ocupado -= removido
+
+    def obter(self, chave):
+        """Retorna o valor guardado ou None"""
+        with self._trava:
+            entrada = self._memoria.get(chave)
+            if entrada is not None:
+                self._memoria.move_to_end(chave)
+                return entrada[0]
+
+        try:
+            with closing(self._conectar()) as con:
+                linha = con.execute(
+                    "SELECT dados FROM cache_extratos WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is None:
+                    return None
+                con.execute(
+                    "UPDATE cache_extratos SET acessado_em = ? WHERE chave = ?", (time.time(), chave)
+                )
+                con.commit()
+        except sqlite3.Error:
+            return None
+
+        json_str = zlib.decompress(linha[0]).decode()
+        valor = json.loads(json_str)
+        self._guardar_memoria(chave, valor, len(json_str))
+        return valor
+
+    def guardar(self, chave, valor):
+        """Guarda o valor nas duas camadas"""
+        json_str = json.dumps(valor)
+        self._guardar_memoria(chave, valor, len(json_str))
+
+        try:
+            with closing(self._conectar()) as con:
+                con.execute(
+                    "INSERT OR REPLACE INTO cache_extratos (chave, tamanho, acessado_em, dados) VALUES (?, ?, ?, ?)",
+                    (chave, len(json_str), time.time(), zlib.compress(json_str.encode(), level=6)),
+                )
+                # Descarta as entradas acessadas há mais tempo além do limite em disco
+                con.execute("""
+                    DELETE FROM cache_extratos WHERE chave IN (
+                        SELECT chave FROM (
+                            SELECT chave, SUM(tamanho) OVER (ORDER BY acessado_em DESC) AS acumulado
+                            FROM cache_extratos
+                        ) WHERE acumulado > ?
+                    )
+                """, (self.tamanho_disco,))
+                con.commit()
+        except sqlite3.Error:
+            # Sem disco o cache continua funcionando só em memória
+            pass
+
+
+# Instância única, compartilhada pelas sessões do servidor
+cache_extratos = CacheExtratos()
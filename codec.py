@@ -0,0 +1,454 @@
+import base64
+import hashlib
+import json
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from collections import OrderedDict
+
+from eventos import campos_agregados
+
+
+# ===============================
+# Formato compacto (v2)
+# ===============================
+# Prefixo do formato compacto. O formato original (JSON + zlib + base64) nunca
+# contém ".", então o prefixo basta para distinguir os formatos em decode_data.
+PREFIXO_COMPACTO = "v2."
+
+# Abaixo disso (pontos + eventos das torres agregadas) o custo fixo das chamadas
+# NumPy do formato colunar supera o do JSON (~0,3 ms) e o link só fica ~2x
+# menor: mapas pequenos saem no formato original
+MINIMO_PONTOS_COMPACTO = 500
+
+# Nomes convertidos por vez: limita as matrizes de caracteres em memória
+TAMANHO_BLOCO_NOMES = 2_048
+
+# Coordenadas em ponto fixo: 6 casas decimais (~0,1 m), como na importação
+ESCALA_COORDENADA = 1_000_000
+
+TIPOS = ["ponto", "torre", "circulo"]
+TIPO_OUTRO = 3
+
+# Bits do byte de flags de cada ponto
+MASCARA_TIPO = 0b11
+FLAG_VISIVEL = 1 << 2
+FLAG_PARAMETROS = 1 << 3  # parâmetros numéricos inteiros no bloco de parâmetros
+FLAG_EXTRAS = 1 << 4      # demais campos como JSON na tabela de strings
+FLAG_NOME_DATA = 1 << 5   # nome "dd/mm/aaaa - hh:mm:ss" gravado como segundos
+FLAG_EVENTOS = 1 << 6     # torre agregada: eventos como segundos, nome e resumo derivados
+
+# Parâmetros numéricos de cada tipo, na ordem em que são gravados
+PARAMETROS = {
+    "torre": ("margem", "azimute", "distancia"),
+    "circulo": ("raio",),
+}
+
+# Campos que não viajam no link (o id é regerado ao carregar)
+CAMPOS_DESCARTADOS = {"id"}
+CAMPOS_FIXOS = {"lat", "lng", "nome", "visivel", "tipo"}
+
+# Campos cobertos pelos blocos fixos quando os parâmetros são inteiros
+_CAMPOS_CODIFICADOS = {
+    tipo: CAMPOS_FIXOS | CAMPOS_DESCARTADOS | set(campos) for tipo, campos in PARAMETROS.items()
+}
+
+# Campos de uma torre agregada (ver eventos.agregar_torres)
+CAMPOS_EVENTOS = {"eventos", "contagem", "primeiro", "ultimo", "instantes"}
+
+# Nome gerado na importação de extratos (data + hora do evento). Cada letra do
+# molde é um dígito de um campo (dia, mês, ano, hora, minuto, segundo) e os
+# demais caracteres são fixos; só dígitos ASCII, que é o que a decodificação escreve.
+MOLDE_NOME_DATA = "DD/MM/AAAA - hh:mm:ss"
+_LETRAS_CAMPOS = "DMAhms"
+_POSICOES_DIGITOS = [i for i, c in enumerate(MOLDE_NOME_DATA) if c in _LETRAS_CAMPOS]
+_POSICOES_FIXAS = [i for i, c in enumerate(MOLDE_NOME_DATA) if c not in _LETRAS_CAMPOS]
+_CARACTERES_FIXOS = np.array([ord(MOLDE_NOME_DATA[i]) for i in _POSICOES_FIXAS], dtype=np.uint32)
+# Campo de cada dígito e seu peso (10 ** dígitos do mesmo campo à direita)
+_CAMPO_DIGITO = [_LETRAS_CAMPOS.index(MOLDE_NOME_DATA[i]) for i in _POSICOES_DIGITOS]
+_PESO_DIGITO = np.array([10 ** MOLDE_NOME_DATA[i + 1:].count(MOLDE_NOME_DATA[i]) for i in _POSICOES_DIGITOS])
+_DIGITOS_PARA_CAMPOS = np.eye(len(_LETRAS_CAMPOS), dtype=np.int64)[_CAMPO_DIGITO] * _PESO_DIGITO[:, None]
+# 01/01/2000, em dias desde 01/01/1970
+_DIA_EPOCA = int(np.datetime64("2000-01-01", "D").astype(np.int64))
+_SEGUNDOS_EPOCA = _DIA_EPOCA * 86400  # de 01/01/2000 para segundos desde 1970 (campo "instantes")
+
+_CODIGOS_TIPOS = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+
+# pontos, coordenadas distintas, parâmetros e strings da tabela de strings
+_CABECALHO = struct.Struct("<IIII")
+
+
+def _como_inteiro(valor):
+    """Inteiro equivalente ao valor (int, float ou texto), ou None se não for exato"""
+    if type(valor) is int:
+        return valor if abs(valor) < 2**31 else None
+    if isinstance(valor, bool) or valor is None:
+        return None
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    if not numero.is_integer() or abs(numero) >= 2**31:
+        return None
+    return int(numero)
+
+
+def _nomes_como_segundos(nomes) -> np.ndarray:
+    """Segundos desde 01/01/2000 de cada nome que seja um carimbo de data/hora reconstruível; -1 nos demais"""
+    segundos = np.full(len(nomes), -1, dtype=np.int64)
+    tamanho = len(MOLDE_NOME_DATA)
+    candidatos = [i for i, nome in enumerate(nomes) if len(nome) == tamanho]
+    for inicio in range(0, len(candidatos), TAMANHO_BLOCO_NOMES):
+        bloco = candidatos[inicio:inicio + TAMANHO_BLOCO_NOMES]
+        segundos[bloco] = _carimbos_como_segundos([nomes[i] for i in bloco])
+    return segundos
+
+
+def _carimbos_como_segundos(nomes) -> np.ndarray:
+    """_nomes_como_segundos para nomes que já têm o tamanho do molde"""
+    tamanho = len(MOLDE_NOME_DATA)
+    codigos = np.array(nomes, dtype=f"U{tamanho}").view(np.uint32).reshape(-1, tamanho)
+    digitos = codigos[:, _POSICOES_DIGITOS].astype(np.int64) - ord("0")
+    dia, mes, ano, hora, minuto, segundo = (digitos @ _DIGITOS_PARA_CAMPOS).T
+
+    # Anos e meses fora da faixa são cortados só para o cálculo; a validação os descarta
+    inicio_mes = ((np.clip(ano, 2000, 2100) - 1970) * 12 + np.clip(mes, 1, 12) - 1).astype("M8[M]")
+    dias_no_mes = ((inicio_mes + 1).astype("M8[D]") - inicio_mes.astype("M8[D]")).astype(np.int64)
+    valores = (
+        (inicio_mes.astype("M8[D]").astype(np.int64) - _DIA_EPOCA + dia - 1) * 86400
+        + hora * 3600 + minuto * 60 + segundo
+    )
+    validos = (
+        ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+        & (codigos[:, _POSICOES_FIXAS] == _CARACTERES_FIXOS).all(axis=1)
+        & (ano >= 2000) & (mes >= 1) & (mes <= 12) & (dia >= 1) & (dia <= dias_no_mes)
+        & (hora <= 23) & (minuto <= 59) & (segundo <= 59)
+        & (valores < 2**31)
+    )
+    return np.where(validos, valores, -1)
+
+
+def _segundos_como_nomes(segundos) -> list:
+    """Inverso de _nomes_como_segundos"""
+    segundos = np.asarray(segundos, dtype=np.int64)
+    if not len(segundos):
+        return []
+    dias = (segundos // 86400 + _DIA_EPOCA).astype("M8[D]")
+    meses = dias.astype("M8[M]")
+    campos = np.stack([
+        (dias - meses).astype(np.int64) + 1,
+        meses.astype(np.int64) % 12 + 1,
+        meses.astype("M8[Y]").astype(np.int64) + 1970,
+        segundos % 86400 // 3600,
+        segundos % 3600 // 60,
+        segundos % 60,
+    ], axis=1)
+    codigos = np.empty((len(segundos), len(MOLDE_NOME_DATA)), dtype=np.uint32)
+    codigos[:, _POSICOES_FIXAS] = _CARACTERES_FIXOS
+    codigos[:, _POSICOES_DIGITOS] = campos[:, _CAMPO_DIGITO] // _PESO_DIGITO % 10 + ord("0")
+    return codigos.view(f"U{len(MOLDE_NOME_DATA)}").ravel().tolist()
+
+
+def _eventos_como_segundos(pontos, listas) -> list:
+    """Segundos dos eventos de cada torre agregada reconstruível a partir deles (None nos demais pontos).
+
+    listas: o campo "eventos" de cada ponto.
+    """
+    candidatas = [
+        i for i, eventos in enumerate(listas)
+        if isinstance(eventos, list) and eventos and all(isinstance(e, str) for e in eventos)
+    ]
+    resultado = [None] * len(pontos)
+    if not candidatas:
+        return resultado
+    # Todos os eventos de todas as torres em uma única conversão
+    segundos = _nomes_como_segundos([evento for i in candidatas for evento in listas[i]]).tolist()
+    inicio = 0
+    for i in candidatas:
+        eventos = listas[i]
+        trecho = segundos[inicio:inicio + len(eventos)]
+        inicio += len(eventos)
+        if min(trecho) < 0:
+            continue
+        if any(pontos[i].get(campo) != valor for campo, valor in campos_agregados(eventos).items()):
+            continue
+        # Os instantes, quando a torre os tem, são refeitos dos mesmos segundos ao decodificar
+        if pontos[i].get("instantes", None) not in (None, [s + _SEGUNDOS_EPOCA for s in trecho]):
+            continue
+        resultado[i] = trecho
+    return resultado
+
+
+def _planos_de_bytes(valores) -> bytes:
+    """Grava inteiros de 32 bits byte a byte (todos os 1os bytes, depois os 2os...).
+
+    Valores pequenos deixam os planos altos cheios de zeros, que o zlib comprime quase a nada.
+    """
+    return np.ascontiguousarray(np.asarray(valores, dtype="<i4").view(np.uint8).reshape(-1, 4).T).tobytes()
+
+
+def _delta(valores) -> np.ndarray:
+    valores = np.asarray(valores, dtype=np.int64)
+    deltas = valores.copy()
+    deltas[1:] -= valores[:-1]
+    return deltas
+
+
+def _b64_sem_padding(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+
+def _b64_decode(texto: str) -> bytes:
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def encode_data_compacto(data: dict) -> str:
+    """Codifica os pontos no formato binário colunar v2 (bem menor que o JSON).
+
+    Mapas com menos de MINIMO_PONTOS_COMPACTO pontos saem no formato original,
+    que para eles é mais rápido; decode_data lê os dois.
+    """
+    pontos = data.get("pontos", [])
+    n = len(pontos)
+    eventos = [ponto.get("eventos") for ponto in pontos]
+    if n + sum(len(lista) for lista in eventos if isinstance(lista, list)) < MINIMO_PONTOS_COMPACTO:
+        # Os pontos da sessão são tabela_pontos.Ponto, que o json não serializa direto
+        return encode_data(dict(data, pontos=[
+            {k: v for k, v in ponto.items() if k not in CAMPOS_DESCARTADOS} for ponto in pontos
+        ]))
+
+    tipos = [ponto.get("tipo", "ponto") for ponto in pontos]
+    flags = np.array([_CODIGOS_TIPOS.get(tipo, TIPO_OUTRO) for tipo in tipos], dtype=np.uint8)
+    flags[np.array([bool(ponto.get("visivel", True)) for ponto in pontos], dtype=bool)] |= FLAG_VISIVEL
+
+    # Coordenadas distintas em ponto fixo, na ordem da primeira aparição; ERBs se repetem muito
+    fixas = np.empty((n, 2), dtype=np.int64)
+    fixas[:, 0] = np.rint(np.array([ponto["lat"] for ponto in pontos], dtype=float) * ESCALA_COORDENADA)
+    fixas[:, 1] = np.rint(np.array([ponto["lng"] for ponto in pontos], dtype=float) * ESCALA_COORDENADA)
+    distintas, primeiras, inversos = np.unique(fixas, axis=0, return_index=True, return_inverse=True)
+    ordem = np.argsort(primeiras)
+    tabela_coordenadas = distintas[ordem]
+    indices_coordenadas = np.argsort(ordem)[inversos.reshape(-1)]
+
+    # Torres agregadas guardam só os eventos; nomes data/hora vão como segundos
+    eventos = _eventos_como_segundos(pontos, eventos)
+    agregadas = np.array([segundos is not None for segundos in eventos], dtype=bool)
+    nomes = [str(ponto.get("nome", "")) for ponto in pontos]
+    segundos_nomes = _nomes_como_segundos(nomes)
+    com_data = (segundos_nomes >= 0) & ~agregadas
+    flags[agregadas] |= FLAG_EVENTOS
+    flags[com_data] |= FLAG_NOME_DATA
+    segundos_eventos = [segundo for segundos in eventos if segundos is not None for segundo in segundos]
+
+    tabela = {}
+    def indice(texto):
+        return tabela.setdefault(texto, len(tabela))
+
+    indices_nomes = [indice(nomes[i]) for i in np.flatnonzero(~com_data & ~agregadas).tolist()]
+
+    parametros = []
+    extras = []
+    com_parametros = np.zeros(n, dtype=bool)
+    com_extras = np.zeros(n, dtype=bool)
+    for i, (ponto, tipo) in enumerate(zip(pontos, tipos)):
+        campos = ponto.keys() - CAMPOS_EVENTOS if agregadas[i] else ponto.keys()
+        campos_parametros = PARAMETROS.get(tipo, ())
+        valores = [_como_inteiro(ponto.get(campo)) for campo in campos_parametros]
+        if campos_parametros and None not in valores:
+            com_parametros[i] = True
+            parametros.extend(valores)
+            if campos <= _CAMPOS_CODIFICADOS[tipo]:
+                continue
+            campos_parametros = ()
+
+        # Tudo que não coube nos blocos fixos vai como JSON, sem perder dados
+        resto = {
+            k: v for k, v in ponto.items()
+            if k in campos and k not in CAMPOS_FIXOS and k not in CAMPOS_DESCARTADOS
+            and (k not in PARAMETROS.get(tipo, ()) or k in campos_parametros)
+        }
+        if tipo not in _CODIGOS_TIPOS:
+            resto["tipo"] = tipo
+        if resto:
+            com_extras[i] = True
+            extras.append(indice(json.dumps(resto, separators=(",", ":"))))
+    flags[com_parametros] |= FLAG_PARAMETROS
+    flags[com_extras] |= FLAG_EXTRAS
+
+    # Deltas: coordenadas vizinhas, carimbos em ordem cronológica e índices de
+    # strings novas (que crescem de 1 em 1) viram números pequenos
+    binario = b"".join([
+        _CABECALHO.pack(n, len(tabela_coordenadas), len(parametros), len(tabela)),
+        flags.tobytes(),
+        _planos_de_bytes(_delta(tabela_coordenadas[:, 0])),
+        _planos_de_bytes(_delta(tabela_coordenadas[:, 1])),
+        _planos_de_bytes(indices_coordenadas),
+        _planos_de_bytes(_delta(segundos_nomes[com_data])),
+        _planos_de_bytes(_delta(indices_nomes)),
+        _planos_de_bytes(parametros),
+        _planos_de_bytes(extras),
+        # Blocos das torres agregadas; vazios em links sem elas
+        _planos_de_bytes([len(segundos) for segundos in eventos if segundos is not None]),
+        _planos_de_bytes(_delta(segundos_eventos)),
+        # Tabela de strings: o tamanho de cada uma (em caracteres), depois o texto corrido
+        _planos_de_bytes([len(texto) for texto in tabela]),
+        "".join(tabela).encode(),
+    ])
+    # Nível 6: o 9 leva várias vezes mais tempo para ganhar ~2% no tamanho
+    return PREFIXO_COMPACTO + _b64_sem_padding(zlib.compress(binario, level=6))
+
+
+def decode_data_compacto(data_str: str) -> dict:
+    """Decodifica o formato v2 gerado por encode_data_compacto"""
+    binario = zlib.decompress(_b64_decode(data_str[len(PREFIXO_COMPACTO):]))
+    n, n_coordenadas, n_parametros, n_strings = _CABECALHO.unpack_from(binario)
+    posicao = _CABECALHO.size
+
+    def ler_bytes(quantidade):
+        nonlocal posicao
+        bloco = np.frombuffer(binario, dtype=np.uint8, count=quantidade, offset=posicao)
+        posicao += quantidade
+        return bloco
+
+    def ler_inteiros(quantidade):
+        planos = ler_bytes(4 * quantidade).reshape(4, quantidade)
+        return np.ascontiguousarray(planos.T).view("<i4").ravel()
+
+    flags = ler_bytes(n)
+    com_data = flags & FLAG_NOME_DATA != 0
+    agregadas = flags & FLAG_EVENTOS != 0
+    n_datas = int(np.count_nonzero(com_data))
+    n_agregadas = int(np.count_nonzero(agregadas))
+    n_extras = int(np.count_nonzero(flags & FLAG_EXTRAS))
+
+    lat = np.cumsum(ler_inteiros(n_coordenadas), dtype=np.int64) / ESCALA_COORDENADA
+    lng = np.cumsum(ler_inteiros(n_coordenadas), dtype=np.int64) / ESCALA_COORDENADA
+    indices_coordenadas = ler_inteiros(n)
+    datas = _segundos_como_nomes(np.cumsum(ler_inteiros(n_datas), dtype=np.int64))
+    indices_nomes = np.cumsum(ler_inteiros(n - n_datas - n_agregadas), dtype=np.int64)
+    parametros = ler_inteiros(n_parametros)
+    indices_extras = ler_inteiros(n_extras).tolist()
+    contagens_eventos = ler_inteiros(n_agregadas).tolist()
+    segundos_eventos = np.cumsum(ler_inteiros(sum(contagens_eventos)), dtype=np.int64)
+    todos_eventos = _segundos_como_nomes(segundos_eventos)
+    fins = np.cumsum(ler_inteiros(n_strings), dtype=np.int64).tolist()
+    texto = binario[posicao:].decode()
+    tabela = [texto[inicio:fim] for inicio, fim in zip([0] + fins, fins)]
+
+    # Colunas inteiras primeiro; o nome das torres agregadas vem com os eventos
+    nomes = np.empty(n, dtype=object)
+    nomes[com_data] = datas
+    nomes[~com_data & ~agregadas] = np.array(tabela, dtype=object)[indices_nomes]
+    tipos = np.array(TIPOS + [None], dtype=object)[flags & MASCARA_TIPO]
+    pontos = [
+        {"lat": la, "lng": ln, "nome": nome, "visivel": visivel, "tipo": tipo}
+        for la, ln, nome, visivel, tipo in zip(
+            lat[indices_coordenadas].tolist(), lng[indices_coordenadas].tolist(), nomes.tolist(),
+            (flags & FLAG_VISIVEL != 0).tolist(), tipos.tolist(),
+        )
+    ]
+
+    # Depois só os pontos que têm cada bloco, na ordem em que foram gravados
+    com_parametros = flags & FLAG_PARAMETROS != 0
+    quantidades = np.zeros(n, dtype=np.int64)
+    for tipo, campos in PARAMETROS.items():
+        quantidades[com_parametros & (flags & MASCARA_TIPO == TIPOS.index(tipo))] = len(campos)
+    inicios = np.cumsum(quantidades) - quantidades
+    for tipo, campos in PARAMETROS.items():
+        selecao = com_parametros & (flags & MASCARA_TIPO == TIPOS.index(tipo))
+        colunas = [parametros[inicios[selecao] + k].tolist() for k in range(len(campos))]
+        for i, valores in zip(np.flatnonzero(selecao).tolist(), zip(*colunas)):
+            pontos[i].update(zip(campos, valores))
+    inicio = 0
+    for i, contagem in zip(np.flatnonzero(agregadas).tolist(), contagens_eventos):
+        pontos[i].update(campos_agregados(
+            todos_eventos[inicio:inicio + contagem],
+            (segundos_eventos[inicio:inicio + contagem] + _SEGUNDOS_EPOCA).tolist(),
+        ))
+        inicio += contagem
+    for i, j in zip(np.flatnonzero(flags & FLAG_EXTRAS).tolist(), indices_extras):
+        pontos[i].update(json.loads(tabela[j]))
+    return {"pontos": pontos}
+
+
+# ===============================
+# Funções de codificação
+# ===============================
+def encode_data(data: dict) -> str:
+    """Codifica e comprime dados em base64 para URL"""
+    json_str = json.dumps(data)
+    # Comprimir os dados
+    compressed = zlib.compress(json_str.encode(), level=9)
+    return base64.urlsafe_b64encode(compressed).decode()
+
+def decode_data(data_str: str) -> dict:
+    """Decodifica dados da URL, no formato compacto (v2) ou no original"""
+    try:
+        if data_str.startswith(PREFIXO_COMPACTO):
+            return decode_data_compacto(data_str)
+
+        compressed = base64.urlsafe_b64decode(data_str.encode())
+        # Descomprimir os dados
+        json_str = zlib.decompress(compressed).decode()
+        # Pontos antigos sem 'visivel' recebem o padrão ao entrar na sessão (tabela_pontos.Ponto)
+        return json.loads(json_str)
+    except Exception:
+        return {"pontos": []}
+
+
+# ===============================
+# Cache de decodificação
+# ===============================
+# Total de pontos mantidos decodificados entre todas as entradas
+MAXIMO_PONTOS_EM_CACHE = 500_000
+
+
+class CacheDecodificacao:
+    """LRU de listas de pontos já decodificadas, limitado pelo total de pontos.
+
+    As listas guardadas nunca saem daqui: cada leitura recebe cópias dos
+    pontos, que a sessão pode alterar à vontade.
+    """
+
+    def __init__(self, maximo_pontos=MAXIMO_PONTOS_EM_CACHE):
+        self.maximo_pontos = maximo_pontos
+        self._entradas = OrderedDict()  # chave -> tupla de pontos
+        self._total = 0
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            pontos = self._entradas.get(chave)
+            if pontos is None:
+                return None
+            self._entradas.move_to_end(chave)
+        return [dict(ponto) for ponto in pontos]
+
+    def guardar(self, chave, pontos):
+        if len(pontos) > self.maximo_pontos:
+            return
+        congelados = tuple(dict(ponto) for ponto in pontos)
+        with self._trava:
+            if chave in self._entradas:
+                self._total -= len(self._entradas.pop(chave))
+            self._entradas[chave] = congelados
+            self._total += len(congelados)
+            while self._total > self.maximo_pontos:
+                _, removidos = self._entradas.popitem(last=False)
+                self._total -= len(removidos)
+
+
+_cache_decode = CacheDecodificacao()
+
+
+def decode_data_em_cache(data_str: str) -> dict:
+    """decode_data memorizado pelo SHA-256 do payload, compartilhado entre sessões"""
+    digest = hashlib.sha256(data_str.encode()).hexdigest()
+    pontos = _cache_decode.obter(digest)
+    if pontos is None:
+        pontos = decode_data(data_str).get("pontos", [])
+        _cache_decode.guardar(digest, pontos)
+    return {"pontos": pontos}
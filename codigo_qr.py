@@ -0,0 +1,83 @@
+import threading
+
+import qrcode
+import qrcode.image.svg
+
+from collections import OrderedDict
+from io import BytesIO
+
+
+# ===============================
+# Configurações
+# ===============================
+TAMANHO_MODULO = 10
+BORDA = 4
+
+# Limite do cache em bytes (PNGs e SVGs somados)
+TAMANHO_MAXIMO_CACHE = 16 * 1024 * 1024
+
+
+# ===============================
+# Cache de QR Codes
+# ===============================
+class CacheQr:
+    """LRU de QR Codes já renderizados, limitado pelo total de bytes"""
+
+    def __init__(self, tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()  # (formato, url, tamanho, borda) -> conteúdo
+        self._ocupado = 0
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            conteudo = self._entradas.get(chave)
+            if conteudo is not None:
+                self._entradas.move_to_end(chave)
+            return conteudo
+
+    def guardar(self, chave, conteudo):
+        if len(conteudo) > self.tamanho_maximo:
+            return
+        with self._trava:
+            if chave in self._entradas:
+                self._ocupado -= len(self._entradas.pop(chave))
+            self._entradas[chave] = conteudo
+            self._ocupado += len(conteudo)
+            while self._ocupado > self.tamanho_maximo:
+                _, removido = self._entradas.popitem(last=False)
+                self._ocupado -= len(removido)
+
+
+_cache_qr = CacheQr()
+
+
+def _montar(url, tamanho_modulo, borda, image_factory=None):
+    qr = qrcode.QRCode(version=1, box_size=tamanho_modulo, border=borda, image_factory=image_factory)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+def gerar_qr_png(url: str, tamanho_modulo=TAMANHO_MODULO, borda=BORDA, cache=_cache_qr) -> bytes:
+    """PNG do QR Code da URL, memorizado por (url, tamanho, borda)"""
+    chave = ("png", url, tamanho_modulo, borda)
+    png = cache.obter(chave)
+    if png is None:
+        imagem = _montar(url, tamanho_modulo, borda).make_image(fill_color="black", back_color="white")
+        buffer = BytesIO()
+        imagem.save(buffer, format="PNG")
+        png = buffer.getvalue()
+        cache.guardar(chave, png)
+    return png
+
+
+def gerar_qr_svg(url: str, tamanho_modulo=TAMANHO_MODULO, borda=BORDA, cache=_cache_qr) -> str:
+    """SVG (um único path) do QR Code da URL, gerado sem rasterizar com o PIL"""
+    chave = ("svg", url, tamanho_modulo, borda)
+    svg = cache.obter(chave)
+    if svg is None:
+        imagem = _montar(url, tamanho_modulo, borda, qrcode.image.svg.SvgPathImage).make_image()
+        svg = imagem.to_string(encoding="unicode")
+        cache.guardar(chave, svg)
+    return svg
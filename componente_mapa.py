@@ -0,0 +1,121 @@
+import json
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from desempenho import anotar, detalhar, etapa
+from espacial import IndiceEspacial
+from geometria import preparar_geometria
+
+
+# ===============================
+# Componente do mapa
+# ===============================
+# O iframe carrega frontend/mapa/index.html uma única vez por sessão; a cada
+# rerun recebe só a diferença entre os pontos que já desenhou e os atuais.
+_DIRETORIO_FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "mapa")
+_componente_mapa = components.declare_component("mapa", path=_DIRETORIO_FRONTEND)
+
+# Só os pontos em volta da área visível vão ao navegador. A área enviada é a
+# tela ampliada por esta fração de cada lado, para que pequenos deslocamentos
+# não exijam novos dados.
+MARGEM_AREA = 0.5
+
+# Antes de o mapa informar a tela: meia-largura (graus) da janela em volta do primeiro ponto
+JANELA_INICIAL = 0.05
+
+
+def calcular_diferencas(enviados: dict, pontos: list):
+    """Compara os pontos atuais com os já enviados (id -> ponto).
+
+    Retorna (alterados, removidos): pontos novos ou modificados e ids que saíram.
+    """
+    atuais = {p["id"]: p for p in pontos}
+    alterados = [p for ponto_id, p in atuais.items() if enviados.get(ponto_id) != p]
+    removidos = [ponto_id for ponto_id in enviados if ponto_id not in atuais]
+    return alterados, removidos
+
+
+def calcular_area(tela, primeiro):
+    """Retângulo (sul, norte, oeste, leste) cujos pontos devem estar no navegador"""
+    if tela is None:
+        if primeiro is None:
+            return None
+        return (primeiro["lat"] - JANELA_INICIAL, primeiro["lat"] + JANELA_INICIAL,
+                primeiro["lng"] - JANELA_INICIAL, primeiro["lng"] + JANELA_INICIAL)
+    folga_lat = (tela["norte"] - tela["sul"]) * MARGEM_AREA
+    folga_lng = (tela["leste"] - tela["oeste"]) * MARGEM_AREA
+    return (tela["sul"] - folga_lat, tela["norte"] + folga_lat,
+            tela["oeste"] - folga_lng, tela["leste"] + folga_lng)
+
+
+def exibir_mapa(pontos_visiveis, chave_api, config, key="mapa", coordenadas=None):
+    """Desenha o mapa mandando ao navegador apenas o que mudou desde o último envio.
+
+    O navegador devolve a tela atual quando ela sai da área enviada, e só os
+    pontos dessa área (consultados no índice espacial) entram na diferença.
+    Ele também confirma a versão que tem desenhada; se perder alguma
+    diferença (ex.: iframe recarregado), pede o mapa inteiro de novo.
+
+    coordenadas: arrays (lat, lng) dos pontos visíveis, se já existirem em
+    colunas; evitam percorrer a lista para montar o índice.
+    """
+    estado = st.session_state.setdefault(
+        "mapa_componente", {"versao": 0, "enviados": {}, "pedido_atendido": 0}
+    )
+
+    completo = False
+    valor = st.session_state.get(key) or {}
+    if valor.get("pedido", 0) != estado["pedido_atendido"]:
+        estado["pedido_atendido"] = valor["pedido"]
+        estado["enviados"] = {}
+        completo = True
+
+    primeiro = pontos_visiveis[0] if pontos_visiveis else None
+    area = calcular_area(valor.get("tela"), primeiro)
+    with etapa("mapa_area"):
+        if area is None:
+            na_area = []
+        else:
+            if coordenadas is None:
+                indice = IndiceEspacial.de_pontos(pontos_visiveis)
+            else:
+                indice = IndiceEspacial(*coordenadas)
+            indices = indice.na_caixa(*area)
+            na_area = [pontos_visiveis[i] for i in indices]
+
+    with etapa("mapa_diferencas"):
+        alterados, removidos = calcular_diferencas(estado["enviados"], na_area)
+    base = estado["versao"]
+    if alterados or removidos or completo:
+        estado["versao"] += 1
+        # Cópias rasas: a sessão pode editar os pontos originais depois
+        for p in alterados:
+            estado["enviados"][p["id"]] = dict(p)
+        for ponto_id in removidos:
+            del estado["enviados"][ponto_id]
+    # Se nada mudou, versao == base e o navegador não redesenha nada
+
+    # Setores e círculos vão com os contornos já calculados
+    with etapa("mapa_geometria"):
+        alterados = preparar_geometria(alterados)
+    anotar(pontos_visiveis=len(pontos_visiveis), pontos_na_area=len(na_area),
+           pontos_enviados=len(alterados), pontos_removidos=len(removidos))
+    if detalhar():
+        # O Streamlit serializa os argumentos de novo; medir custa um json.dumps extra
+        anotar(bytes_mapa=len(json.dumps(alterados, separators=(",", ":"))))
+
+    return _componente_mapa(
+        chave_api=chave_api,
+        config=config,
+        versao=estado["versao"],
+        base=base,
+        completo=completo,
+        alterados=alterados,
+        removidos=removidos,
+        primeiro=None if primeiro is None else dict(primeiro),
+        area=area,
+        key=key,
+        default=None,
+    )
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ===============================
+# Configurações
+# ===============================
+# Reruns guardados por sessão para o painel "⚙ Desempenho"
+EXECUCOES_NO_PAINEL = 20
+
+# DESEMPENHO_LOG=1 grava uma linha JSON por rerun no logger "mapa.desempenho"
+LOG_ESTRUTURADO = os.environ.get("DESEMPENHO_LOG", "") == "1"
+
+# DESEMPENHO_PORTA=9464 publica as métricas no formato texto do Prometheus (0 = desligado)
+PORTA_METRICAS = int(os.environ.get("DESEMPENHO_PORTA", "0") or 0)
+
+# Limites (s) dos buckets do histograma de duração das etapas
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_log = logging.getLogger("mapa.desempenho")
+
+
+# ===============================
+# Medições de um rerun
+# ===============================
+class Execucao:
+    """Duração das etapas (ms, somadas se a etapa se repetir) e valores anotados de um rerun.
+
+    detalhada indica se vale pagar por medições extras, como o tamanho em
+    bytes do que vai ao navegador (só quando alguém vai olhar o resultado).
+    historico é onde a execução entra ao ser finalizada.
+    """
+
+    def __init__(self, detalhada=False, historico=None):
+        self.inicio = time.time()
+        self._relogio = time.perf_counter()
+        self.detalhada = detalhada
+        self.historico = historico
+        self.etapas = {}
+        self.valores = {}
+        self.total_ms = None
+
+    def adicionar(self, nome, ms):
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + ms
+
+    def anotar(self, **valores):
+        self.valores.update(valores)
+
+    def finalizar(self):
+        self.total_ms = (time.perf_counter() - self._relogio) * 1000
+
+    def como_dict(self) -> dict:
+        return {
+            "inicio": round(self.inicio, 3),
+            "total_ms": None if self.total_ms is None else round(self.total_ms, 2),
+            "etapas_ms": {nome: round(ms, 2) for nome, ms in self.etapas.items()},
+            **self.valores,
+        }
+
+
+# Cada rerun roda numa thread do Streamlit; a execução em andamento fica nela
+_local = threading.local()
+
+
+def execucao_atual():
+    return getattr(_local, "execucao", None)
+
+
+def iniciar_execucao(detalhada=False, historico=None) -> Execucao:
+    """Abre a medição do rerun atual (e sobe o endpoint de métricas, se configurado).
+
+    Um st.rerun() interrompe o script antes do fim, e o Streamlit reexecuta na
+    mesma thread: a execução que ficou aberta é finalizada aqui, marcada com
+    fim="st.rerun", para que os reruns que terminam assim também sejam medidos.
+    """
+    if execucao_atual() is not None:
+        anotar(fim="st.rerun")
+        finalizar_execucao()
+    if PORTA_METRICAS:
+        iniciar_endpoint(PORTA_METRICAS)
+    execucao = Execucao(detalhada=detalhada or LOG_ESTRUTURADO or bool(PORTA_METRICAS), historico=historico)
+    _local.execucao = execucao
+    return execucao
+
+
+def finalizar_execucao(historico=None):
+    """Fecha a medição do rerun e publica em log/métricas.
+
+    Guarda a execução em historico ou, se omitido, no histórico passado a iniciar_execucao.
+    """
+    execucao = execucao_atual()
+    if execucao is None:
+        return None
+    _local.execucao = None
+    execucao.finalizar()
+    metricas.observar("total", execucao.total_ms / 1000)
+    metricas.registrar_valores(execucao.valores)
+    historico = execucao.historico if historico is None else historico
+    if historico is not None:
+        historico.append(execucao)
+    if LOG_ESTRUTURADO:
+        _log.info(json.dumps(execucao.como_dict(), ensure_ascii=False))
+    return execucao
+
+
+def novo_historico():
+    return deque(maxlen=EXECUCOES_NO_PAINEL)
+
+
+@contextmanager
+def etapa(nome):
+    """Cronometra o bloco; fora de um rerun (ex.: threads de fundo) só alimenta as métricas"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        metricas.observar(nome, segundos)
+        execucao = execucao_atual()
+        if execucao is not None:
+            execucao.adicionar(nome, segundos * 1000)
+
+
+def anotar(**valores):
+    """Registra contagens/tamanhos no rerun atual"""
+    execucao = execucao_atual()
+    if execucao is not None:
+        execucao.anotar(**valores)
+
+
+def detalhar() -> bool:
+    """Se o rerun atual quer as medições extras (ex.: bytes serializados)"""
+    execucao = execucao_atual()
+    return execucao is not None and execucao.detalhada
+
+
+# ===============================
+# Métricas agregadas (Prometheus)
+# ===============================
+class Metricas:
+    """Histogramas de duração por etapa e últimos valores anotados, somando todas as sessões"""
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        self.buckets = buckets
+        self._histogramas = {}  # etapa -> [contagens por bucket, soma, total]
+        self._valores = {}
+        self._trava = threading.Lock()
+
+    def observar(self, nome, segundos):
+        with self._trava:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if segundos <= limite:
+                    histograma[0][i] += 1
+            histograma[1] += segundos
+            histograma[2] += 1
+
+    def registrar_valores(self, valores):
+        with self._trava:
+            self._valores.update(
+                (nome, valor) for nome, valor in valores.items() if isinstance(valor, (int, float))
+            )
+
+    def texto_prometheus(self) -> str:
+        """Métricas no formato de exposição em texto do Prometheus"""
+        linhas = [
+            "# HELP mapa_etapa_segundos Duração das etapas do rerun do mapa",
+            "# TYPE mapa_etapa_segundos histogram",
+        ]
+        with self._trava:
+            for nome, (contagens, soma, total) in sorted(self._histogramas.items()):
+                for limite, contagem in zip(self.buckets, contagens):
+                    linhas.append(f'mapa_etapa_segundos_bucket{{etapa="{nome}",le="{limite}"}} {contagem}')
+                linhas.append(f'mapa_etapa_segundos_bucket{{etapa="{nome}",le="+Inf"}} {total}')
+                linhas.append(f'mapa_etapa_segundos_sum{{etapa="{nome}"}} {soma:.6f}')
+                linhas.append(f'mapa_etapa_segundos_count{{etapa="{nome}"}} {total}')
+            linhas.append("# HELP mapa_ultimo_valor Último valor anotado (pontos, bytes) em um rerun")
+            linhas.append("# TYPE mapa_ultimo_valor gauge")
+            for nome, valor in sorted(self._valores.items()):
+                linhas.append(f'mapa_ultimo_valor{{nome="{nome}"}} {valor}')
+        return "\n".join(linhas) + "\n"
+
+
+metricas = Metricas()
+
+
+class _RespostaMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = metricas.texto_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+_servidor = None
+_trava_servidor = threading.Lock()
+
+
+def iniciar_endpoint(porta):
+    """Sobe (uma vez por processo) o servidor HTTP com /metrics numa thread de fundo"""
+    global _servidor
+    with _trava_servidor:
+        if _servidor is not None:
+            return _servidor
+        try:
+            _servidor = ThreadingHTTPServer(("0.0.0.0", porta), _RespostaMetricas)
+        except OSError as e:
+            _log.warning("Endpoint de métricas não iniciado na porta %s: %s", porta, e)
+            _servidor = False
+            return None
+        threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
+        return _servidor
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import threading
+import time
+
+import requests
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from desempenho import etapa
+
+
+# ===============================
+# Configurações
+# ===============================
+URL_TINYURL = "https://tinyurl.com/api-create.php"
+
+# (conexão, leitura) em segundos
+TEMPO_LIMITE = (2, 4)
+
+MAXIMO_LINKS_EM_CACHE = 1024
+VALIDADE_CACHE = 24 * 60 * 60
+
+# Falhas também são lembradas, por pouco tempo, para não insistir a cada rerun
+VALIDADE_FALHA = 60
+
+# Escolha do encurtador: "tinyurl" (padrão) ou "local" (para testes e uso offline)
+ENCURTADOR = os.environ.get("ENCURTADOR", "tinyurl")
+
+
+# ===============================
+# Encurtadores
+# ===============================
+class Encurtador(ABC):
+    """Interface dos encurtadores: encurtar(url) retorna o link curto ou lança exceção"""
+
+    @abstractmethod
+    def encurtar(self, url_longa: str) -> str:
+        ...
+
+
+class EncurtadorTinyUrl(Encurtador):
+    """TinyURL por uma Session com pool de conexões e tempo limite explícito"""
+
+    def __init__(self, url_api=URL_TINYURL, tempo_limite=TEMPO_LIMITE):
+        self.url_api = url_api
+        self.tempo_limite = tempo_limite
+        self._sessao = requests.Session()
+        self._sessao.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+    def encurtar(self, url_longa: str) -> str:
+        # params= codifica a URL longa (que tem ?, & e =) na query string
+        resposta = self._sessao.get(self.url_api, params={"url": url_longa}, timeout=self.tempo_limite)
+        resposta.raise_for_status()
+        url_curta = resposta.text.strip()
+        if not url_curta.startswith("http"):
+            raise ValueError(f"Resposta inesperada do encurtador: {url_curta[:100]}")
+        return url_curta
+
+
+class EncurtadorLocal(Encurtador):
+    """Encurtador em memória, determinístico, que não acessa a rede"""
+
+    def __init__(self, base="http://curto.local", atraso=0.0):
+        self.base = base.rstrip("/")
+        self.atraso = atraso
+        self.links = {}  # código -> url longa
+        self.chamadas = 0
+
+    def encurtar(self, url_longa: str) -> str:
+        self.chamadas += 1
+        if self.atraso:
+            time.sleep(self.atraso)
+        codigo = hashlib.sha256(url_longa.encode()).hexdigest()[:8]
+        self.links[codigo] = url_longa
+        return f"{self.base}/{codigo}"
+
+
+# ===============================
+# Cache com validade
+# ===============================
+class CacheLinks:
+    """LRU de links curtos por URL longa, com validade por entrada"""
+
+    def __init__(self, maximo=MAXIMO_LINKS_EM_CACHE, validade=VALIDADE_CACHE):
+        self.maximo = maximo
+        self.validade = validade
+        self._entradas = OrderedDict()  # url longa -> (url curta, expira_em)
+        self._trava = threading.Lock()
+
+    def obter(self, url_longa):
+        with self._trava:
+            entrada = self._entradas.get(url_longa)
+            if entrada is None:
+                return None
+            if entrada[1] < time.monotonic():
+                del self._entradas[url_longa]
+                return None
+            self._entradas.move_to_end(url_longa)
+            return entrada[0]
+
+    def guardar(self, url_longa, url_curta, validade=None):
+        validade = self.validade if validade is None else validade
+        with self._trava:
+            self._entradas[url_longa] = (url_curta, time.monotonic() + validade)
+            self._entradas.move_to_end(url_longa)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+
+# ===============================
+# Serviço assíncrono
+# ===============================
+class ServicoEncurtamento:
+    """Encurta em segundo plano; quem pede recebe o link na hora ou None enquanto espera.
+
+    Pedidos iguais em andamento são reaproveitados. Se o encurtador falhar, o
+    resultado é a própria URL longa, guardada só por VALIDADE_FALHA segundos
+    para que uma nova tentativa aconteça depois.
+    """
+
+    def __init__(self, encurtador: Encurtador, cache=None, max_workers=2):
+        self.encurtador = encurtador
+        self.cache = cache if cache is not None else CacheLinks()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="encurtador")
+        self._pendentes = {}  # url longa -> Future
+        self._trava = threading.Lock()
+
+    def _encurtar(self, url_longa):
+        try:
+            # Roda numa thread de fundo: a duração vai só para as métricas agregadas
+            with etapa("encurtador"):
+                url_curta = self.encurtador.encurtar(url_longa)
+            self.cache.guardar(url_longa, url_curta)
+            return url_curta
+        except Exception:
+            self.cache.guardar(url_longa, url_longa, validade=VALIDADE_FALHA)
+            return url_longa
+        finally:
+            with self._trava:
+                self._pendentes.pop(url_longa, None)
+
+    def solicitar(self, url_longa):
+        """Future com o link curto, disparando o encurtamento se preciso"""
+        with self._trava:
+            futuro = self._pendentes.get(url_longa)
+            if futuro is None:
+                futuro = self._executor.submit(self._encurtar, url_longa)
+                self._pendentes[url_longa] = futuro
+            return futuro
+
+    def obter(self, url_longa):
+        """Link curto se já estiver pronto; senão dispara o encurtamento e retorna None"""
+        url_curta = self.cache.obter(url_longa)
+        if url_curta is not None:
+            return url_curta
+        futuro = self.solicitar(url_longa)
+        return futuro.result() if futuro.done() else None
+
+
+def _criar_encurtador(nome):
+    if nome == "local":
+        return EncurtadorLocal()
+    return EncurtadorTinyUrl()
+
+
+# Instância única, compartilhada pelas sessões do servidor
+servico_encurtamento = ServicoEncurtamento(_criar_encurtador(ENCURTADOR))
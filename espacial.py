@@ -0,0 +1,165 @@
+import numpy as np
+
+from geometria import RAIO_TERRA
+
+
+# ===============================
+# Configurações
+# ===============================
+# Lado das células da grade em graus (~1,1 km no equador)
+TAMANHO_CELULA = 0.01
+
+_COLUNAS_GRADE = int(round(360 / TAMANHO_CELULA)) + 1
+
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        return np.nan
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _coluna(pontos, campo, tipo=None):
+    """Array do campo numérico dos pontos (do tipo dado, se informado); o resto vira NaN"""
+    valores = (
+        _numero(p.get(campo)) if tipo is None or p.get("tipo", "ponto") == tipo else np.nan
+        for p in pontos
+    )
+    return np.fromiter(valores, dtype=float, count=len(pontos))
+
+
+def _coordenadas(pontos):
+    """Arrays (lat, lng) dos pontos; coordenadas ausentes ou inválidas viram NaN"""
+    return _coluna(pontos, "lat"), _coluna(pontos, "lng")
+
+
+# ===============================
+# Cálculos sobre a esfera
+# ===============================
+def distancias_metros(lat, lng, lats, lngs):
+    """Distância (haversine) de (lat, lng) até cada um dos pontos (lats, lngs)"""
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lngs) - np.radians(lng)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * RAIO_TERRA * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def rumos_graus(lats, lngs, lat, lng):
+    """Rumo inicial (0 = norte, sentido horário) de cada (lats, lngs) até (lat, lng)"""
+    phi1, phi2 = np.radians(lats), np.radians(lat)
+    dlambda = np.radians(lng) - np.radians(lngs)
+    x = np.sin(dlambda) * np.cos(phi2)
+    y = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda)
+    return np.degrees(np.arctan2(x, y)) % 360.0
+
+
+def caixa_do_raio(lat, lng, raio):
+    """Retângulo (lat_min, lat_max, lng_min, lng_max) que contém o círculo de raio em metros"""
+    dlat = np.degrees(raio / RAIO_TERRA)
+    cos_lat = max(np.cos(np.radians(lat)), 1e-6)
+    dlng = min(180.0, dlat / cos_lat)
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+# ===============================
+# Índice espacial em grade
+# ===============================
+class IndiceEspacial:
+    """Grade regular sobre as coordenadas, com as chaves das células ordenadas.
+
+    Cada linha da grade vira um intervalo contínuo de chaves, então uma busca
+    por retângulo faz um searchsorted por linha e depois o teste exato só nos
+    candidatos. Os resultados são índices na lista original, em ordem crescente.
+    """
+
+    def __init__(self, lat, lng, tamanho_celula=TAMANHO_CELULA, pontos=None):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lng = np.asarray(lng, dtype=float)
+        self.tamanho_celula = tamanho_celula
+        self._pontos = pontos
+        self._setores = None
+
+        validos = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lng))
+        chaves = self._chave(self._linha(self.lat[validos]), self._coluna(self.lng[validos]))
+        ordem = np.argsort(chaves, kind="stable")
+        self._chaves = chaves[ordem]
+        self._indices = validos[ordem]
+
+    @classmethod
+    def de_pontos(cls, pontos, tamanho_celula=TAMANHO_CELULA):
+        return cls(*_coordenadas(pontos), tamanho_celula=tamanho_celula, pontos=pontos)
+
+    @classmethod
+    def de_colunas(cls, colunas, tamanho_celula=TAMANHO_CELULA):
+        """Índice a partir de tabela_pontos.ColunasPontos, sem percorrer os pontos"""
+        indice = cls(colunas.lat, colunas.lng, tamanho_celula=tamanho_celula)
+        indice._setores = colunas.setores()
+        return indice
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _linha(self, lat):
+        return np.floor((np.asarray(lat) + 90.0) / self.tamanho_celula).astype(np.int64)
+
+    def _coluna(self, lng):
+        return np.floor((np.asarray(lng) + 180.0) / self.tamanho_celula).astype(np.int64)
+
+    @staticmethod
+    def _chave(linha, coluna):
+        return linha * _COLUNAS_GRADE + coluna
+
+    def candidatos_na_caixa(self, lat_min, lat_max, lng_min, lng_max):
+        """Índices dos pontos nas células que tocam o retângulo (sem o teste exato)"""
+        if lat_min > lat_max or lng_min > lng_max or len(self._chaves) == 0:
+            return np.empty(0, dtype=np.int64)
+        linhas = np.arange(self._linha(lat_min), self._linha(lat_max) + 1)
+        inicio = np.searchsorted(self._chaves, self._chave(linhas, self._coluna(lng_min)), side="left")
+        fim = np.searchsorted(self._chaves, self._chave(linhas, self._coluna(lng_max)), side="right")
+        fatias = [self._indices[a:b] for a, b in zip(inicio, fim) if b > a]
+        if not fatias:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(fatias)
+
+    def na_caixa(self, lat_min, lat_max, lng_min, lng_max):
+        """Índices dos pontos dentro do retângulo (bordas incluídas)"""
+        candidatos = self.candidatos_na_caixa(lat_min, lat_max, lng_min, lng_max)
+        lat, lng = self.lat[candidatos], self.lng[candidatos]
+        dentro = (lat >= lat_min) & (lat <= lat_max) & (lng >= lng_min) & (lng <= lng_max)
+        return np.sort(candidatos[dentro])
+
+    def no_raio(self, lat, lng, raio):
+        """Índices dos pontos a até raio metros de (lat, lng)"""
+        candidatos = self.candidatos_na_caixa(*caixa_do_raio(lat, lng, raio))
+        distancias = distancias_metros(lat, lng, self.lat[candidatos], self.lng[candidatos])
+        return np.sort(candidatos[distancias <= raio])
+
+    def _parametros_setores(self):
+        """(azimute, margem, distancia) das torres; NaN nos demais pontos. Calculado uma vez."""
+        if self._setores is None:
+            if self._pontos is None:
+                raise ValueError("Índice criado sem os pontos: use IndiceEspacial.de_pontos")
+            self._setores = tuple(
+                _coluna(self._pontos, campo, tipo="torre") for campo in ("azimute", "margem", "distancia")
+            )
+        return self._setores
+
+    def setores_contendo(self, lat, lng):
+        """Índices das torres cujo setor (azimute ± margem/2, até a distância) contém (lat, lng)"""
+        azimute, margem, alcance = self._parametros_setores()
+        validos = np.isfinite(azimute) & np.isfinite(margem) & (alcance > 0)
+        if not validos.any():
+            return np.empty(0, dtype=np.int64)
+
+        # Só as torres perto o bastante para o maior alcance podem cobrir o ponto
+        candidatos = self.candidatos_na_caixa(*caixa_do_raio(lat, lng, alcance[validos].max()))
+        candidatos = candidatos[validos[candidatos]]
+        lats, lngs = self.lat[candidatos], self.lng[candidatos]
+
+        dentro = distancias_metros(lat, lng, lats, lngs) <= alcance[candidatos]
+        desvio = np.abs((rumos_graus(lats, lngs, lat, lng) - azimute[candidatos] + 540.0) % 360.0 - 180.0)
+        dentro &= (desvio <= margem[candidatos] / 2) | (margem[candidatos] >= 360)
+        return np.sort(candidatos[dentro])
@@ -0,0 +1,291 @@
+import json
+import secrets
+import time
+
+from contextlib import closing
+
+from banco import CAMINHO_BANCO, conectar
+from codec import CacheDecodificacao
+
+
+# ===============================
+# Esquema
+# ===============================
+# Campos com coluna própria; qualquer outro vai para "extras" como JSON.
+# margem/azimute/distancia/raio não têm afinidade de tipo: mapas antigos podem
+# ter texto dos formulários; os novos gravam os números já convertidos.
+COLUNAS_PONTO = ["id", "tipo", "nome", "lat", "lng", "visivel", "margem", "azimute", "distancia", "raio"]
+
+# Operações registradas no log de alterações
+OPERACOES = ("adicionar", "atualizar", "excluir", "visibilidade")
+
+# Quantidade de operações acumuladas que dispara a compactação em um snapshot
+LIMITE_OPERACOES = 200
+
+
+class MapaDesatualizado(Exception):
+    """Outra sessão gravou no mapa depois da versão em que a gravação se baseia"""
+
+_COLUNAS_TABELA = {
+    "ordem": "INTEGER",
+    "ponto_id": "TEXT",
+    "tipo": "TEXT",
+    "visivel": "INTEGER",
+    "margem": "",
+    "azimute": "",
+    "distancia": "",
+    "raio": "",
+    "extras": "TEXT",
+}
+
+_esquema_pronto = set()
+
+# Mapas compartilhados nunca mudam; os mais acessados ficam decodificados em memória
+_cache_compartilhados = CacheDecodificacao()
+
+
+def _preparar_esquema(con, caminho):
+    """Cria as tabelas e migra a tabela pontos original (map_id, nome, lat, lng)"""
+    if caminho in _esquema_pronto:
+        return
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS mapas (
+            map_id TEXT PRIMARY KEY,
+            compartilhado INTEGER NOT NULL DEFAULT 0,
+            criado_em REAL NOT NULL,
+            atualizado_em REAL NOT NULL
+        )
+    """)
+    # Versão do conteúdo, incrementada a cada gravação (snapshot ou operação)
+    if "versao" not in {linha[1] for linha in con.execute("PRAGMA table_info(mapas)")}:
+        con.execute("ALTER TABLE mapas ADD COLUMN versao INTEGER NOT NULL DEFAULT 0")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS pontos (
+            map_id TEXT,
+            nome TEXT,
+            lat REAL,
+            lng REAL
+        )
+    """)
+    existentes = {linha[1] for linha in con.execute("PRAGMA table_info(pontos)")}
+    for coluna, tipo in _COLUNAS_TABELA.items():
+        if coluna not in existentes:
+            con.execute(f"ALTER TABLE pontos ADD COLUMN {coluna} {tipo}".rstrip())
+    con.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_pontos_mapa ON pontos (map_id, ordem)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS operacoes (
+            map_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            operacao TEXT NOT NULL,
+            ponto_id TEXT NOT NULL,
+            dados TEXT,
+            PRIMARY KEY (map_id, seq)
+        )
+    """)
+    con.commit()
+    _esquema_pronto.add(caminho)
+
+
+def _ponto_para_linha(map_id, ordem, ponto):
+    extras = {k: v for k, v in ponto.items() if k not in COLUNAS_PONTO}
+    return (
+        map_id,
+        ordem,
+        ponto.get("id"),
+        ponto.get("tipo", "ponto"),
+        ponto.get("nome"),
+        ponto.get("lat"),
+        ponto.get("lng"),
+        int(bool(ponto.get("visivel", True))),
+        ponto.get("margem"),
+        ponto.get("azimute"),
+        ponto.get("distancia"),
+        ponto.get("raio"),
+        json.dumps(extras) if extras else None,
+    )
+
+
+def _linha_para_ponto(linha):
+    ponto_id, tipo, nome, lat, lng, visivel, margem, azimute, distancia, raio, extras = linha
+    ponto = {"id": ponto_id or novo_ponto_id(), "lat": lat, "lng": lng, "nome": nome,
+             "visivel": bool(visivel), "tipo": tipo}
+    # Mantém o formato de cada tipo: só inclui os campos que foram gravados
+    for campo, valor in (("margem", margem), ("azimute", azimute), ("distancia", distancia), ("raio", raio)):
+        if valor is not None:
+            ponto[campo] = valor
+    if extras:
+        ponto.update(json.loads(extras))
+    return ponto
+
+
+# ===============================
+# Operações
+# ===============================
+def novo_map_id() -> str:
+    return secrets.token_urlsafe(6)
+
+
+def novo_ponto_id() -> str:
+    return secrets.token_hex(6)
+
+
+def garantir_ids(pontos):
+    """Atribui um id estável aos pontos que ainda não têm (ex.: links antigos)"""
+    for ponto in pontos:
+        if not ponto.get("id"):
+            ponto["id"] = novo_ponto_id()
+    return pontos
+
+
+def _gravar_snapshot(con, map_id, pontos):
+    """Substitui os pontos gravados do mapa e apaga o log (dentro da transação de quem chama)"""
+    con.execute("DELETE FROM pontos WHERE map_id = ?", (map_id,))
+    con.execute("DELETE FROM operacoes WHERE map_id = ?", (map_id,))
+    con.executemany(
+        """
+        INSERT INTO pontos (map_id, ordem, ponto_id, tipo, nome, lat, lng, visivel,
+                            margem, azimute, distancia, raio, extras)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (_ponto_para_linha(map_id, i, p) for i, p in enumerate(pontos)),
+    )
+
+
+def salvar_mapa(pontos, map_id=None, compartilhado=False, caminho=CAMINHO_BANCO, versao=None) -> tuple:
+    """Grava um snapshot da lista inteira de pontos em uma transação; retorna (map_id, versão gravada).
+
+    O snapshot substitui o log de operações acumulado do mapa. Pontos sem id
+    recebem um aqui mesmo, para que as próximas operações os encontrem.
+    versao é a versão do mapa em que a lista se baseia: se outra sessão gravou
+    depois dela, nada é gravado e MapaDesatualizado é lançada, em vez de a
+    lista apagar as alterações da outra sessão.
+    """
+    garantir_ids(pontos)
+    map_id = map_id or novo_map_id()
+    agora = time.time()
+    with closing(conectar(caminho)) as con:
+        _preparar_esquema(con, caminho)
+        with con:
+            con.execute("BEGIN IMMEDIATE")
+            atual = con.execute("SELECT versao FROM mapas WHERE map_id = ?", (map_id,)).fetchone()
+            if versao is not None and atual is not None and atual[0] != versao:
+                raise MapaDesatualizado(map_id)
+            nova_versao = (atual[0] if atual else 0) + 1
+            con.execute(
+                """
+                INSERT INTO mapas (map_id, compartilhado, criado_em, atualizado_em, versao) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(map_id) DO UPDATE SET atualizado_em = excluded.atualizado_em, versao = excluded.versao
+                """,
+                (map_id, int(compartilhado), agora, agora, nova_versao),
+            )
+            _gravar_snapshot(con, map_id, pontos)
+    return map_id, nova_versao
+
+
+def registrar_operacao(map_id, operacao, ponto, caminho=CAMINHO_BANCO) -> tuple:
+    """Anexa uma alteração de um único ponto ao log do mapa; retorna (operações pendentes, nova versão).
+
+    Operações de sessões diferentes se somam no log sem conflito. Se a nova
+    versão não for a seguinte à que a sessão conhecia, outra sessão gravou no
+    meio e vale recarregar o mapa.
+    """
+    if operacao not in OPERACOES:
+        raise ValueError(f"Operação desconhecida: {operacao}")
+    if operacao == "excluir":
+        dados = None
+    elif operacao == "visibilidade":
+        dados = json.dumps({"visivel": ponto.get("visivel", True)})
+    else:
+        dados = json.dumps(dict(ponto))
+
+    with closing(conectar(caminho)) as con:
+        _preparar_esquema(con, caminho)
+        with con:
+            # Trava de escrita já no início: duas sessões não leem o mesmo MAX(seq)
+            con.execute("BEGIN IMMEDIATE")
+            seq = con.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM operacoes WHERE map_id = ?", (map_id,)
+            ).fetchone()[0]
+            con.execute(
+                "INSERT INTO operacoes (map_id, seq, operacao, ponto_id, dados) VALUES (?, ?, ?, ?, ?)",
+                (map_id, seq, operacao, ponto["id"], dados),
+            )
+            con.execute(
+                "UPDATE mapas SET atualizado_em = ?, versao = versao + 1 WHERE map_id = ?", (time.time(), map_id)
+            )
+            versao = con.execute("SELECT versao FROM mapas WHERE map_id = ?", (map_id,)).fetchone()[0]
+    return seq, versao
+
+
+def compactar_mapa(map_id, caminho=CAMINHO_BANCO):
+    """Reescreve o snapshot com o log reaplicado e apaga o log, na mesma transação.
+
+    Parte do que está gravado, e não da lista de uma sessão: operações de
+    outras sessões abertas no mesmo mapa entram no snapshot em vez de se
+    perderem. O conteúdo não muda, então a versão também não.
+    """
+    with closing(conectar(caminho)) as con:
+        _preparar_esquema(con, caminho)
+        with con:
+            con.execute("BEGIN IMMEDIATE")
+            _gravar_snapshot(con, map_id, _ler_pontos(con, map_id))
+
+
+def _aplicar_operacoes(pontos, operacoes):
+    """Reaplica o log sobre o snapshot, mantendo a ordem dos pontos"""
+    posicoes = {p["id"]: i for i, p in enumerate(pontos)}
+    for operacao, ponto_id, dados in operacoes:
+        i = posicoes.get(ponto_id)
+        if operacao == "adicionar":
+            posicoes[ponto_id] = len(pontos)
+            pontos.append(json.loads(dados))
+        elif i is None or pontos[i] is None:
+            continue
+        elif operacao == "atualizar":
+            pontos[i] = json.loads(dados)
+        elif operacao == "visibilidade":
+            pontos[i].update(json.loads(dados))
+        elif operacao == "excluir":
+            pontos[i] = None
+    return [p for p in pontos if p is not None]
+
+
+def _ler_pontos(con, map_id):
+    """Snapshot gravado do mapa com o log de operações reaplicado"""
+    linhas = con.execute(
+        """
+        SELECT ponto_id, tipo, nome, lat, lng, visivel, margem, azimute, distancia, raio, extras
+        FROM pontos WHERE map_id = ? ORDER BY ordem
+        """,
+        (map_id,),
+    )
+    pontos = [_linha_para_ponto(linha) for linha in linhas]
+    operacoes = con.execute(
+        "SELECT operacao, ponto_id, dados FROM operacoes WHERE map_id = ? ORDER BY seq", (map_id,)
+    ).fetchall()
+    return _aplicar_operacoes(pontos, operacoes)
+
+
+def carregar_mapa(map_id, caminho=CAMINHO_BANCO):
+    """Retorna (pontos, compartilhado, versao) do mapa, ou (None, False, None) se não existir.
+
+    Mapas compartilhados nunca mudam; para eles a versão é None.
+    """
+    pontos = _cache_compartilhados.obter((caminho, map_id))
+    if pontos is not None:
+        return pontos, True, None
+
+    with closing(conectar(caminho)) as con:
+        _preparar_esquema(con, caminho)
+        # Uma transação de leitura: snapshot, log e versão da mesma gravação
+        with con:
+            con.execute("BEGIN")
+            mapa = con.execute("SELECT compartilhado, versao FROM mapas WHERE map_id = ?", (map_id,)).fetchone()
+            if mapa is None:
+                return None, False, None
+            pontos = _ler_pontos(con, map_id)
+
+    if mapa[0]:
+        _cache_compartilhados.guardar((caminho, map_id), pontos)
+        return pontos, True, None
+    return pontos, False, mapa[1]
@@ -0,0 +1,267 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# ===============================
+# Configurações
+# ===============================
+# Versão do formato das torres agregadas; entra na chave do cache de extratos
+VERSAO_AGREGACAO = 1
+
+# Nome gerado na importação: data + ' - ' + hora. A data pode vir como texto
+# (dd/mm/aaaa) ou como célula de data do Excel (aaaa-mm-dd 00:00:00).
+FORMATOS_EVENTO = (
+    "%d/%m/%Y - %H:%M:%S",
+    "%d/%m/%Y - %H:%M",
+    "%Y-%m-%d 00:00:00 - %H:%M:%S",
+    "%Y-%m-%d 00:00:00 - %H:%M",
+)
+
+
+# ===============================
+# Data/hora dos eventos
+# ===============================
+def instantes_eventos(nomes) -> np.ndarray:
+    """datetime64[s] de cada nome de evento; NaT quando não for uma data/hora reconhecível"""
+    # strptime do Arrow (C++), um formato por passada; vale o primeiro que reconhecer
+    textos = pa.array([nome if isinstance(nome, str) else None for nome in nomes], type=pa.string())
+    instantes = None
+    for formato in FORMATOS_EVENTO:
+        lidos = pc.strptime(textos, format=formato, unit="s", error_is_null=True)
+        instantes = lidos if instantes is None else pc.coalesce(instantes, lidos)
+    if instantes is None or len(textos) == 0:
+        return np.array([], dtype="datetime64[s]")
+    return instantes.to_numpy(zero_copy_only=False).astype("datetime64[s]")
+
+
+# ===============================
+# Agregação de torres repetidas
+# ===============================
+# Posição de ordenação dos eventos sem data/hora reconhecível (depois de todos)
+_SEM_DATA = np.iinfo(np.int64).max
+
+
+def chave_setor(torre):
+    """Torres com a mesma chave desenham exatamente o mesmo setor"""
+    return (torre.get("lat"), torre.get("lng"), torre.get("azimute"), torre.get("margem"), torre.get("distancia"))
+
+
+def eventos_da_torre(torre) -> list:
+    """Eventos de uma torre: a lista agregada ou, numa torre simples, o próprio nome"""
+    return torre.get("eventos") or [torre.get("nome")]
+
+
+def instantes_da_torre(torre):
+    """Instantes já lidos dos eventos da torre agregada, ou None se ela não os tiver"""
+    instantes = torre.get("instantes")
+    eventos = torre.get("eventos")
+    if isinstance(instantes, list) and isinstance(eventos, list) and len(instantes) <= len(eventos):
+        return instantes
+    return None
+
+
+def campos_agregados(eventos, instantes=None) -> dict:
+    """Campos derivados da lista (já ordenada) de eventos de um setor.
+
+    instantes, se informado, são os segundos desde 1970 de cada evento com
+    data/hora, na mesma ordem; os eventos sem data ficam no fim da lista e sem
+    instante. Com eles o índice temporal não precisa reler os nomes.
+    """
+    nome = eventos[0] if len(eventos) == 1 else f"{eventos[0]} ({len(eventos)} eventos)"
+    campos = {
+        "nome": nome,
+        "eventos": eventos,
+        "contagem": len(eventos),
+        "primeiro": eventos[0],
+        "ultimo": eventos[-1],
+    }
+    if instantes is not None:
+        campos["instantes"] = instantes
+    return campos
+
+
+class AgregadorTorres:
+    """Agregação incremental: adicionar() recebe as torres aos poucos (ex.: bloco a
+    bloco na leitura de uma aba) e registros() monta um registro por setor no fim.
+
+    Entre as chamadas só fica em memória um modelo por setor e os nomes dos
+    eventos, não as torres recebidas.
+    """
+
+    def __init__(self):
+        self._grupos = {}  # chave -> (modelo, eventos)
+        self._instantes = {}  # nome -> instante, dos registros que já vieram agregados
+
+    def adicionar(self, torres):
+        for torre in torres:
+            if torre.get("tipo", "torre") != "torre":
+                continue
+            instantes = instantes_da_torre(torre)
+            if instantes is not None:
+                self._instantes.update(zip(torre["eventos"], instantes))
+            chave = chave_setor(torre)
+            grupo = self._grupos.get(chave)
+            if grupo is None:
+                self._grupos[chave] = (torre, list(eventos_da_torre(torre)))
+            else:
+                grupo[1].extend(eventos_da_torre(torre))
+        return self
+
+    def registros(self) -> list:
+        """Um registro por setor, na ordem da primeira aparição; esvazia o agregador"""
+        grupos, self._grupos = self._grupos, {}
+        ordem, self._instantes = self._instantes, {}
+
+        # Data/hora dos nomes distintos ainda não lidos, de uma vez; sem data vão para o fim
+        distintos = list({nome for _, eventos in grupos.values() for nome in eventos if nome not in ordem})
+        instantes = instantes_eventos(distintos).astype(np.int64)
+        instantes[np.isnat(instantes.astype("datetime64[s]"))] = _SEM_DATA
+        ordem.update(zip(distintos, instantes.tolist()))
+        del distintos, instantes
+
+        agregadas = []
+        # Cada grupo sai do dicionário ao virar registro: os modelos não se acumulam com os registros
+        for chave in list(grupos):
+            modelo, eventos = grupos.pop(chave)
+            eventos = sorted(set(eventos), key=lambda nome: (ordem[nome], nome))
+            instantes = [ordem[nome] for nome in eventos if ordem[nome] != _SEM_DATA]
+            registro = {k: v for k, v in modelo.items() if k not in ("id", "lote")}
+            registro.update(campos_agregados(eventos, instantes))
+            agregadas.append(registro)
+        return agregadas
+
+
+def agregar_torres(torres) -> list:
+    """Agrupa as torres de setor idêntico em um registro por setor.
+
+    Cada registro leva contagem, primeiro/ultimo evento e a lista "eventos"
+    (nomes data/hora, sem repetição, em ordem cronológica). Aceita torres
+    simples ou já agregadas, então serve também para juntar resultados
+    parciais (abas, arquivos de um lote). A ordem segue a primeira
+    aparição de cada setor.
+    """
+    return AgregadorTorres().adicionar(torres).registros()
+
+
+def remover_eventos_existentes(torres, existentes) -> list:
+    """Tira das torres agregadas os eventos que o mapa já tem no mesmo setor"""
+    ja_vistos = {}
+    for ponto in existentes:
+        if ponto.get("tipo") == "torre":
+            ja_vistos.setdefault(chave_setor(ponto), set()).update(eventos_da_torre(ponto))
+
+    restantes = []
+    for torre in torres:
+        vistos = ja_vistos.get(chave_setor(torre))
+        if not vistos:
+            restantes.append(torre)
+            continue
+        eventos = [nome for nome in torre["eventos"] if nome not in vistos]
+        if eventos:
+            instantes = instantes_da_torre(torre)
+            if instantes is not None:
+                por_nome = dict(zip(torre["eventos"], instantes))
+                instantes = [por_nome[nome] for nome in eventos if nome in por_nome]
+            restantes.append(dict(torre, **campos_agregados(eventos, instantes)))
+    return restantes
+
+
+def juntar_ao_mapa(existentes, torres):
+    """Junta torres importadas aos pontos do mapa mantendo um registro por setor.
+
+    Os eventos novos de um setor que o mapa já tem entram no registro
+    existente, que mantém id, lote e visibilidade; setores novos vão para o
+    fim. Retorna (lista completa de pontos, torres com só os eventos novos).
+    """
+    novas = remover_eventos_existentes(torres, existentes)
+    posicoes = {}
+    for i, ponto in enumerate(existentes):
+        if ponto.get("tipo") == "torre":
+            posicoes.setdefault(chave_setor(ponto), i)
+
+    pontos = list(existentes)
+    for torre in novas:
+        i = posicoes.get(chave_setor(torre))
+        if i is None:
+            pontos.append(torre)
+            continue
+        existente = pontos[i]
+        (junta,) = agregar_torres([existente, torre])
+        for campo in ("id", "lote"):
+            if existente.get(campo) is not None:
+                junta[campo] = existente[campo]
+        pontos[i] = junta
+    return pontos, novas
+
+
+def total_eventos(torres) -> int:
+    return sum(len(eventos_da_torre(t)) for t in torres)
+
+
+# ===============================
+# Índice temporal
+# ===============================
+class IndiceTemporal:
+    """Eventos das torres em ordem cronológica, com o índice do ponto de cada um.
+
+    Uma janela [inicio, fim] vira dois searchsorted e uma fatia dos arrays, sem
+    percorrer os pontos nem reler os nomes. Pontos sem data/hora reconhecível
+    (pontos, círculos, torres cadastradas à mão) ficam fora do índice.
+    """
+
+    def __init__(self, instantes, donos, total_pontos):
+        instantes = np.asarray(instantes, dtype="datetime64[s]")
+        donos = np.asarray(donos, dtype=np.int64)
+        validos = ~np.isnat(instantes)
+        ordem = np.argsort(instantes[validos], kind="stable")
+        self.instantes = instantes[validos][ordem]
+        self.donos = donos[validos][ordem]
+        self.indexados = np.zeros(total_pontos, dtype=bool)
+        self.indexados[self.donos] = True
+
+    @classmethod
+    def de_pontos(cls, pontos):
+        """Usa os instantes guardados nas torres agregadas; só os nomes das demais torres são lidos"""
+        segundos, donos = [], []
+        nomes, donos_nomes = [], []
+        for i, ponto in enumerate(pontos):
+            if ponto.get("tipo") != "torre":
+                continue
+            instantes = instantes_da_torre(ponto)
+            if instantes is not None:
+                segundos.extend(instantes)
+                donos.extend([i] * len(instantes))
+            else:
+                eventos = eventos_da_torre(ponto)
+                nomes.extend(eventos)
+                donos_nomes.extend([i] * len(eventos))
+        instantes = np.concatenate([
+            np.array(segundos, dtype=np.int64).astype("datetime64[s]"),
+            instantes_eventos(nomes),
+        ])
+        return cls(instantes, donos + donos_nomes, len(pontos))
+
+    def __len__(self):
+        return len(self.instantes)
+
+    @property
+    def inicio(self):
+        return self.instantes[0] if len(self) else None
+
+    @property
+    def fim(self):
+        return self.instantes[-1] if len(self) else None
+
+    def fatia(self, inicio, fim):
+        """(a, b) tais que instantes[a:b] são os eventos em [inicio, fim]"""
+        a = int(np.searchsorted(self.instantes, np.datetime64(inicio, "s"), side="left"))
+        b = int(np.searchsorted(self.instantes, np.datetime64(fim, "s"), side="right"))
+        return a, max(a, b)
+
+    def mascara_na_janela(self, inicio, fim):
+        """Máscara dos pontos a exibir: os com evento na janela e os que não estão no índice"""
+        a, b = self.fatia(inicio, fim)
+        mascara = ~self.indexados
+        mascara[self.donos[a:b]] = True
+        return mascara
@@ -0,0 +1,316 @@
+import argparse
+import csv
+import io
+import json
+import struct
+import sys
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from xml.sax.saxutils import escape
+
+from geometria import ESCALA_COORDENADA, CacheGeometria, preparar_geometria
+
+
+# ===============================
+# Configurações
+# ===============================
+# Pontos por bloco: cada formato calcula os contornos e gera os bytes bloco a
+# bloco, sem montar o documento inteiro em memória
+TAMANHO_BLOCO_EXPORTACAO = 2_000
+
+# Cache de formas próprio da exportação (não varre o cache do mapa); do tamanho
+# de um bloco, para a memória não crescer com o número de pontos
+MAXIMO_FORMAS_EXPORTACAO = TAMANHO_BLOCO_EXPORTACAO
+
+# formato -> (nome, tipo MIME, extensão)
+FORMATOS = {
+    "geojson": ("GeoJSON", "application/geo+json", ".geojson"),
+    "kml": ("KML (Google Earth)", "application/vnd.google-earth.kml+xml", ".kml"),
+    "csv": ("CSV (com geometria WKT)", "text/csv", ".csv"),
+    "parquet": ("Parquet (GeoParquet)", "application/vnd.apache.parquet", ".parquet"),
+}
+
+# Atributos exportados, na ordem das colunas; eventos só vão em GeoJSON e Parquet
+COLUNAS_EXPORTACAO = [
+    "id", "tipo", "nome", "lat", "lng", "visivel", "margem", "azimute", "distancia", "raio",
+    "contagem", "primeiro", "ultimo", "lote",
+]
+_COLUNAS_NUMERICAS = ("lat", "lng", "margem", "azimute", "distancia", "raio")
+
+
+class ExportacaoMuitoGrande(Exception):
+    """O arquivo passou do limite de bytes pedido a gravar_exportacao"""
+
+
+# ===============================
+# Blocos e geometria
+# ===============================
+def _blocos(pontos, tamanho_bloco):
+    """Blocos de pontos já com "anel" (contorno) nas torres e círculos válidos"""
+    cache = CacheGeometria(MAXIMO_FORMAS_EXPORTACAO)
+    for inicio in range(0, len(pontos), tamanho_bloco):
+        yield preparar_geometria(pontos[inicio:inicio + tamanho_bloco], cache=cache)
+
+
+def _anel(ponto):
+    """Array (k, 2) de (lng, lat) com o contorno fechado do ponto, ou None se ele não tiver forma"""
+    plano = ponto.get("anel")
+    if not plano:
+        return None
+    anel = np.asarray(plano, dtype=float).reshape(-1, 2)[:, ::-1] / ESCALA_COORDENADA
+    if not np.array_equal(anel[0], anel[-1]):
+        anel = np.vstack([anel, anel[:1]])
+    return np.ascontiguousarray(anel)
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _atributos(ponto):
+    atributos = {coluna: ponto.get(coluna) for coluna in COLUNAS_EXPORTACAO}
+    atributos["visivel"] = bool(ponto.get("visivel", True))
+    atributos["tipo"] = ponto.get("tipo", "ponto")
+    return atributos
+
+
+def _pares(anel):
+    return [f"{lng!r} {lat!r}" for lng, lat in anel.tolist()]
+
+
+def _wkt(ponto, anel):
+    if anel is None:
+        return f"POINT ({float(ponto['lng'])!r} {float(ponto['lat'])!r})"
+    return f"POLYGON (({', '.join(_pares(anel))}))"
+
+
+def _wkb(ponto, anel):
+    """Geometria em WKB little-endian: Point (tipo 1) ou Polygon de um anel (tipo 3)"""
+    if anel is None:
+        return struct.pack("<BIdd", 1, 1, float(ponto["lng"]), float(ponto["lat"]))
+    return struct.pack("<BIII", 1, 3, 1, len(anel)) + anel.astype("<f8").tobytes()
+
+
+# ===============================
+# Formatos
+# ===============================
+def exportar_geojson(pontos, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """FeatureCollection: Polygon para setores e círculos, Point para os demais"""
+    yield b'{"type":"FeatureCollection","features":['
+    separador = ""
+    for bloco in _blocos(pontos, tamanho_bloco):
+        partes = []
+        for ponto in bloco:
+            anel = _anel(ponto)
+            if anel is None:
+                geometria = {"type": "Point", "coordinates": [float(ponto["lng"]), float(ponto["lat"])]}
+            else:
+                geometria = {"type": "Polygon", "coordinates": [anel.tolist()]}
+            propriedades = _atributos(ponto)
+            if ponto.get("eventos"):
+                propriedades["eventos"] = ponto["eventos"]
+            partes.append(json.dumps(
+                {"type": "Feature", "geometry": geometria, "properties": propriedades},
+                ensure_ascii=False, separators=(",", ":"),
+            ))
+        if partes:
+            yield (separador + ",".join(partes)).encode()
+            separador = ","
+    yield b"]}"
+
+
+def exportar_kml(pontos, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO, nome="Mapa"):
+    """Um Placemark por ponto; setores e círculos levam o ponto e o polígono (MultiGeometry)"""
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+        f"<name>{escape(nome)}</name>\n"
+    ).encode()
+    for bloco in _blocos(pontos, tamanho_bloco):
+        partes = []
+        for ponto in bloco:
+            atributos = _atributos(ponto)
+            dados = "".join(
+                f'<Data name="{coluna}"><value>{escape(str(valor))}</value></Data>'
+                for coluna, valor in atributos.items()
+                if valor is not None and coluna not in ("nome", "visivel")
+            )
+            marcador = f"<Point><coordinates>{float(ponto['lng'])!r},{float(ponto['lat'])!r}</coordinates></Point>"
+            anel = _anel(ponto)
+            if anel is not None:
+                contorno = " ".join(f"{lng!r},{lat!r}" for lng, lat in anel.tolist())
+                marcador = (
+                    f"<MultiGeometry>{marcador}<Polygon><outerBoundaryIs><LinearRing>"
+                    f"<coordinates>{contorno}</coordinates></LinearRing></outerBoundaryIs></Polygon></MultiGeometry>"
+                )
+            partes.append(
+                f"<Placemark><name>{escape(str(atributos['nome'] or ''))}</name>"
+                f"<visibility>{int(atributos['visivel'])}</visibility>"
+                f"<ExtendedData>{dados}</ExtendedData>{marcador}</Placemark>\n"
+            )
+        yield "".join(partes).encode()
+    yield b"</Document></kml>\n"
+
+
+def exportar_csv(pontos, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """Uma linha por ponto, com a geometria em WKT; UTF-8 com BOM para abrir direto no Excel"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_EXPORTACAO + ["wkt"])
+    yield ("\ufeff" + buffer.getvalue()).encode()
+    for bloco in _blocos(pontos, tamanho_bloco):
+        buffer.seek(0)
+        buffer.truncate()
+        for ponto in bloco:
+            atributos = _atributos(ponto)
+            escritor.writerow([atributos[coluna] for coluna in COLUNAS_EXPORTACAO] + [_wkt(ponto, _anel(ponto))])
+        yield buffer.getvalue().encode()
+
+
+ESQUEMA_PARQUET = pa.schema(
+    [
+        ("id", pa.string()),
+        ("tipo", pa.string()),
+        ("nome", pa.string()),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+        ("visivel", pa.bool_()),
+        ("margem", pa.float64()),
+        ("azimute", pa.float64()),
+        ("distancia", pa.float64()),
+        ("raio", pa.float64()),
+        ("contagem", pa.int64()),
+        ("primeiro", pa.string()),
+        ("ultimo", pa.string()),
+        ("lote", pa.string()),
+        ("eventos", pa.list_(pa.string())),
+        ("geometry", pa.binary()),
+    ],
+    # Metadados GeoParquet: GIS (QGIS, GeoPandas, DuckDB) reconhecem a coluna geometry
+    metadata={b"geo": json.dumps({
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["Point", "Polygon"], "crs": None}},
+    }).encode()},
+)
+
+
+class _Vazao:
+    """Destino de escrita do ParquetWriter que só acumula o que ainda não foi entregue"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self.partes.append(dados)
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+def exportar_parquet(pontos, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """Um row group por bloco, com a geometria em WKB (GeoParquet)"""
+    vazao = _Vazao()
+    escritor = pq.ParquetWriter(vazao, ESQUEMA_PARQUET, compression="zstd")
+    try:
+        for bloco in _blocos(pontos, tamanho_bloco):
+            colunas = {coluna: [] for coluna in ESQUEMA_PARQUET.names}
+            for ponto in bloco:
+                atributos = _atributos(ponto)
+                for coluna in _COLUNAS_NUMERICAS:
+                    atributos[coluna] = _numero(atributos[coluna])
+                for coluna in ("id", "nome", "primeiro", "ultimo", "lote"):
+                    if atributos[coluna] is not None:
+                        atributos[coluna] = str(atributos[coluna])
+                atributos["eventos"] = ponto.get("eventos")
+                atributos["geometry"] = _wkb(ponto, _anel(ponto))
+                for coluna, valores in colunas.items():
+                    valores.append(atributos[coluna])
+            escritor.write_table(pa.table(colunas, schema=ESQUEMA_PARQUET))
+            yield vazao.esvaziar()
+    finally:
+        escritor.close()
+    yield vazao.esvaziar()
+
+
+_EXPORTADORES = {
+    "geojson": exportar_geojson,
+    "kml": exportar_kml,
+    "csv": exportar_csv,
+    "parquet": exportar_parquet,
+}
+
+
+def exportar(pontos, formato, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """Gerador de blocos de bytes dos pontos no formato pedido"""
+    if formato not in _EXPORTADORES:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    return _EXPORTADORES[formato](pontos, tamanho_bloco=tamanho_bloco)
+
+
+def gravar_exportacao(pontos, formato, destino, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO, limite_bytes=None) -> int:
+    """Escreve a exportação em um arquivo binário aberto, bloco a bloco; retorna os bytes gravados.
+
+    Com limite_bytes, para assim que o arquivo passa dele e lança ExportacaoMuitoGrande.
+    """
+    total = 0
+    for parte in exportar(pontos, formato, tamanho_bloco):
+        if parte:
+            destino.write(parte)
+            total += len(parte)
+            if limite_bytes is not None and total > limite_bytes:
+                raise ExportacaoMuitoGrande(total)
+    return total
+
+
+# ===============================
+# Linha de comando
+# ===============================
+def main(argumentos=None):
+    """python exportacao.py <map_id> geojson|kml|csv|parquet [arquivo de saída] [--somente-visiveis]"""
+    from estado import carregar_mapa
+
+    parser = argparse.ArgumentParser(description="Exporta um mapa do pontos.db")
+    parser.add_argument("map_id")
+    parser.add_argument("formato", choices=list(FORMATOS))
+    parser.add_argument("saida", nargs="?", help="arquivo de saída (padrão: saída padrão)")
+    parser.add_argument("--somente-visiveis", action="store_true", help="exporta só os pontos visíveis")
+    args = parser.parse_args(argumentos)
+
+    pontos, _, _ = carregar_mapa(args.map_id)
+    if pontos is None:
+        parser.error(f"Mapa não encontrado: {args.map_id}")
+    if args.somente_visiveis:
+        pontos = [p for p in pontos if p.get("visivel", True)]
+    if args.saida:
+        with open(args.saida, "wb") as destino:
+            gravar_exportacao(pontos, args.formato, destino)
+    else:
+        gravar_exportacao(pontos, args.formato, sys.stdout.buffer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
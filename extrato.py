@@ -0,0 +1,275 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from openpyxl import load_workbook
+
+
+# ===============================
+# Padrões do extrato VIVO
+# ===============================
+# Compilados uma única vez para o caminho escalar
+PADRAO_LATITUDE = re.compile(r'LATITUDE\s+([\d\-\.]+)')
+PADRAO_LONGITUDE = re.compile(r'LONGITUDE\s+([\d\-\.]+)')
+PADRAO_AZIMUTE = re.compile(r'AZIMUTE\s+(\d+)')
+
+# Versões para o caminho vetorizado. Rodam sobre strings Arrow (RE2, em C++),
+# que exigem grupos nomeados; em séries object o str.extract é um laço Python.
+PADRAO_LATITUDE_COLUNA = r'LATITUDE\s+(?P<lat>[\d\-\.]+)'
+PADRAO_LONGITUDE_COLUNA = r'LONGITUDE\s+(?P<lng>[\d\-\.]+)'
+PADRAO_AZIMUTE_COLUNA = r'AZIMUTE\s+(?P<azimute>\d+)'
+
+# Coordenada sem sinal aceita: decimal (GG.gg) ou GMS (GG-MM-SS.ss)
+PADRAO_COORDENADA_VALIDA = r'\d+(?:\.\d*)?(?:-\d+(?:\.\d*)?-\d+(?:\.\d*)?)?'
+
+TIPO_TEXTO = pd.ArrowDtype(pa.string())
+
+# Posições no extrato VIVO (1-based, como no Excel). A linha 1 é o cabeçalho,
+# então a linha 3 equivale a df.iloc[1] e a linha 7 a df.iloc[5] no pandas.
+CELULA_OPERADORA = (3, 2)
+LINHA_INICIO_DADOS = 7
+COLUNA_DATA = 7
+COLUNA_HORA = 8
+COLUNA_ENDERECO = 18
+
+# Linhas lidas do XLSX antes de cada extração vetorizada (abaixo de ~10k linhas
+# a versão vetorizada não compensa)
+TAMANHO_BLOCO = 20_000
+
+# Linhas lidas entre duas chamadas de progresso, independente do tamanho do bloco
+INTERVALO_PROGRESSO = 2_000
+
+# Versão do parser VIVO; incrementar ao mudar o formato das torres geradas,
+# invalidando os resultados guardados em cache
+VERSAO_PARSER_VIVO = 1
+
+# Valores padrão das torres importadas
+MARGEM_PADRAO = 120
+DISTANCIA_PADRAO = 1500
+
+
+# ===============================
+# Caminho escalar (um texto por vez)
+# ===============================
+def extrair_coordenadas_vivo(texto):
+    try:
+        # Extraindo os valores
+        latitude = PADRAO_LATITUDE.search(texto)
+        longitude = PADRAO_LONGITUDE.search(texto)
+        azimute = PADRAO_AZIMUTE.search(texto)
+
+        # Convertendo para os formatos apropriados
+        lat = latitude.group(1) if latitude else None
+        lon = longitude.group(1) if longitude else None
+        az = azimute.group(1) if azimute else None
+
+        lat_conv = converter_graus_decimal_vivo(lat)
+        lon_conv = converter_graus_decimal_vivo(lon)
+
+        return lat_conv, lon_conv, az
+
+    except Exception:
+        return None, None, None
+
+def converter_graus_decimal_vivo(coord):
+    if not coord or pd.isna(coord):
+        return None
+
+    try:
+        # Remove o sinal negativo se existir e processa
+        negativo = False
+        if coord.startswith('-'):
+            negativo = True
+            coord = coord[1:]
+
+        # Divide os componentes
+        partes = coord.split('-')
+        if len(partes) == 3:
+            graus = float(partes[0])
+            minutos = float(partes[1])
+            segundos = float(partes[2])
+
+            # Calcula decimal
+            decimal = graus + (minutos / 60) + (segundos / 3600)
+        else:
+            decimal = float(coord)  # Se já estiver em formato decimal
+
+        # Aplica sinal negativo se necessário
+        if negativo:
+            decimal = -decimal
+
+        return round(decimal, 6)
+
+    except Exception:
+        return None
+
+
+# ===============================
+# Caminho vetorizado (coluna inteira)
+# ===============================
+def _como_texto(serie: pd.Series) -> pd.Series:
+    """Converte uma coluna lida do Excel para strings Arrow, preservando os nulos"""
+    serie = serie.astype(object)
+    return serie.where(serie.isna(), serie.astype(str)).astype(TIPO_TEXTO)
+
+def _como_float(serie: pd.Series) -> np.ndarray:
+    # Cast direto no Arrow: evita passar por um array object intermediário
+    valores = pa.array(serie, from_pandas=True).cast(pa.float64())
+    return valores.to_numpy(zero_copy_only=False)
+
+def converter_graus_decimal_vetorizado(coords: pd.Series) -> np.ndarray:
+    """Versão vetorizada de converter_graus_decimal_vivo (NaN quando inválida)"""
+    coords = _como_texto(coords)
+    negativo = coords.str.startswith('-').fillna(False).to_numpy(dtype=bool)
+
+    # Descarta antes do split o que não for decimal ou GMS, para o cast não falhar
+    corpo = coords.str.removeprefix('-')
+    validas = corpo.str.fullmatch(PADRAO_COORDENADA_VALIDA).fillna(False)
+    if not validas.any():
+        return np.full(len(coords), np.nan)
+    corpo = corpo.where(validas)
+    partes = corpo.str.split('-', expand=True).reindex(columns=range(3))
+
+    graus = _como_float(partes[0])
+    minutos = np.nan_to_num(_como_float(partes[1]))
+    segundos = np.nan_to_num(_como_float(partes[2]))
+
+    decimal = graus + minutos / 60 + segundos / 3600
+    return np.round(np.where(negativo, -decimal, decimal), 6)
+
+def extrair_coordenadas_vivo_vetorizado(textos: pd.Series) -> pd.DataFrame:
+    """Versão vetorizada de extrair_coordenadas_vivo para uma coluna inteira"""
+    textos = _como_texto(textos)
+
+    lat = textos.str.extract(PADRAO_LATITUDE_COLUNA)["lat"]
+    lng = textos.str.extract(PADRAO_LONGITUDE_COLUNA)["lng"]
+    azimute = textos.str.extract(PADRAO_AZIMUTE_COLUNA)["azimute"]
+
+    return pd.DataFrame({
+        "lat": converter_graus_decimal_vetorizado(lat),
+        "lng": converter_graus_decimal_vetorizado(lng),
+        "azimute": _como_float(azimute),
+    }, index=textos.index)
+
+def processar_extrato(coords: pd.DataFrame, data: pd.Series, hora: pd.Series,
+                      margem=MARGEM_PADRAO, distancia=DISTANCIA_PADRAO) -> list:
+    """Gera os registros de torre a partir das coordenadas (lat, lng, azimute) já extraídas"""
+    coords = coords.reset_index(drop=True)
+    data = data.reset_index(drop=True)
+    hora = hora.reset_index(drop=True)
+
+    validos = (
+        coords["lat"].notna() & coords["lng"].notna() & coords["azimute"].notna()
+        & data.notna() & hora.notna()
+    ).to_numpy()
+    if not validos.any():
+        return []
+
+    nomes = data[validos].astype(str) + ' - ' + hora[validos].astype(str)
+    return [
+        {
+            "lat": lat,
+            "lng": lng,
+            "nome": nome,
+            "visivel": True,
+            "margem": margem,
+            "azimute": azimute,
+            "distancia": distancia,
+            "tipo": "torre"
+        }
+        for lat, lng, azimute, nome in zip(
+            coords["lat"].to_numpy()[validos].tolist(),
+            coords["lng"].to_numpy()[validos].tolist(),
+            coords["azimute"].to_numpy()[validos].astype(int).tolist(),
+            nomes.tolist(),
+        )
+    ]
+
+def processar_extrato_vivo(endereco: pd.Series, data: pd.Series, hora: pd.Series) -> list:
+    """Gera os registros de torre de um extrato VIVO em uma única passada"""
+    coords = extrair_coordenadas_vivo_vetorizado(endereco.reset_index(drop=True))
+    return processar_extrato(coords, data, hora)
+
+
+# ===============================
+# Leitura do XLSX em streaming
+# ===============================
+def abrir_planilha(arquivo):
+    """Abre o XLSX em modo somente leitura (linhas lidas sob demanda).
+
+    Uma importação abre o arquivo uma única vez e passa a mesma aba (wb[aba])
+    para a detecção, a estimativa de linhas e a leitura em blocos; quem abre
+    fecha com wb.close().
+    """
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+    return load_workbook(arquivo, read_only=True, data_only=True)
+
+def listar_abas(arquivo) -> list:
+    """Lista as abas lendo apenas os metadados do workbook"""
+    wb = abrir_planilha(arquivo)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+def ler_amostra(planilha, linhas, colunas) -> list:
+    """Lê só o canto superior esquerdo da aba (linhas x colunas), para detectar o formato"""
+    return [
+        tuple(linha)
+        for linha in planilha.iter_rows(min_row=1, max_row=linhas, max_col=colunas, values_only=True)
+    ]
+
+def estimar_total_linhas(planilha, linha_inicio=LINHA_INICIO_DADOS):
+    """Total de linhas de dados pela dimensão declarada na aba (None se ausente)"""
+    max_row = planilha.max_row
+    return max(0, max_row - linha_inicio + 1) if max_row else None
+
+def ler_extrato_em_blocos(planilha, colunas, linha_inicio, processar,
+                          tamanho_bloco=TAMANHO_BLOCO, progresso=None):
+    """Percorre a aba em streaming e gera as torres em blocos de até tamanho_bloco linhas.
+
+    colunas mapeia cada campo à sua coluna (1-based, como no Excel); cada bloco
+    é entregue a processar(campo -> pd.Series). Se informado,
+    progresso(linhas_lidas) é chamado a cada INTERVALO_PROGRESSO linhas lidas e
+    no fim; uma exceção lançada por ele interrompe a leitura no meio do bloco
+    (é assim que as importações são canceladas).
+    """
+    # Só o intervalo de colunas usado; as demais nem são materializadas
+    primeira, ultima = min(colunas.values()), max(colunas.values())
+    linhas = planilha.iter_rows(
+        min_row=linha_inicio,
+        min_col=primeira,
+        max_col=ultima,
+        values_only=True,
+    )
+    posicoes = {campo: coluna - primeira for campo, coluna in colunas.items()}
+    i_ultima = ultima - primeira
+
+    def bloco_pronto(valores):
+        return processar({campo: pd.Series(lista, dtype=object) for campo, lista in valores.items()})
+
+    linhas_lidas = 0
+    valores = {campo: [] for campo in colunas}
+    quantidade = 0
+    for linha in linhas:
+        linhas_lidas += 1
+        if progresso and linhas_lidas % INTERVALO_PROGRESSO == 0:
+            progresso(linhas_lidas)
+        if len(linha) <= i_ultima:
+            continue
+        for campo, i in posicoes.items():
+            valores[campo].append(linha[i])
+        quantidade += 1
+
+        if quantidade >= tamanho_bloco:
+            yield bloco_pronto(valores)
+            valores = {campo: [] for campo in colunas}
+            quantidade = 0
+
+    if progresso:
+        progresso(linhas_lidas)
+    if quantidade:
+        yield bloco_pronto(valores)
@@ -0,0 +1,194 @@
+import math
+import threading
+
+import numpy as np
+
+from collections import OrderedDict
+
+
+# ===============================
+# Configurações
+# ===============================
+# Raio médio da Terra (m), usado na fórmula do ponto de destino sobre a esfera
+RAIO_TERRA = 6_371_008.8
+
+# Vértices do contorno dos círculos (1 a cada 10 graus)
+PONTOS_CIRCULO = 36
+
+# Arco dos setores: 1 vértice a cada 2 graus, no mínimo 10
+GRAUS_POR_PONTO_SETOR = 2
+MINIMO_PONTOS_SETOR = 10
+
+# Coordenadas enviadas ao navegador em micrograus inteiros (~0,1 m), que
+# serializam em JSON bem mais rápido e menor que floats
+ESCALA_COORDENADA = 1_000_000
+
+MAXIMO_FORMAS_EM_CACHE = 100_000
+
+
+def _numero(valor):
+    """float do valor (número ou texto dos formulários), ou None se não for finito"""
+    if isinstance(valor, bool) or valor is None:
+        return None
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if math.isfinite(numero) else None
+
+
+# ===============================
+# Cálculo vetorizado
+# ===============================
+def destinos(lat, lng, rumos, distancias):
+    """Pontos de destino a partir de (lat, lng) seguindo cada rumo pela distância dada.
+
+    lat, lng e distancias têm forma (n,); rumos (em graus) tem forma (n, k).
+    Retorna (lat, lng) em graus, ambos com forma (n, k).
+    """
+    phi1 = np.radians(lat)[:, None]
+    lambda1 = np.radians(lng)[:, None]
+    delta = (np.asarray(distancias, dtype=float) / RAIO_TERRA)[:, None]
+    theta = np.radians(rumos)
+
+    sin_phi1, cos_phi1 = np.sin(phi1), np.cos(phi1)
+    sin_delta, cos_delta = np.sin(delta), np.cos(delta)
+
+    sin_phi2 = sin_phi1 * cos_delta + cos_phi1 * sin_delta * np.cos(theta)
+    phi2 = np.arcsin(np.clip(sin_phi2, -1.0, 1.0))
+    lambda2 = lambda1 + np.arctan2(np.sin(theta) * sin_delta * cos_phi1, cos_delta - sin_phi1 * sin_phi2)
+
+    # Normaliza a longitude para [-180, 180)
+    lng2 = (np.degrees(lambda2) + 540.0) % 360.0 - 180.0
+    return np.degrees(phi2), lng2
+
+
+def _empacotar(lat, lng):
+    """(n, k) + (n, k) -> lista de n anéis planos [lat, lng, lat, lng, ...] em micrograus"""
+    coordenadas = np.rint(np.stack([lat, lng], axis=-1) * ESCALA_COORDENADA).astype(np.int64)
+    return coordenadas.reshape(len(coordenadas), -1).tolist()
+
+
+def aneis_setores(lat, lng, azimute, margem, distancia):
+    """Contornos dos setores (centro + arco + centro) e a ponta da linha do azimute.
+
+    Todos os argumentos são arrays (n,). Setores com a mesma quantidade de
+    vértices no arco são calculados juntos em uma única passada.
+    """
+    lat, lng = np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)
+    azimute, margem = np.asarray(azimute, dtype=float), np.asarray(margem, dtype=float)
+    distancia = np.asarray(distancia, dtype=float)
+
+    n = len(lat)
+    aneis = [None] * n
+    pontas = [None] * n
+    if n == 0:
+        return aneis, pontas
+
+    pontos_arco = np.maximum(MINIMO_PONTOS_SETOR, np.ceil(margem / GRAUS_POR_PONTO_SETOR)).astype(int)
+    for k in np.unique(pontos_arco):
+        grupo = np.flatnonzero(pontos_arco == k)
+        passo = margem[grupo] / k
+        rumos = (azimute[grupo] - margem[grupo] / 2)[:, None] + np.arange(k + 1) * passo[:, None]
+        # A última coluna é o rumo do azimute, para a linha central
+        rumos = np.concatenate([rumos, azimute[grupo][:, None]], axis=1)
+        lat_arco, lng_arco = destinos(lat[grupo], lng[grupo], rumos, distancia[grupo])
+
+        centro_lat, centro_lng = lat[grupo][:, None], lng[grupo][:, None]
+        anel_lat = np.concatenate([centro_lat, lat_arco[:, :-1], centro_lat], axis=1)
+        anel_lng = np.concatenate([centro_lng, lng_arco[:, :-1], centro_lng], axis=1)
+
+        for i, anel, ponta in zip(grupo, _empacotar(anel_lat, anel_lng), _empacotar(lat_arco[:, -1:], lng_arco[:, -1:])):
+            aneis[i] = anel
+            pontas[i] = ponta
+    return aneis, pontas
+
+
+def aneis_circulos(lat, lng, raio):
+    """Contornos fechados dos círculos, todos em uma única passada"""
+    lat, lng = np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)
+    if len(lat) == 0:
+        return []
+    rumos = np.broadcast_to(np.linspace(0.0, 360.0, PONTOS_CIRCULO + 1), (len(lat), PONTOS_CIRCULO + 1))
+    return _empacotar(*destinos(lat, lng, rumos, raio))
+
+
+# ===============================
+# Cache de formas
+# ===============================
+class CacheGeometria:
+    """LRU de formas já calculadas, indexadas pelos parâmetros que as definem.
+
+    Os anéis guardados são compartilhados entre sessões e não devem ser alterados.
+    """
+
+    def __init__(self, maximo_formas=MAXIMO_FORMAS_EM_CACHE):
+        self.maximo_formas = maximo_formas
+        self._entradas = OrderedDict()  # chave -> forma
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            forma = self._entradas.get(chave)
+            if forma is not None:
+                self._entradas.move_to_end(chave)
+            return forma
+
+    def guardar(self, chave, forma):
+        with self._trava:
+            self._entradas[chave] = forma
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.maximo_formas:
+                self._entradas.popitem(last=False)
+
+
+_cache_geometria = CacheGeometria()
+
+
+def _chave_forma(ponto):
+    """Parâmetros que definem a forma do ponto, ou None se ele não tiver forma válida"""
+    tipo = ponto.get("tipo", "ponto")
+    if tipo == "torre":
+        campos = ("lat", "lng", "azimute", "margem", "distancia")
+    elif tipo == "circulo":
+        campos = ("lat", "lng", "raio")
+    else:
+        return None
+    valores = tuple(_numero(ponto.get(campo)) for campo in campos)
+    if None in valores or valores[-1] <= 0:
+        return None
+    return (tipo,) + valores
+
+
+def preparar_geometria(pontos, cache=_cache_geometria) -> list:
+    """Cópias dos pontos com os contornos prontos para desenhar.
+
+    Torres recebem "anel" (setor) e "ponta" (fim da linha do azimute); círculos
+    recebem "anel". Ambos são listas planas [lat, lng, ...] em micrograus. Só as formas que ainda não estão no cache são calculadas,
+    em lote. Pontos com parâmetros inválidos seguem sem forma.
+    """
+    chaves = [_chave_forma(ponto) for ponto in pontos]
+    formas = {}
+    faltando = {"torre": [], "circulo": []}
+    for chave in chaves:
+        if chave is None or chave in formas:
+            continue
+        forma = cache.obter(chave)
+        formas[chave] = forma
+        if forma is None:
+            faltando[chave[0]].append(chave)
+
+    if faltando["torre"]:
+        colunas = np.array([chave[1:] for chave in faltando["torre"]], dtype=float)
+        aneis, pontas = aneis_setores(*colunas.T)
+        for chave, anel, ponta in zip(faltando["torre"], aneis, pontas):
+            formas[chave] = {"anel": anel, "ponta": ponta}
+            cache.guardar(chave, formas[chave])
+
+    if faltando["circulo"]:
+        colunas = np.array([chave[1:] for chave in faltando["circulo"]], dtype=float)
+        for chave, anel in zip(faltando["circulo"], aneis_circulos(*colunas.T)):
+            formas[chave] = {"anel": anel}
+            cache.guardar(chave, formas[chave])
+
+    return [dict(ponto, **formas[chave]) if chave is not None else dict(ponto) for ponto, chave in zip(pontos, chaves)]
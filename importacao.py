@@ -0,0 +1,363 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from io import BytesIO
+
+from cache_extrato import cache_extratos
+from estado import novo_ponto_id
+from eventos import VERSAO_AGREGACAO, AgregadorTorres, agregar_torres, total_eventos
+from extrato import TAMANHO_BLOCO, abrir_planilha, listar_abas
+from operadoras import detectar_operadora, parsers_registrados, versao_parsers
+
+
+# ===============================
+# Configurações
+# ===============================
+# Pool compartilhado por todas as sessões do servidor
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="importacao")
+
+# Tarefas em andamento, indexadas pela chave (arquivo + aba)
+_tarefas = {}
+_trava = threading.Lock()
+
+# Pool de processos das importações em lote, criado no primeiro uso. "spawn"
+# evita herdar por fork as threads do servidor.
+PROCESSOS_LOTE = os.cpu_count() or 2
+_processos = None
+_trava_processos = threading.Lock()
+
+
+def _pool_processos():
+    global _processos
+    with _trava_processos:
+        if _processos is None:
+            _processos = ProcessPoolExecutor(
+                max_workers=PROCESSOS_LOTE, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _processos
+
+
+def _descartar_pool(pool):
+    """Esquece um pool quebrado (processo morto); o próximo lote cria outro"""
+    global _processos
+    with _trava_processos:
+        if _processos is pool:
+            _processos = None
+
+
+def digest_arquivo(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+def chave_importacao(digest: str, aba: str) -> str:
+    """Chave da importação: SHA-256 do arquivo, nome da aba e versões dos parsers e da agregação"""
+    return f"extrato-{versao_parsers()}-agregado{VERSAO_AGREGACAO}:{digest}:{aba}"
+
+def listar_abas_extrato(dados: bytes, digest: str = None) -> list:
+    """Lista as abas do arquivo, consultando o cache antes de abrir o XLSX"""
+    chave = f"abas:{digest or digest_arquivo(dados)}"
+    abas = cache_extratos.obter(chave)
+    if abas is None:
+        abas = listar_abas(BytesIO(dados))
+        cache_extratos.guardar(chave, abas)
+    return abas
+
+
+# ===============================
+# Tarefa de importação
+# ===============================
+class ImportacaoCancelada(Exception):
+    """Lançada pelo callback de progresso para interromper a leitura da aba"""
+
+
+def _agregar_blocos(blocos, cancelar=None) -> list:
+    """Torres dos blocos agregadas por setor à medida que chegam.
+
+    Cada bloco é descartado depois de agregado: fica em memória um modelo por
+    setor e os nomes dos eventos, nunca as torres de todas as linhas da aba.
+    """
+    agregador = AgregadorTorres()
+    for bloco in blocos:
+        agregador.adicionar(bloco)
+        del bloco  # solto antes de o próximo bloco ser lido
+        if cancelar is not None and cancelar.is_set():
+            raise ImportacaoCancelada
+    return agregador.registros()
+
+
+class TarefaImportacao:
+    """Importação de uma aba de extrato rodando em segundo plano"""
+
+    def __init__(self, chave, dados, aba):
+        self.chave = chave
+        self.aba = aba
+        self.status = "executando"  # executando | concluida | cancelada | erro
+        self.linhas_lidas = 0
+        self.total_linhas = None
+        self.torres = []
+        self.operadora = None
+        self.erro = None
+        self._dados = dados
+        self._cancelar = threading.Event()
+
+    @property
+    def progresso(self) -> float:
+        """Fração de linhas lidas (0 a 1); 0 enquanto o total é desconhecido"""
+        if self.status != "executando":
+            return 1.0
+        if not self.total_linhas:
+            return 0.0
+        return min(1.0, self.linhas_lidas / self.total_linhas)
+
+    @property
+    def descricao(self) -> str:
+        return f"Importando '{self.aba}': {self.linhas_lidas} linhas lidas"
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def resultado(self) -> list:
+        """Cópia das torres importadas, segura para edição na sessão e com ids novos.
+
+        Cada torre recebe também o "lote" da importação, usado para agrupá-las na lista.
+        """
+        lote = f"{self.aba} ({datetime.now():%d/%m %H:%M})"
+        return [dict(torre, id=novo_ponto_id(), lote=lote) for torre in self.torres]
+
+    def _atualizar_progresso(self, linhas_lidas):
+        # Chamado durante a leitura, entre blocos e dentro deles: o cancelamento
+        # responde sem esperar o bloco inteiro
+        if self._cancelar.is_set():
+            raise ImportacaoCancelada
+        self.linhas_lidas = linhas_lidas
+
+    def _executar(self):
+        try:
+            # Aberto uma única vez: detecção, estimativa e leitura usam a mesma aba
+            wb = abrir_planilha(BytesIO(self._dados))
+            try:
+                planilha = wb[self.aba]
+                parser = detectar_operadora(planilha)
+                if parser is None:
+                    suportadas = ", ".join(p.nome for p in parsers_registrados())
+                    raise ValueError(
+                        "Operadora não reconhecida ou extrato não compatível "
+                        f"(operadoras suportadas: {suportadas})"
+                    )
+                self.operadora = parser.nome
+
+                self.total_linhas = parser.estimar_total_linhas(planilha)
+
+                # Uma torre por setor, com os eventos (ligações) agregados
+                blocos = parser.ler_em_blocos(
+                    planilha,
+                    tamanho_bloco=TAMANHO_BLOCO,
+                    progresso=self._atualizar_progresso,
+                )
+                torres = _agregar_blocos(blocos, self._cancelar)
+            finally:
+                wb.close()
+            cache_extratos.guardar(self.chave, torres)
+
+            # Publica o resultado inteiro de uma vez
+            self.torres = torres
+            self.status = "concluida"
+        except ImportacaoCancelada:
+            self.status = "cancelada"
+        except Exception as e:
+            self.erro = str(e)
+            self.status = "erro"
+        finally:
+            self._dados = None
+            with _trava:
+                if _tarefas.get(self.chave) is self:
+                    del _tarefas[self.chave]
+
+
+def iniciar_importacao(dados: bytes, aba: str, digest: str = None) -> TarefaImportacao:
+    """Dispara a importação no pool, reaproveitando o cache ou uma tarefa igual em andamento"""
+    chave = chave_importacao(digest or digest_arquivo(dados), aba)
+
+    # Extrato já processado: devolve a tarefa concluída sem abrir o XLSX
+    torres = cache_extratos.obter(chave)
+    if torres is not None:
+        tarefa = TarefaImportacao(chave, None, aba)
+        tarefa.torres = torres
+        tarefa.status = "concluida"
+        return tarefa
+
+    with _trava:
+        tarefa = _tarefas.get(chave)
+        if tarefa is None or tarefa._cancelar.is_set():
+            tarefa = TarefaImportacao(chave, dados, aba)
+            _tarefas[chave] = tarefa
+            _executor.submit(tarefa._executar)
+    return tarefa
+
+
+# ===============================
+# Importação em lote
+# ===============================
+def expandir_arquivos(arquivos):
+    """[(nome, bytes)] de XLSX e ZIP -> [(nome, bytes)] só de XLSX, abrindo os ZIPs"""
+    planilhas = []
+    for nome, dados in arquivos:
+        if nome.lower().endswith(".zip"):
+            with zipfile.ZipFile(BytesIO(dados)) as zf:
+                for info in zf.infolist():
+                    base = os.path.basename(info.filename)
+                    if info.is_dir() or not base.lower().endswith(".xlsx") or base.startswith(("~$", ".")):
+                        continue
+                    planilhas.append((f"{nome}/{info.filename}", zf.read(info)))
+        elif nome.lower().endswith(".xlsx"):
+            planilhas.append((nome, dados))
+    return planilhas
+
+
+def _processar_aba(dados, aba):
+    """Executada nos processos do pool: (operadora, torres, segundos) de uma aba.
+
+    Abas de formato desconhecido retornam operadora None e nenhuma torre.
+    """
+    inicio = time.perf_counter()
+    wb = abrir_planilha(BytesIO(dados))
+    try:
+        planilha = wb[aba]
+        parser = detectar_operadora(planilha)
+        if parser is None:
+            return None, [], time.perf_counter() - inicio
+        torres = _agregar_blocos(parser.ler_em_blocos(planilha, tamanho_bloco=TAMANHO_BLOCO))
+    finally:
+        wb.close()
+    return parser.nome, torres, time.perf_counter() - inicio
+
+
+class TarefaLote:
+    """Importação de todas as abas de vários arquivos, em paralelo nos processos do pool.
+
+    relatorio tem uma entrada por aba (ou por arquivo ilegível) com operadora,
+    torres, tempo e erro. As torres do lote saem agregadas por setor, com os
+    eventos repetidos entre abas e arquivos contados uma vez só.
+    """
+
+    def __init__(self, arquivos):
+        self.status = "executando"  # executando | concluida | cancelada | erro
+        self.total_abas = None
+        self.abas_concluidas = 0
+        self.relatorio = []
+        self.torres = []
+        self.repetidas = 0
+        self.segundos = None
+        self.erro = None
+        self._arquivos = arquivos
+        self._cancelar = threading.Event()
+
+    @property
+    def progresso(self) -> float:
+        if self.status != "executando":
+            return 1.0
+        if not self.total_abas:
+            return 0.0
+        return self.abas_concluidas / self.total_abas
+
+    @property
+    def descricao(self) -> str:
+        return f"Importando lote: {self.abas_concluidas} de {self.total_abas or '?'} abas"
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def resultado(self) -> list:
+        """Cópia das torres do lote, com ids novos e o "lote" usado para agrupá-las"""
+        arquivos = len({r["arquivo"] for r in self.relatorio})
+        lote = f"Lote com {arquivos} arquivo(s) ({datetime.now():%d/%m %H:%M})"
+        return [dict(torre, id=novo_ponto_id(), lote=lote) for torre in self.torres]
+
+    def _registrar(self, arquivo, aba, operadora=None, torres=0, segundos=0.0, erro=None):
+        self.relatorio.append({
+            "arquivo": arquivo, "aba": aba, "operadora": operadora,
+            "torres": torres, "segundos": round(segundos, 3), "erro": erro,
+        })
+
+    def _executar(self):
+        inicio = time.perf_counter()
+        try:
+            # Abas de cada arquivo; as já processadas vêm direto do cache
+            resultados = {}  # (arquivo, aba) -> torres
+            pendentes = []   # (arquivo, aba, chave, dados)
+            ordem = []       # (arquivo, aba) na ordem dos arquivos, para um resultado estável
+            for arquivo, dados in expandir_arquivos(self._arquivos):
+                digest = digest_arquivo(dados)
+                try:
+                    abas = listar_abas_extrato(dados, digest)
+                except Exception as e:
+                    ordem.append((arquivo, None))
+                    self._registrar(arquivo, None, erro=f"Arquivo ilegível: {e}")
+                    continue
+                for aba in abas:
+                    ordem.append((arquivo, aba))
+                    chave = chave_importacao(digest, aba)
+                    torres = cache_extratos.obter(chave)
+                    if torres is not None:
+                        resultados[(arquivo, aba)] = torres
+                        self._registrar(arquivo, aba, "cache", len(torres))
+                    else:
+                        pendentes.append((arquivo, aba, chave, dados))
+            self._arquivos = None
+            self.total_abas = len(resultados) + len(pendentes)
+            self.abas_concluidas = len(resultados)
+
+            pool = _pool_processos()
+            futuros = {pool.submit(_processar_aba, dados, aba): (arquivo, aba, chave)
+                       for arquivo, aba, chave, dados in pendentes}
+            pendentes = None
+            while futuros:
+                if self._cancelar.is_set():
+                    for futuro in futuros:
+                        futuro.cancel()
+                    self.status = "cancelada"
+                    return
+                prontos, _ = wait(futuros, timeout=0.5, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    arquivo, aba, chave = futuros.pop(futuro)
+                    self.abas_concluidas += 1
+                    try:
+                        operadora, torres, segundos = futuro.result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            _descartar_pool(pool)
+                        self._registrar(arquivo, aba, erro=str(e))
+                        continue
+                    if operadora is None:
+                        self._registrar(arquivo, aba, segundos=segundos, erro="Operadora não reconhecida")
+                        continue
+                    # O cache é gravado só aqui, no processo do servidor
+                    cache_extratos.guardar(chave, torres)
+                    resultados[(arquivo, aba)] = torres
+                    self._registrar(arquivo, aba, operadora, len(torres), segundos)
+
+            todas = [torre for chave in ordem for torre in resultados.get(chave, [])]
+            posicao = {chave: i for i, chave in enumerate(ordem)}
+            self.relatorio.sort(key=lambda r: posicao.get((r["arquivo"], r["aba"]), -1))
+            self.torres = agregar_torres(todas)
+            self.repetidas = total_eventos(todas) - total_eventos(self.torres)
+            self.status = "concluida"
+        except Exception as e:
+            self.erro = str(e)
+            self.status = "erro"
+        finally:
+            self._arquivos = None
+            self.segundos = time.perf_counter() - inicio
+
+
+def iniciar_lote(arquivos) -> TarefaLote:
+    """Dispara a importação em lote de [(nome, bytes)] de arquivos XLSX e ZIP"""
+    tarefa = TarefaLote(list(arquivos))
+    _executor.submit(tarefa._executar)
+    return tarefa
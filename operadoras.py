@@ -0,0 +1,122 @@
+from extrato import (
+    CELULA_OPERADORA,
+    COLUNA_DATA,
+    COLUNA_ENDERECO,
+    COLUNA_HORA,
+    DISTANCIA_PADRAO,
+    LINHA_INICIO_DADOS,
+    MARGEM_PADRAO,
+    VERSAO_PARSER_VIVO,
+    estimar_total_linhas,
+    extrair_coordenadas_vivo_vetorizado,
+    ler_amostra,
+    ler_extrato_em_blocos,
+    processar_extrato,
+)
+
+
+# ===============================
+# Configurações
+# ===============================
+# Tamanho da amostra lida do topo de cada aba para detectar a operadora
+LINHAS_AMOSTRA = 10
+COLUNAS_AMOSTRA = 30
+
+
+# ===============================
+# Parsers de operadora
+# ===============================
+class ParserOperadora:
+    """Formato do extrato de uma operadora: como reconhecê-lo e como ler suas torres.
+
+    detectar(amostra): recebe as primeiras linhas da aba (tuplas de valores) e
+        diz se o extrato é desta operadora.
+    colunas: campo -> coluna (1-based, como no Excel); "data" e "hora" são
+        obrigatórios, os demais são repassados a extrair_coordenadas.
+    extrair_coordenadas(colunas): recebe campo -> pd.Series e retorna um
+        DataFrame com lat, lng e azimute (NaN quando inválidos).
+    versao: incrementar ao mudar as torres geradas, invalidando o cache.
+    """
+
+    def __init__(self, nome, versao, detectar, colunas, linha_inicio, extrair_coordenadas,
+                 margem=MARGEM_PADRAO, distancia=DISTANCIA_PADRAO):
+        if "data" not in colunas or "hora" not in colunas:
+            raise ValueError(f"Parser {nome}: as colunas 'data' e 'hora' são obrigatórias")
+        self.nome = nome
+        self.versao = versao
+        self.detectar = detectar
+        self.colunas = dict(colunas)
+        self.linha_inicio = linha_inicio
+        self.extrair_coordenadas = extrair_coordenadas
+        self.margem = margem
+        self.distancia = distancia
+
+    def processar(self, colunas) -> list:
+        """Torres de um bloco de linhas (campo -> pd.Series)"""
+        coords = self.extrair_coordenadas(colunas)
+        return processar_extrato(coords, colunas["data"], colunas["hora"], self.margem, self.distancia)
+
+    def estimar_total_linhas(self, planilha):
+        return estimar_total_linhas(planilha, self.linha_inicio)
+
+    def ler_em_blocos(self, planilha, tamanho_bloco, progresso=None):
+        return ler_extrato_em_blocos(
+            planilha, self.colunas, self.linha_inicio, self.processar,
+            tamanho_bloco=tamanho_bloco, progresso=progresso,
+        )
+
+
+# ===============================
+# Registro
+# ===============================
+# Em ordem de registro; a detecção usa o primeiro que reconhecer a amostra
+_parsers = {}
+
+
+def registrar_parser(parser: ParserOperadora):
+    _parsers[parser.nome] = parser
+    return parser
+
+
+def parsers_registrados() -> list:
+    return list(_parsers.values())
+
+
+def versao_parsers() -> str:
+    """Identifica o conjunto de parsers (nomes + versões), para compor chaves de cache"""
+    return "+".join(f"{p.nome.lower()}{p.versao}" for p in _parsers.values())
+
+
+def detectar_parser(amostra):
+    """Primeiro parser que reconhece a amostra, ou None"""
+    for parser in _parsers.values():
+        try:
+            if parser.detectar(amostra):
+                return parser
+        except (IndexError, TypeError, ValueError):
+            continue
+    return None
+
+
+def detectar_operadora(planilha):
+    """Detecta o parser da aba (já aberta) lendo só uma amostra do topo"""
+    return detectar_parser(ler_amostra(planilha, LINHAS_AMOSTRA, COLUNAS_AMOSTRA))
+
+
+# ===============================
+# VIVO
+# ===============================
+def _detectar_vivo(amostra):
+    linha, coluna = CELULA_OPERADORA
+    valor = amostra[linha - 1][coluna - 1]
+    return valor is not None and "VIVO" in str(valor).upper()
+
+
+VIVO = registrar_parser(ParserOperadora(
+    nome="VIVO",
+    versao=VERSAO_PARSER_VIVO,
+    detectar=_detectar_vivo,
+    colunas={"data": COLUNA_DATA, "hora": COLUNA_HORA, "endereco": COLUNA_ENDERECO},
+    linha_inicio=LINHA_INICIO_DADOS,
+    extrair_coordenadas=lambda colunas: extrair_coordenadas_vivo_vetorizado(colunas["endereco"]),
+))
@@ -0,0 +1,51 @@
+import re
+
+import numpy as np
+
+from tabela_pontos import ColunasPontos
+
+
+# ===============================
+# Seleção de pontos para ações em massa
+# ===============================
+def selecionar_indices(pontos, tipos=None, padrao=None, limites=None, indices=None, colunas=None):
+    """Índices dos pontos que atendem a todos os critérios informados.
+
+    tipos: conjunto de tipos aceitos ("ponto", "torre", "circulo")
+    padrao: expressão regular buscada no nome (sem diferenciar maiúsculas)
+    limites: (lat_min, lat_max, lng_min, lng_max) do retângulo
+    indices: restringe a busca a estes índices (ex.: a lista já filtrada)
+    colunas: ColunasPontos da lista, se já calculadas
+
+    Tipo e retângulo são máscaras sobre as colunas; só o padrão, que depende
+    do texto, percorre os nomes que sobraram.
+    """
+    regex = re.compile(padrao, re.IGNORECASE) if padrao else None
+    if colunas is None:
+        colunas = ColunasPontos(pontos)
+
+    mascara = np.ones(len(colunas), dtype=bool)
+    if indices is not None:
+        mascara[:] = False
+        mascara[np.asarray(indices, dtype=np.int64)] = True
+    if tipos:
+        mascara &= colunas.dos_tipos(tipos)
+    if limites is not None:
+        mascara &= colunas.na_caixa(*limites)
+
+    selecionados = np.flatnonzero(mascara).tolist()
+    if regex:
+        selecionados = [i for i in selecionados if regex.search(pontos[i].nome)]
+    return selecionados
+
+
+def aplicar_acao(pontos, indices, acao):
+    """Aplica mostrar/ocultar/excluir aos índices e retorna a nova lista de pontos"""
+    if acao == "excluir":
+        remover = set(indices)
+        return [p for i, p in enumerate(pontos) if i not in remover]
+
+    visivel = acao == "mostrar"
+    for i in indices:
+        pontos[i]['visivel'] = visivel
+    return pontos
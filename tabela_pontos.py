@@ -0,0 +1,259 @@
+import logging
+import math
+
+import numpy as np
+
+from collections.abc import MutableMapping
+
+from estado import novo_ponto_id
+
+
+# ===============================
+# Configurações
+# ===============================
+TIPOS = ("ponto", "torre", "circulo")
+TIPO_OUTRO = len(TIPOS)
+_CODIGOS_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+# Uma única string por tipo, compartilhada por todos os pontos
+_TIPOS_UNICOS = {tipo: tipo for tipo in TIPOS}
+
+# Campos sempre presentes, na ordem em que aparecem como dicionário
+CAMPOS_FIXOS = ("id", "lat", "lng", "nome", "visivel", "tipo")
+
+# Parâmetros numéricos opcionais e o menor valor aceito de cada um
+CAMPOS_NUMERICOS = {"margem": 0, "azimute": None, "distancia": 0, "raio": 0}
+
+# Maior margem de um setor (graus)
+MARGEM_MAXIMA = 360
+
+_CAMPOS = CAMPOS_FIXOS + tuple(CAMPOS_NUMERICOS)
+_CONJUNTO_CAMPOS = frozenset(_CAMPOS)
+
+_log = logging.getLogger("mapa.pontos")
+
+
+# ===============================
+# Conversão de tipos
+# ===============================
+def _coordenada(valor, campo, limite):
+    if type(valor) is float and -limite <= valor <= limite:
+        return valor
+    if isinstance(valor, bool):
+        raise ValueError(f"{campo} inválida: {valor!r}")
+    try:
+        numero = float(valor.replace(",", ".") if isinstance(valor, str) else valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo} inválida: {valor!r}") from None
+    if not -limite <= numero <= limite:
+        raise ValueError(f"{campo} fora do intervalo: {valor!r}")
+    return numero
+
+
+def _parametro(valor, campo, estrito):
+    """Número (int se for inteiro) ou None quando vazio; inválidos geram erro só no modo estrito"""
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return None
+    # Caminho rápido: inteiros da importação e dos links, dentro da faixa
+    if type(valor) is int and valor >= (CAMPOS_NUMERICOS[campo] or -2**63) and (campo != "margem" or valor <= MARGEM_MAXIMA):
+        return valor
+    try:
+        if isinstance(valor, bool):
+            raise ValueError
+        numero = float(valor.replace(",", ".") if isinstance(valor, str) else valor)
+        minimo = CAMPOS_NUMERICOS[campo]
+        if not math.isfinite(numero) or (minimo is not None and numero < minimo):
+            raise ValueError
+        if campo == "margem" and numero > MARGEM_MAXIMA:
+            raise ValueError
+    except (TypeError, ValueError):
+        if estrito:
+            raise ValueError(f"{campo} inválido: {valor!r}") from None
+        return None
+    return int(numero) if numero.is_integer() else numero
+
+
+# ===============================
+# Registro de ponto
+# ===============================
+class Ponto(MutableMapping):
+    """Ponto do mapa com campos tipados em __slots__ (bem menor que um dict).
+
+    Continua se comportando como o dicionário de antes (ponto["nome"],
+    ponto.get("raio"), dict(ponto)), mas converte os valores ao receber:
+    lat/lng float, visivel bool, parâmetros numéricos int/float ou ausentes.
+    Campos fora do esquema (ex.: eventos das torres agregadas, lote) ficam
+    em extras.
+    """
+
+    __slots__ = _CAMPOS + ("extras",)
+
+    def __init__(self, dados=(), estrito=False):
+        if not isinstance(dados, dict):
+            dados = dict(dados)
+        self.id = str(dados.get("id") or novo_ponto_id())
+        self.lat = _coordenada(dados.get("lat"), "Latitude", 90)
+        self.lng = _coordenada(dados.get("lng"), "Longitude", 180)
+        nome = dados.get("nome")
+        self.nome = nome if type(nome) is str else "" if nome is None else str(nome)
+        visivel = dados.get("visivel")
+        self.visivel = True if visivel is None else bool(visivel)
+        tipo = dados.get("tipo") or "ponto"
+        self.tipo = _TIPOS_UNICOS.get(tipo) or str(tipo)
+        self.margem = _parametro(dados.get("margem"), "margem", estrito)
+        self.azimute = _parametro(dados.get("azimute"), "azimute", estrito)
+        self.distancia = _parametro(dados.get("distancia"), "distancia", estrito)
+        self.raio = _parametro(dados.get("raio"), "raio", estrito)
+        extras = {campo: valor for campo, valor in dados.items() if campo not in _CONJUNTO_CAMPOS}
+        self.extras = extras or None
+
+    # Interface de dicionário; campos numéricos vazios (None) contam como ausentes
+    def __getitem__(self, campo):
+        if campo in CAMPOS_NUMERICOS:
+            valor = getattr(self, campo)
+            if valor is None:
+                raise KeyError(campo)
+            return valor
+        if campo in CAMPOS_FIXOS:
+            return getattr(self, campo)
+        if self.extras is None:
+            raise KeyError(campo)
+        return self.extras[campo]
+
+    def get(self, campo, padrao=None):
+        if campo in CAMPOS_FIXOS:
+            return getattr(self, campo)
+        if campo in CAMPOS_NUMERICOS:
+            valor = getattr(self, campo)
+            return padrao if valor is None else valor
+        if self.extras is None:
+            return padrao
+        return self.extras.get(campo, padrao)
+
+    def __setitem__(self, campo, valor):
+        if campo == "lat":
+            self.lat = _coordenada(valor, "Latitude", 90)
+        elif campo == "lng":
+            self.lng = _coordenada(valor, "Longitude", 180)
+        elif campo == "visivel":
+            self.visivel = bool(valor)
+        elif campo in ("id", "nome", "tipo"):
+            setattr(self, campo, str(valor))
+        elif campo in CAMPOS_NUMERICOS:
+            setattr(self, campo, _parametro(valor, campo, estrito=False))
+        elif self.extras is None:
+            self.extras = {campo: valor}
+        else:
+            self.extras[campo] = valor
+
+    def __delitem__(self, campo):
+        if campo in CAMPOS_NUMERICOS and getattr(self, campo) is not None:
+            setattr(self, campo, None)
+        elif campo not in CAMPOS_FIXOS and self.extras and campo in self.extras:
+            del self.extras[campo]
+            if not self.extras:
+                self.extras = None
+        else:
+            raise KeyError(campo)
+
+    def __iter__(self):
+        yield from CAMPOS_FIXOS
+        for campo in CAMPOS_NUMERICOS:
+            if getattr(self, campo) is not None:
+                yield campo
+        if self.extras:
+            yield from self.extras
+
+    def __len__(self):
+        return (len(CAMPOS_FIXOS) + sum(getattr(self, c) is not None for c in CAMPOS_NUMERICOS)
+                + len(self.extras or ()))
+
+    def __contains__(self, campo):
+        if campo in CAMPOS_FIXOS:
+            return True
+        if campo in CAMPOS_NUMERICOS:
+            return getattr(self, campo) is not None
+        return bool(self.extras) and campo in self.extras
+
+    def como_dict(self) -> dict:
+        """Dicionário simples do ponto (o mesmo que dict(ponto), sem passar pela interface genérica)"""
+        dados = {"id": self.id, "lat": self.lat, "lng": self.lng, "nome": self.nome,
+                 "visivel": self.visivel, "tipo": self.tipo}
+        for campo in CAMPOS_NUMERICOS:
+            valor = getattr(self, campo)
+            if valor is not None:
+                dados[campo] = valor
+        if self.extras:
+            dados.update(self.extras)
+        return dados
+
+    def __eq__(self, outro):
+        if isinstance(outro, Ponto):
+            outro = outro.como_dict()
+        elif not isinstance(outro, dict):
+            return NotImplemented
+        return self.como_dict() == outro
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Ponto({self.como_dict()!r})"
+
+    def copy(self):
+        return Ponto(self.como_dict())
+
+
+def normalizar_pontos(pontos) -> list:
+    """Lista de Ponto a partir de dicionários (links, banco, importação); Pontos passam direto.
+
+    Pontos com latitude/longitude inválidas são descartados (com aviso no log),
+    para que um registro ruim não impeça de abrir o mapa ou a importação.
+    """
+    normalizados = []
+    for ponto in pontos:
+        if isinstance(ponto, Ponto):
+            normalizados.append(ponto)
+            continue
+        try:
+            normalizados.append(Ponto(ponto))
+        except ValueError as e:
+            _log.warning("Ponto descartado (%s): %r", e, ponto)
+    return normalizados
+
+
+# ===============================
+# Colunas para filtros vetorizados
+# ===============================
+class ColunasPontos:
+    """Colunas NumPy de uma lista de Ponto, para filtros com máscaras em vez de laços.
+
+    Parâmetros ausentes viram NaN; o tipo vira um código (índice em TIPOS,
+    ou TIPO_OUTRO). As colunas são uma foto da lista: refaça ao alterá-la.
+    """
+
+    def __init__(self, pontos):
+        n = len(pontos)
+        self.lat = np.fromiter((p.lat for p in pontos), dtype=float, count=n)
+        self.lng = np.fromiter((p.lng for p in pontos), dtype=float, count=n)
+        self.visivel = np.fromiter((p.visivel for p in pontos), dtype=bool, count=n)
+        self.tipo = np.fromiter((_CODIGOS_TIPO.get(p.tipo, TIPO_OUTRO) for p in pontos), dtype=np.int8, count=n)
+        for campo in CAMPOS_NUMERICOS:
+            valores = (np.nan if (v := getattr(p, campo)) is None else v for p in pontos)
+            setattr(self, campo, np.fromiter(valores, dtype=float, count=n))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def visiveis(self):
+        return self.visivel.copy()
+
+    def dos_tipos(self, tipos):
+        codigos = [_CODIGOS_TIPO.get(tipo, TIPO_OUTRO) for tipo in tipos]
+        return np.isin(self.tipo, codigos)
+
+    def na_caixa(self, lat_min, lat_max, lng_min, lng_max):
+        return (self.lat >= lat_min) & (self.lat <= lat_max) & (self.lng >= lng_min) & (self.lng <= lng_max)
+
+    def setores(self):
+        """(azimute, margem, distancia) das torres; NaN nos demais pontos"""
+        torres = self.tipo == _CODIGOS_TIPO["torre"]
+        return tuple(np.where(torres, coluna, np.nan) for coluna in (self.azimute, self.margem, self.distancia))
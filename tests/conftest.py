@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+SCRIPT_MAPA = os.path.join(RAIZ, "7_Mapa.py")
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Caminho de um pontos.db vazio e descartável"""
+    return str(tmp_path / "pontos.db")
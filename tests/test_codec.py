@@ -0,0 +1,137 @@
+import math
+
+import pytest
+
+import codec
+
+from codec import PREFIXO_COMPACTO, decode_data, encode_data, encode_data_compacto
+from tabela_pontos import normalizar_pontos
+
+
+@pytest.fixture(autouse=True)
+def sempre_compacto(monkeypatch):
+    """Os mapas dos testes são pequenos: força o formato compacto mesmo assim"""
+    monkeypatch.setattr(codec, "MINIMO_PONTOS_COMPACTO", 0)
+
+
+def pontos_exemplo():
+    return [
+        {"lat": -3.731234, "lng": -38.521234, "nome": "Casa", "visivel": True, "tipo": "ponto", "lote": "A"},
+        {"lat": -3.74, "lng": -38.53, "nome": "10/01/2024 - 08:15:00", "visivel": True, "tipo": "torre",
+         "margem": 120, "azimute": 240, "distancia": 1500},
+        {"lat": -3.75, "lng": -38.54, "nome": "Raio", "visivel": False, "tipo": "circulo", "raio": 500},
+        {"lat": -3.74, "lng": -38.53, "nome": "10/01/2024 - 09:00:00 (2 eventos)", "visivel": True, "tipo": "torre",
+         "margem": 120, "azimute": 0, "distancia": 1500,
+         "eventos": ["10/01/2024 - 09:00:00", "11/01/2024 - 10:30:00"], "contagem": 2,
+         "primeiro": "10/01/2024 - 09:00:00", "ultimo": "11/01/2024 - 10:30:00",
+         "instantes": [1704877200, 1704969000]},
+    ]
+
+
+def ida_e_volta(pontos):
+    link = encode_data_compacto({"pontos": pontos})
+    assert link.startswith(PREFIXO_COMPACTO)
+    return decode_data(link)["pontos"]
+
+
+def test_ida_e_volta_dos_tipos():
+    pontos = pontos_exemplo()
+    assert ida_e_volta(pontos) == pontos
+
+
+def test_campos_fora_dos_blocos_fixos():
+    pontos = [
+        # Parâmetros não inteiros ou em texto, id descartado, tipo desconhecido
+        {"id": "abc", "lat": 1.5, "lng": 2.5, "nome": "Setor", "visivel": True, "tipo": "torre",
+         "margem": "120", "azimute": 12.5, "distancia": 1500},
+        {"lat": 0.0, "lng": 0.0, "nome": "Outro", "visivel": True, "tipo": "poligono", "cor": "azul"},
+        # Data inválida não vira carimbo: o nome vai como texto
+        {"lat": 0.0, "lng": 0.0, "nome": "31/02/2024 - 08:00:00", "visivel": True, "tipo": "ponto"},
+    ]
+    decodificados = ida_e_volta(pontos)
+    assert decodificados[0] == {k: v for k, v in pontos[0].items() if k != "id"}
+    assert decodificados[1:] == pontos[1:]
+
+
+@pytest.mark.parametrize("nome", ["a\0b", "\0", "", "Ação – ê 🚀", "x\0\0y\u2028"])
+def test_nomes_com_nul_e_nao_ascii(nome):
+    pontos = [
+        {"lat": 1.0, "lng": 2.0, "nome": nome, "visivel": True, "tipo": "ponto"},
+        {"lat": 1.0, "lng": 2.0, "nome": "Depois", "visivel": True, "tipo": "ponto", "obs": nome},
+    ]
+    assert ida_e_volta(pontos) == pontos
+
+
+@pytest.mark.parametrize("nome", [
+    "29/02/2024 - 23:59:59",
+    "01/01/2000 - 00:00:00",
+    "19/01/2068 - 03:14:07",
+])
+def test_nomes_data_viram_segundos(nome):
+    assert codec._nomes_como_segundos([nome])[0] >= 0
+    assert ida_e_volta([{"lat": 0.0, "lng": 0.0, "nome": nome, "visivel": True, "tipo": "ponto"}])[0]["nome"] == nome
+
+
+@pytest.mark.parametrize("nome", [
+    "29/02/2023 - 08:00:00",  # não bissexto
+    "31/04/2024 - 08:00:00",
+    "00/01/2024 - 08:00:00",
+    "10/13/2024 - 08:00:00",
+    "10/01/2024 - 24:00:00",
+    "10/01/2024 - 08:60:00",
+    "31/12/1999 - 23:59:59",  # antes da época
+    "19/01/2068 - 03:14:08",  # não cabe em 31 bits
+    "10/01/2024 - 08:15:0\0",
+    "10/01/2024 - 08:15:0١",  # dígito não ASCII
+    "10-01-2024 - 08:15:00",
+    "10/01/2024 - 08:15:000",
+])
+def test_nomes_que_nao_sao_carimbos_vao_como_texto(nome):
+    assert codec._nomes_como_segundos([nome])[0] == -1
+    assert ida_e_volta([{"lat": 0.0, "lng": 0.0, "nome": nome, "visivel": True, "tipo": "ponto"}])[0]["nome"] == nome
+
+
+def test_coordenadas_em_ponto_fixo():
+    pontos = [{"lat": -3.1234567, "lng": 179.9999999, "nome": "p", "visivel": True, "tipo": "ponto"}]
+    (ponto,) = ida_e_volta(pontos)
+    assert math.isclose(ponto["lat"], -3.123457, abs_tol=1e-9)
+    assert math.isclose(ponto["lng"], 180.0, abs_tol=1e-9)
+
+
+def test_instantes_refeitos_dos_eventos():
+    agregada = pontos_exemplo()[3]
+    # Mapas salvos antes dos instantes voltam com eles
+    antiga = {k: v for k, v in agregada.items() if k != "instantes"}
+    assert ida_e_volta([antiga]) == [agregada]
+    # Instantes que não batem com os eventos não são refeitos: vão como estão
+    divergente = dict(agregada, instantes=[0, 1])
+    assert ida_e_volta([divergente]) == [divergente]
+
+
+def test_mapa_vazio():
+    assert ida_e_volta([]) == []
+
+
+def test_mapas_pequenos_no_formato_original(monkeypatch):
+    monkeypatch.setattr(codec, "MINIMO_PONTOS_COMPACTO", 10)
+    pontos = pontos_exemplo()
+    link = encode_data_compacto({"pontos": pontos})
+    assert link == encode_data({"pontos": pontos})
+    assert decode_data(link)["pontos"] == pontos
+
+
+@pytest.mark.parametrize("minimo", [0, 10])
+def test_pontos_da_sessao(monkeypatch, minimo):
+    monkeypatch.setattr(codec, "MINIMO_PONTOS_COMPACTO", minimo)
+    pontos = normalizar_pontos(pontos_exemplo())
+    esperados = [{k: v for k, v in ponto.items() if k != "id"} for ponto in pontos]
+    assert decode_data(encode_data_compacto({"pontos": pontos}))["pontos"] == esperados
+
+
+def test_link_v1_continua_abrindo():
+    pontos = pontos_exemplo()
+    assert decode_data(encode_data({"pontos": pontos}))["pontos"] == pontos
+
+
+def test_link_invalido_vira_mapa_vazio():
+    assert decode_data("v2.lixo") == {"pontos": []}
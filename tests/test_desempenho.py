@@ -0,0 +1,27 @@
+from desempenho import anotar, etapa, execucao_atual, finalizar_execucao, iniciar_execucao, novo_historico
+
+
+def test_execucao_interrompida_por_rerun_entra_no_historico():
+    historico = novo_historico()
+    iniciar_execucao(historico=historico)
+    with etapa("importacao"):
+        pass
+    anotar(pontos=10)
+    # st.rerun(): o script para antes de finalizar_execucao e recomeça na mesma thread
+    iniciar_execucao(historico=historico)
+
+    (interrompida,) = historico
+    assert interrompida.valores == {"pontos": 10, "fim": "st.rerun"}
+    assert "importacao" in interrompida.etapas and interrompida.total_ms is not None
+
+    finalizada = finalizar_execucao()
+    assert list(historico) == [interrompida, finalizada]
+    assert "fim" not in finalizada.valores
+    assert execucao_atual() is None
+
+
+def test_historico_informado_ao_finalizar():
+    historico, outro = novo_historico(), novo_historico()
+    iniciar_execucao(historico=historico)
+    finalizar_execucao(outro)
+    assert not historico and len(outro) == 1
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from encurtador import VALIDADE_FALHA, CacheLinks, Encurtador, EncurtadorLocal, ServicoEncurtamento
+
+
+class EncurtadorControlado(Encurtador):
+    """Encurtador local que só responde quando o teste liberar"""
+
+    def __init__(self, falhar=False):
+        self.local = EncurtadorLocal()
+        self.liberar = threading.Event()
+        self.falhar = falhar
+
+    def encurtar(self, url_longa):
+        self.liberar.wait(5)
+        if self.falhar:
+            raise ConnectionError("fora do ar")
+        return self.local.encurtar(url_longa)
+
+
+# ===============================
+# Encurtadores
+# ===============================
+def test_encurtador_e_abstrato():
+    with pytest.raises(TypeError):
+        Encurtador()
+
+    class SemEncurtar(Encurtador):
+        pass
+
+    with pytest.raises(TypeError):
+        SemEncurtar()
+
+
+def test_encurtador_local_deterministico():
+    encurtador = EncurtadorLocal(base="http://curto.local/")
+    url = "http://localhost:8503?map=abc"
+    curta = encurtador.encurtar(url)
+    assert curta == EncurtadorLocal().encurtar(url)
+    assert curta.startswith("http://curto.local/") and len(curta.rsplit("/", 1)[1]) == 8
+    assert encurtador.links[curta.rsplit("/", 1)[1]] == url
+    assert encurtador.encurtar("http://localhost:8503?map=outro") != curta
+    assert encurtador.chamadas == 2
+
+
+# ===============================
+# Serviço assíncrono
+# ===============================
+def test_obter_nao_bloqueia_e_depois_usa_o_cache():
+    encurtador = EncurtadorControlado()
+    servico = ServicoEncurtamento(encurtador)
+    url = "http://localhost:8503?map=abc"
+
+    assert servico.obter(url) is None
+    futuro = servico.solicitar(url)
+    assert servico.obter(url) is None
+    assert servico.solicitar(url) is futuro  # pedido igual em andamento é reaproveitado
+    encurtador.liberar.set()
+    futuro.result(timeout=5)
+
+    curta = servico.obter(url)
+    assert curta == EncurtadorLocal().encurtar(url)
+    assert servico.obter(url) == curta
+    assert encurtador.local.chamadas == 1
+
+
+def test_falha_devolve_a_url_longa_por_pouco_tempo(monkeypatch):
+    monkeypatch.setattr("encurtador.time.monotonic", lambda: 1000.0)
+    encurtador = EncurtadorControlado(falhar=True)
+    cache = CacheLinks()
+    servico = ServicoEncurtamento(encurtador, cache=cache)
+    url = "http://localhost:8503?map=abc"
+
+    assert servico.obter(url) is None
+    futuro = servico.solicitar(url)
+    encurtador.liberar.set()
+    assert futuro.result(timeout=5) == url
+    assert servico.obter(url) == url
+    # Guardada só por VALIDADE_FALHA, para tentar de novo depois
+    assert cache._entradas[url] == (url, 1000.0 + VALIDADE_FALHA)
+
+
+# ===============================
+# Cache
+# ===============================
+def test_cache_expira_e_descarta_os_mais_antigos(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr("encurtador.time.monotonic", lambda: agora[0])
+    cache = CacheLinks(maximo=2, validade=10)
+
+    cache.guardar("a", "A")
+    cache.guardar("b", "B")
+    assert cache.obter("a") == "A"  # "a" passa a ser o mais recente
+    cache.guardar("c", "C")
+    assert cache.obter("b") is None
+    assert (cache.obter("a"), cache.obter("c")) == ("A", "C")
+
+    cache.guardar("falha", "falha", validade=1)
+    agora[0] += 2
+    assert cache.obter("falha") is None
+    assert cache.obter("c") == "C"
+    agora[0] += 10
+    assert cache.obter("c") is None
@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+import pytest
+
+from espacial import IndiceEspacial, distancias_metros
+from geometria import RAIO_TERRA, destinos
+from tabela_pontos import ColunasPontos, normalizar_pontos
+
+
+def _aleatorios(n, semente=0):
+    """Coordenadas sorteadas em volta de Fortaleza, algumas exatamente nas bordas das células"""
+    gerador = np.random.default_rng(semente)
+    lat = gerador.uniform(-3.80, -3.70, n)
+    lng = gerador.uniform(-38.60, -38.50, n)
+    lat[::5] = np.round(lat[::5], 2)
+    lng[::7] = np.round(lng[::7], 2)
+    return lat, lng
+
+
+def _haversine(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * RAIO_TERRA * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _rumo(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlambda = math.radians(lng2 - lng1)
+    x = math.sin(dlambda) * math.cos(phi2)
+    y = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlambda)
+    return math.degrees(math.atan2(x, y)) % 360
+
+
+# ===============================
+# Retângulo e raio
+# ===============================
+@pytest.mark.parametrize("tamanho_celula", [0.001, 0.01, 0.05])
+def test_na_caixa_igual_a_busca_exaustiva(tamanho_celula):
+    lat, lng = _aleatorios(2000)
+    lat[3], lng[11] = np.nan, np.nan
+    indice = IndiceEspacial(lat, lng, tamanho_celula=tamanho_celula)
+    gerador = np.random.default_rng(1)
+    caixas = [tuple(np.sort(gerador.uniform(-3.80, -3.70, 2))) + tuple(np.sort(gerador.uniform(-38.60, -38.50, 2)))
+              for _ in range(50)]
+    # Bordas exatamente sobre as linhas da grade e sobre pontos
+    caixas += [(-3.75, -3.72, -38.56, -38.53), (-3.74, -3.74, -38.60, -38.50), (lat[0], lat[0], lng[0], lng[0]),
+               (-3.70, -3.80, -38.60, -38.50)]
+    for lat_min, lat_max, lng_min, lng_max in caixas:
+        esperado = np.flatnonzero((lat >= lat_min) & (lat <= lat_max) & (lng >= lng_min) & (lng <= lng_max))
+        assert indice.na_caixa(lat_min, lat_max, lng_min, lng_max).tolist() == esperado.tolist()
+
+
+@pytest.mark.parametrize("tamanho_celula", [0.001, 0.01])
+def test_no_raio_igual_a_busca_exaustiva(tamanho_celula):
+    lat, lng = _aleatorios(2000)
+    indice = IndiceEspacial(lat, lng, tamanho_celula=tamanho_celula)
+    gerador = np.random.default_rng(2)
+    consultas = [(gerador.uniform(-3.80, -3.70), gerador.uniform(-38.60, -38.50), gerador.uniform(10, 5000))
+                 for _ in range(50)]
+    # Centro sobre a borda de uma célula e sobre um ponto (raio zero)
+    consultas += [(-3.75, -38.55, 1500.0), (lat[0], lng[0], 0.0)]
+    for centro_lat, centro_lng, raio in consultas:
+        esperado = [i for i in range(len(lat)) if _haversine(centro_lat, centro_lng, lat[i], lng[i]) <= raio]
+        assert indice.no_raio(centro_lat, centro_lng, raio).tolist() == esperado
+    assert 0 in indice.no_raio(lat[0], lng[0], 0.0)
+
+
+def test_indice_vazio():
+    indice = IndiceEspacial([], [])
+    assert indice.na_caixa(-90, 90, -180, 180).tolist() == []
+    assert indice.no_raio(0, 0, 1000).tolist() == []
+
+
+# ===============================
+# Setores
+# ===============================
+def _torres_aleatorias(n):
+    lat, lng = _aleatorios(n, semente=3)
+    gerador = np.random.default_rng(4)
+    torres = [
+        {"lat": la, "lng": ln, "nome": f"T{i}", "tipo": "torre", "azimute": float(gerador.uniform(0, 360)),
+         "margem": float(gerador.uniform(10, 180)), "distancia": float(gerador.uniform(200, 3000))}
+        for i, (la, ln) in enumerate(zip(lat.tolist(), lng.tolist()))
+    ]
+    # Setores que passam por 0°/360° e um círculo completo
+    centro = {"lat": -3.75, "lng": -38.55, "tipo": "torre", "distancia": 1000}
+    torres += [
+        dict(centro, nome="350±20", azimute=350, margem=40),
+        dict(centro, nome="5±15", azimute=5, margem=30),
+        dict(centro, nome="0±180", azimute=0, margem=360),
+        {"lat": -3.75, "lng": -38.55, "nome": "Casa", "tipo": "ponto"},
+    ]
+    return torres
+
+
+def _setores_exaustivo(torres, lat, lng):
+    encontrados = []
+    for i, torre in enumerate(torres):
+        if torre["tipo"] != "torre":
+            continue
+        if _haversine(torre["lat"], torre["lng"], lat, lng) > torre["distancia"]:
+            continue
+        desvio = abs((_rumo(torre["lat"], torre["lng"], lat, lng) - torre["azimute"] + 540) % 360 - 180)
+        if desvio <= torre["margem"] / 2 or torre["margem"] >= 360:
+            encontrados.append(i)
+    return encontrados
+
+
+def test_setores_contendo_igual_a_busca_exaustiva():
+    torres = _torres_aleatorias(300)
+    indices = [IndiceEspacial.de_pontos(torres), IndiceEspacial.de_colunas(ColunasPontos(normalizar_pontos(torres)))]
+    lat, lng = _aleatorios(300, semente=5)
+    achou = 0
+    for consulta_lat, consulta_lng in zip(lat.tolist(), lng.tolist()):
+        esperado = _setores_exaustivo(torres, consulta_lat, consulta_lng)
+        achou += len(esperado)
+        for indice in indices:
+            assert indice.setores_contendo(consulta_lat, consulta_lng).tolist() == esperado
+    assert achou > 0
+
+
+@pytest.mark.parametrize("rumo, esperados", [
+    (0, {"350±20", "5±15", "0±180"}),
+    (345, {"350±20", "0±180"}),
+    (15, {"5±15", "0±180"}),
+    (180, {"0±180"}),
+])
+def test_setores_que_passam_por_zero_grau(rumo, esperados):
+    torres = _torres_aleatorias(0)
+    indice = IndiceEspacial.de_pontos(torres)
+    (lat,), (lng,) = destinos(np.array([-3.75]), np.array([-38.55]), np.array([[rumo]]), np.array([500.0]))
+    assert {torres[i]["nome"] for i in indice.setores_contendo(lat[0], lng[0])} == esperados
+    # Além do alcance, nenhum
+    (lat,), (lng,) = destinos(np.array([-3.75]), np.array([-38.55]), np.array([[rumo]]), np.array([1100.0]))
+    assert indice.setores_contendo(lat[0], lng[0]).tolist() == []
+
+
+def test_distancias_metros():
+    # 1 grau de latitude sobre o meridiano
+    assert distancias_metros(0.0, 0.0, np.array([1.0]), np.array([0.0]))[0] == pytest.approx(RAIO_TERRA * math.pi / 180)
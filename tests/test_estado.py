@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from estado import MapaDesatualizado, carregar_mapa, compactar_mapa, registrar_operacao, salvar_mapa
+
+
+def _ponto(ponto_id, nome, **campos):
+    return {"id": ponto_id, "lat": -3.7, "lng": -38.5, "nome": nome, "visivel": True, "tipo": "ponto", **campos}
+
+
+def _nomes(map_id, banco):
+    return [p["nome"] for p in carregar_mapa(map_id, caminho=banco)[0]]
+
+
+# ===============================
+# Log de operações
+# ===============================
+def test_operacoes_reaplicadas_sobre_o_snapshot(banco):
+    map_id, versao = salvar_mapa([_ponto("a", "A"), _ponto("b", "B"), _ponto("c", "C")], caminho=banco)
+    assert versao == 1
+    registrar_operacao(map_id, "adicionar", _ponto("d", "D"), caminho=banco)
+    registrar_operacao(map_id, "atualizar", _ponto("a", "A2", lote="x"), caminho=banco)
+    registrar_operacao(map_id, "visibilidade", _ponto("b", "B", visivel=False), caminho=banco)
+    registrar_operacao(map_id, "excluir", _ponto("c", "C"), caminho=banco)
+    pendentes, versao = registrar_operacao(map_id, "atualizar", _ponto("c", "não volta"), caminho=banco)
+    assert (pendentes, versao) == (5, 6)
+
+    pontos, compartilhado, versao_lida = carregar_mapa(map_id, caminho=banco)
+    assert not compartilhado
+    assert versao_lida == 6
+    assert [(p["id"], p["nome"], p["visivel"]) for p in pontos] == [
+        ("a", "A2", True), ("b", "B", False), ("d", "D", True),
+    ]
+    assert pontos[0]["lote"] == "x"
+
+
+def test_operacoes_concorrentes_recebem_seq_distintas(banco):
+    map_id, _ = salvar_mapa([], caminho=banco)
+    erros, sequencias = [], []
+
+    def sessao(n):
+        try:
+            for i in range(20):
+                sequencias.append(registrar_operacao(map_id, "adicionar", _ponto(f"{n}-{i}", "P"), caminho=banco)[0])
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=sessao, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not erros
+    assert sorted(sequencias) == list(range(1, 121))
+    assert len(carregar_mapa(map_id, caminho=banco)[0]) == 120
+
+
+def test_mapa_inexistente(banco):
+    assert carregar_mapa("nao-existe", caminho=banco) == (None, False, None)
+
+
+def test_mapa_compartilhado_sem_versao(banco):
+    map_id, _ = salvar_mapa([_ponto("a", "A")], compartilhado=True, caminho=banco)
+    for _ in range(2):  # banco e depois o cache
+        pontos, compartilhado, versao = carregar_mapa(map_id, caminho=banco)
+        assert (len(pontos), compartilhado, versao) == (1, True, None)
+
+
+# ===============================
+# Duas sessões no mesmo mapa
+# ===============================
+def test_compactacao_mantem_operacoes_de_outra_sessao(banco):
+    map_id, _ = salvar_mapa([_ponto("a", "A")], caminho=banco)
+    registrar_operacao(map_id, "adicionar", _ponto("b", "da aba 1"), caminho=banco)
+    registrar_operacao(map_id, "adicionar", _ponto("c", "da aba 2"), caminho=banco)
+    _, versao = registrar_operacao(map_id, "atualizar", _ponto("a", "A2"), caminho=banco)
+
+    compactar_mapa(map_id, caminho=banco)
+
+    pontos, _, versao_lida = carregar_mapa(map_id, caminho=banco)
+    assert [p["nome"] for p in pontos] == ["A2", "da aba 1", "da aba 2"]
+    assert versao_lida == versao
+    # O log foi incorporado ao snapshot: a próxima operação recomeça a contagem
+    assert registrar_operacao(map_id, "excluir", _ponto("b", ""), caminho=banco)[0] == 1
+    assert _nomes(map_id, banco) == ["A2", "da aba 2"]
+
+
+def test_snapshot_desatualizado_e_recusado(banco):
+    map_id, versao = salvar_mapa([_ponto("a", "A")], caminho=banco)
+    # Aba 2 grava depois que a aba 1 carregou o mapa
+    registrar_operacao(map_id, "adicionar", _ponto("b", "da aba 2"), caminho=banco)
+
+    with pytest.raises(MapaDesatualizado):
+        salvar_mapa([_ponto("a", "A"), _ponto("x", "da aba 1")], map_id, caminho=banco, versao=versao)
+    assert _nomes(map_id, banco) == ["A", "da aba 2"]
+
+    # Com a versão atual a gravação passa
+    _, _, atual = carregar_mapa(map_id, caminho=banco)
+    assert salvar_mapa([_ponto("a", "A")], map_id, caminho=banco, versao=atual) == (map_id, atual + 1)
@@ -0,0 +1,155 @@
+import numpy as np
+
+import eventos
+from eventos import (
+    AgregadorTorres,
+    IndiceTemporal,
+    agregar_torres,
+    campos_agregados,
+    chave_setor,
+    juntar_ao_mapa,
+    remover_eventos_existentes,
+    total_eventos,
+)
+
+
+def _torre(nome, azimute=120, **campos):
+    return {"lat": -3.74, "lng": -38.53, "nome": nome, "visivel": True, "tipo": "torre",
+            "margem": 120, "azimute": azimute, "distancia": 1500, **campos}
+
+
+# ===============================
+# Agregação
+# ===============================
+def test_agrupa_por_setor_em_ordem_cronologica():
+    torres = [
+        _torre("11/01/2024 - 10:30:00", id="a", lote="x"),
+        _torre("10/01/2024 - 08:15:00", azimute=240),
+        _torre("10/01/2024 - 09:00:00"),
+        _torre("11/01/2024 - 10:30:00"),  # repetido
+        {"lat": 0.0, "lng": 0.0, "nome": "Casa", "visivel": True, "tipo": "ponto"},
+    ]
+    agregadas = agregar_torres(torres)
+
+    assert [t["azimute"] for t in agregadas] == [120, 240]
+    primeira = agregadas[0]
+    assert primeira["eventos"] == ["10/01/2024 - 09:00:00", "11/01/2024 - 10:30:00"]
+    assert primeira["nome"] == "10/01/2024 - 09:00:00 (2 eventos)"
+    assert (primeira["contagem"], primeira["primeiro"], primeira["ultimo"]) == (
+        2, "10/01/2024 - 09:00:00", "11/01/2024 - 10:30:00"
+    )
+    # id e lote ficam com quem importa o resultado
+    assert "id" not in primeira and "lote" not in primeira
+    assert agregadas[1]["nome"] == "10/01/2024 - 08:15:00"
+    assert total_eventos(agregadas) == 3
+
+
+def test_junta_resultados_ja_agregados():
+    parte1 = agregar_torres([_torre("10/01/2024 - 09:00:00"), _torre("12/01/2024 - 09:00:00")])
+    parte2 = agregar_torres([_torre("11/01/2024 - 09:00:00"), _torre("12/01/2024 - 09:00:00")])
+    (junta,) = agregar_torres(parte1 + parte2)
+    assert junta["eventos"] == ["10/01/2024 - 09:00:00", "11/01/2024 - 09:00:00", "12/01/2024 - 09:00:00"]
+
+
+def test_agregacao_incremental_igual_a_de_uma_vez():
+    torres = [_torre(f"1{i % 3}/01/2024 - 0{i % 7}:00:00", azimute=120 * (i % 2)) for i in range(20)]
+    agregador = AgregadorTorres()
+    for inicio in range(0, 20, 6):
+        agregador.adicionar(torres[inicio:inicio + 6])
+    assert agregador.registros() == agregar_torres(torres)
+    assert agregador.registros() == []
+
+
+def test_datas_em_formatos_diferentes_e_nomes_sem_data():
+    (torre,) = agregar_torres([
+        _torre("sem data"),
+        _torre("2024-01-11 00:00:00 - 08:00"),
+        _torre("10/01/2024 - 23:59"),
+    ])
+    # Sem data reconhecível vai para o fim
+    assert torre["eventos"] == ["10/01/2024 - 23:59", "2024-01-11 00:00:00 - 08:00", "sem data"]
+    # e fica sem instante
+    assert torre["instantes"] == [1704931140, 1704960000]
+
+
+# ===============================
+# Índice temporal
+# ===============================
+def test_indice_usa_os_instantes_guardados(monkeypatch):
+    agregadas = agregar_torres([_torre("10/01/2024 - 09:00:00"), _torre("12/01/2024 - 09:00:00"),
+                                _torre("11/01/2024 - 09:00:00", azimute=0), _torre("sem data", azimute=0)])
+    simples = _torre("13/01/2024 - 09:00:00", azimute=240)
+    pontos = agregadas + [simples]
+    esperado = IndiceTemporal.de_pontos(pontos)
+
+    lidos = []
+    instantes_eventos = eventos.instantes_eventos
+    monkeypatch.setattr(eventos, "instantes_eventos", lambda nomes: lidos.append(list(nomes)) or instantes_eventos(nomes))
+    indice = IndiceTemporal.de_pontos(pontos)
+
+    # Só a torre simples, que não passou pela agregação, tem o nome lido
+    assert lidos == [["13/01/2024 - 09:00:00"]]
+    inicio, fim = np.datetime64("2024-01-11T00:00:00"), np.datetime64("2024-01-12T12:00:00")
+    assert indice.mascara_na_janela(inicio, fim).tolist() == esperado.mascara_na_janela(inicio, fim).tolist()
+    assert indice.mascara_na_janela(inicio, fim).tolist() == [True, True, False]
+
+
+# ===============================
+# Reimportação
+# ===============================
+def test_remove_eventos_que_o_mapa_ja_tem():
+    existentes = [
+        _torre("10/01/2024 - 09:00:00", id="p1"),  # torre simples
+        dict(_torre("x", azimute=240), **campos_agregados(["10/01/2024 - 08:15:00"])),
+        {"lat": -3.74, "lng": -38.53, "nome": "11/01/2024 - 10:30:00", "visivel": True, "tipo": "ponto"},
+    ]
+    novas = agregar_torres([
+        _torre("10/01/2024 - 09:00:00"),
+        _torre("11/01/2024 - 10:30:00"),
+        _torre("10/01/2024 - 08:15:00", azimute=240),
+        _torre("10/01/2024 - 08:15:00", azimute=0),
+    ])
+    restantes = remover_eventos_existentes(novas, existentes)
+
+    # O setor 240 só tinha eventos repetidos e some; o 0 é novo e passa inteiro
+    assert [t["azimute"] for t in restantes] == [120, 0]
+    assert restantes[0]["eventos"] == ["11/01/2024 - 10:30:00"]
+    assert (restantes[0]["nome"], restantes[0]["contagem"]) == ("11/01/2024 - 10:30:00", 1)
+    assert restantes[0]["instantes"] == novas[0]["instantes"][1:]
+    assert restantes[1] is novas[2]
+    # As torres recebidas não são alteradas
+    assert novas[0]["contagem"] == 2
+
+
+def test_sem_pontos_no_mapa_nada_muda():
+    novas = agregar_torres([_torre("10/01/2024 - 09:00:00")])
+    assert remover_eventos_existentes(novas, []) == novas
+
+
+def test_eventos_novos_entram_no_setor_que_o_mapa_ja_tem():
+    existente = dict(_torre("x", id="p1", lote="l1", visivel=False),
+                     **campos_agregados(["10/01/2024 - 10:00:00", "10/01/2024 - 11:00:00"]))
+    casa = {"lat": 0.0, "lng": 0.0, "nome": "Casa", "visivel": True, "tipo": "ponto", "id": "p0"}
+    importadas = agregar_torres([
+        _torre("10/01/2024 - 11:00:00"),
+        _torre("11/01/2024 - 09:00:00"),
+        _torre("11/01/2024 - 09:00:00", azimute=0),
+    ])
+    pontos, novas = juntar_ao_mapa([casa, existente], importadas)
+
+    torres = [p for p in pontos if p["tipo"] == "torre"]
+    assert len({chave_setor(t) for t in torres}) == len(torres) == 2
+    assert pontos[0] is casa
+    junta = pontos[1]
+    assert junta["eventos"] == ["10/01/2024 - 10:00:00", "10/01/2024 - 11:00:00", "11/01/2024 - 09:00:00"]
+    assert (junta["id"], junta["lote"], junta["visivel"], junta["contagem"]) == ("p1", "l1", False, 3)
+    assert len(junta["instantes"]) == 3 and junta["instantes"] == sorted(junta["instantes"])
+    assert pontos[2]["azimute"] == 0
+    assert total_eventos(novas) == 2
+
+
+def test_nada_de_novo_mantem_o_mapa():
+    existente = dict(_torre("x", id="p1"), **campos_agregados(["10/01/2024 - 10:00:00"]))
+    pontos, novas = juntar_ao_mapa([existente], agregar_torres([_torre("10/01/2024 - 10:00:00")]))
+    assert pontos == [existente] and pontos[0] is existente
+    assert novas == []
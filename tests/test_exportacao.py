@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import struct
+import xml.etree.ElementTree as ET
+
+import pyarrow.parquet as pq
+import pytest
+
+import estado
+from estado import conectar, salvar_mapa
+from exportacao import ExportacaoMuitoGrande, exportar, gravar_exportacao, main
+
+
+PONTOS = [
+    {"id": "t1", "lat": -3.74, "lng": -38.53, "nome": "Torre & <1>", "visivel": True, "tipo": "torre",
+     "margem": 120, "azimute": 240, "distancia": 1500, "contagem": 2, "primeiro": "10/01/2024 - 09:00:00",
+     "ultimo": "11/01/2024 - 10:30:00", "eventos": ["10/01/2024 - 09:00:00", "11/01/2024 - 10:30:00"]},
+    {"id": "c1", "lat": -3.70, "lng": -38.50, "nome": "Círculo", "visivel": False, "tipo": "circulo", "raio": 500},
+    {"id": "p1", "lat": -3.80, "lng": -38.60, "nome": "Casa", "visivel": True, "tipo": "ponto"},
+    {"id": "t2", "lat": -3.75, "lng": -38.55, "nome": "Sem forma", "visivel": True, "tipo": "torre",
+     "margem": "", "azimute": None, "distancia": 1500},
+]
+
+
+def _bytes(formato, tamanho_bloco=2):
+    # Blocos de 2 pontos: a junção entre blocos também é exercitada
+    return b"".join(exportar(PONTOS, formato, tamanho_bloco=tamanho_bloco))
+
+
+# ===============================
+# Formatos
+# ===============================
+def test_geojson():
+    documento = json.loads(_bytes("geojson"))
+    features = documento["features"]
+    assert [f["properties"]["id"] for f in features] == ["t1", "c1", "p1", "t2"]
+    assert {f["properties"]["id"]: f["geometry"]["type"] for f in features} == {
+        "t1": "Polygon", "c1": "Polygon", "p1": "Point", "t2": "Point",
+    }
+    anel = features[0]["geometry"]["coordinates"][0]
+    assert anel[0] == anel[-1] and len(anel) > 3
+    assert features[0]["properties"]["eventos"] == PONTOS[0]["eventos"]
+    assert features[1]["properties"]["visivel"] is False
+    assert features[2]["geometry"]["coordinates"] == [-38.60, -3.80]
+
+
+def test_csv():
+    texto = _bytes("csv").decode("utf-8")
+    assert texto.startswith("\ufeff")
+    linhas = list(csv.DictReader(io.StringIO(texto[1:])))
+    assert [linha["id"] for linha in linhas] == ["t1", "c1", "p1", "t2"]
+    assert linhas[0]["wkt"].startswith("POLYGON ((")
+    assert linhas[1]["nome"] == "Círculo"
+    assert linhas[2]["wkt"] == "POINT (-38.6 -3.8)"
+    assert linhas[3]["wkt"].startswith("POINT (")
+
+
+def test_kml():
+    raiz = ET.fromstring(_bytes("kml"))
+    ns = {"k": "http://www.opengis.net/kml/2.2"}
+    marcas = raiz.findall("k:Document/k:Placemark", ns)
+    assert [m.findtext("k:name", namespaces=ns) for m in marcas] == ["Torre & <1>", "Círculo", "Casa", "Sem forma"]
+    assert marcas[0].find("k:MultiGeometry/k:Polygon", ns) is not None
+    assert marcas[1].findtext("k:visibility", namespaces=ns) == "0"
+    assert marcas[2].find("k:Point", ns) is not None and marcas[2].find("k:MultiGeometry", ns) is None
+
+
+def test_parquet():
+    arquivo = pq.ParquetFile(io.BytesIO(_bytes("parquet")))
+    assert json.loads(arquivo.schema_arrow.metadata[b"geo"])["primary_column"] == "geometry"
+    assert arquivo.num_row_groups == 2
+    tabela = arquivo.read().to_pylist()
+    assert [linha["id"] for linha in tabela] == ["t1", "c1", "p1", "t2"]
+    assert tabela[0]["eventos"] == PONTOS[0]["eventos"]
+    assert tabela[3]["margem"] is None and tabela[3]["eventos"] is None
+    # WKB little-endian: tipo 3 (Polygon) para as formas, 1 (Point) para os demais
+    tipos = [struct.unpack_from("<BI", linha["geometry"])[1] for linha in tabela]
+    assert tipos == [3, 3, 1, 1]
+    assert struct.unpack_from("<dd", tabela[2]["geometry"], 5) == (-38.60, -3.80)
+
+
+@pytest.mark.parametrize("formato", ["geojson", "kml", "csv", "parquet"])
+def test_tamanho_do_bloco_nao_muda_o_conteudo(formato):
+    if formato == "parquet":
+        ler = lambda dados: pq.read_table(io.BytesIO(dados)).to_pylist()
+    else:
+        ler = bytes
+    assert ler(_bytes(formato, tamanho_bloco=1)) == ler(_bytes(formato, tamanho_bloco=100))
+
+
+def test_mapa_vazio():
+    assert json.loads(b"".join(exportar([], "geojson"))) == {"type": "FeatureCollection", "features": []}
+    assert pq.read_table(io.BytesIO(b"".join(exportar([], "parquet")))).num_rows == 0
+
+
+def test_formato_desconhecido():
+    with pytest.raises(ValueError):
+        exportar(PONTOS, "shp")
+
+
+# ===============================
+# Gravação
+# ===============================
+def test_gravar_exportacao_respeita_o_limite():
+    destino = io.BytesIO()
+    assert gravar_exportacao(PONTOS, "geojson", destino, tamanho_bloco=2) == len(_bytes("geojson"))
+    assert destino.getvalue() == _bytes("geojson")
+
+    with pytest.raises(ExportacaoMuitoGrande):
+        gravar_exportacao(PONTOS, "geojson", io.BytesIO(), tamanho_bloco=1, limite_bytes=100)
+
+
+def test_linha_de_comando(monkeypatch, banco, tmp_path):
+    monkeypatch.setattr(estado, "conectar", lambda caminho=None: conectar(banco))
+    monkeypatch.setattr(estado, "_esquema_pronto", set())
+    map_id, _ = salvar_mapa(PONTOS)
+    saida = tmp_path / "mapa.geojson"
+
+    assert main([map_id, "geojson", str(saida)]) == 0
+    assert len(json.loads(saida.read_bytes())["features"]) == len(PONTOS)
+    assert main([map_id, "geojson", str(saida), "--somente-visiveis"]) == 0
+    assert [f["properties"]["id"] for f in json.loads(saida.read_bytes())["features"]] == ["t1", "p1", "t2"]
+    with pytest.raises(SystemExit):
+        main(["nao-existe", "geojson", str(saida)])
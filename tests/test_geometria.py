@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+import pytest
+
+import geometria
+from geometria import (
+    ESCALA_COORDENADA,
+    PONTOS_CIRCULO,
+    RAIO_TERRA,
+    CacheGeometria,
+    aneis_circulos,
+    aneis_setores,
+    destinos,
+    preparar_geometria,
+)
+
+# Distância de 1 grau de arco sobre a esfera
+UM_GRAU = RAIO_TERRA * math.pi / 180
+
+
+def _pares(anel):
+    """Anel plano em micrograus -> [(lat, lng)] em graus"""
+    return [(anel[i] / ESCALA_COORDENADA, anel[i + 1] / ESCALA_COORDENADA) for i in range(0, len(anel), 2)]
+
+
+def _distancia(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * RAIO_TERRA * math.asin(math.sqrt(a))
+
+
+# ===============================
+# Pontos de destino
+# ===============================
+@pytest.mark.parametrize("lat, lng, rumo, distancia, esperado", [
+    (0.0, 0.0, 0, UM_GRAU, (1.0, 0.0)),           # norte pelo meridiano
+    (0.0, 0.0, 90, UM_GRAU, (0.0, 1.0)),          # leste pelo equador
+    (0.0, 0.0, 180, 10 * UM_GRAU, (-10.0, 0.0)),
+    (0.0, 179.5, 90, UM_GRAU, (0.0, -179.5)),     # passa do antimeridiano
+    (-3.0, -38.0, 270, 90 * UM_GRAU, (0.0, -128.0)),  # 1/4 de volta: cruza o equador
+    (60.0, 10.0, 0, 30 * UM_GRAU, (90.0, 10.0)),  # até o polo
+])
+def test_destinos_conhecidos(lat, lng, rumo, distancia, esperado):
+    lat2, lng2 = destinos(np.array([lat]), np.array([lng]), np.array([[rumo]]), np.array([distancia]))
+    assert lat2[0, 0] == pytest.approx(esperado[0], abs=1e-9)
+    if abs(esperado[0]) < 90:
+        assert lng2[0, 0] == pytest.approx(esperado[1], abs=1e-9)
+
+
+# ===============================
+# Contornos
+# ===============================
+def test_anel_do_setor():
+    # Setor de 60° voltado para leste a partir do equador: arco de 60° a 120°
+    (anel,), (ponta,) = aneis_setores([0.0], [0.0], [90.0], [60.0], [UM_GRAU])
+    vertices = _pares(anel)
+    assert vertices[0] == vertices[-1] == (0.0, 0.0)
+    arco = vertices[1:-1]
+    assert len(arco) == 60 // geometria.GRAUS_POR_PONTO_SETOR + 1
+    for lat, lng in arco:
+        assert _distancia(0.0, 0.0, lat, lng) == pytest.approx(UM_GRAU, rel=1e-5)
+    # Extremos do arco em 60° e 120°, ponta no azimute (1 grau para leste)
+    esperados = destinos(np.zeros(1), np.zeros(1), np.array([[60.0, 120.0]]), np.array([UM_GRAU]))
+    assert arco[0] == pytest.approx((esperados[0][0, 0], esperados[1][0, 0]), abs=1e-6)
+    assert arco[-1] == pytest.approx((esperados[0][0, 1], esperados[1][0, 1]), abs=1e-6)
+    assert _pares(ponta) == [(0.0, 1.0)]
+
+
+def test_setores_estreitos_tem_o_minimo_de_vertices():
+    aneis, pontas = aneis_setores([-3.7, -3.7], [-38.5, -38.5], [0.0, 350.0], [4.0, 40.0], [1500.0, 1500.0])
+    assert len(_pares(aneis[0])) == geometria.MINIMO_PONTOS_SETOR + 3
+    assert len(_pares(aneis[1])) == 40 // geometria.GRAUS_POR_PONTO_SETOR + 3
+    # O setor de 350° passa por 0°: a ponta fica ao norte, um pouco a oeste
+    lat, lng = _pares(pontas[1])[0]
+    assert lat > -3.7 and lng < -38.5
+
+
+def test_anel_do_circulo():
+    (anel,) = aneis_circulos([0.0], [0.0], [UM_GRAU])
+    vertices = _pares(anel)
+    assert len(vertices) == PONTOS_CIRCULO + 1
+    assert vertices[0] == vertices[-1] == (1.0, 0.0)  # começa e fecha ao norte
+    assert vertices[PONTOS_CIRCULO // 4] == pytest.approx((0.0, 1.0), abs=1e-6)
+    assert vertices[PONTOS_CIRCULO // 2] == pytest.approx((-1.0, 0.0), abs=1e-6)
+    for lat, lng in vertices:
+        assert _distancia(0.0, 0.0, lat, lng) == pytest.approx(UM_GRAU, rel=1e-5)
+
+
+def test_sem_formas():
+    assert aneis_setores([], [], [], [], []) == ([], [])
+    assert aneis_circulos([], [], []) == []
+
+
+# ===============================
+# Cache de formas
+# ===============================
+def _pontos():
+    return [
+        {"id": "t1", "lat": -3.74, "lng": -38.53, "tipo": "torre", "azimute": 0, "margem": 120, "distancia": 1500},
+        {"id": "t2", "lat": -3.74, "lng": -38.53, "tipo": "torre", "azimute": "0", "margem": 120, "distancia": 1500},
+        {"id": "c1", "lat": -3.75, "lng": -38.54, "tipo": "circulo", "raio": "500"},
+        {"id": "p1", "lat": -3.70, "lng": -38.50, "tipo": "ponto"},
+        {"id": "t3", "lat": -3.74, "lng": -38.53, "tipo": "torre", "azimute": "", "margem": 120, "distancia": 1500},
+    ]
+
+
+def test_preparar_geometria():
+    preparados = preparar_geometria(_pontos(), cache=CacheGeometria())
+    assert [sorted(p.keys() & {"anel", "ponta"}) for p in preparados] == [
+        ["anel", "ponta"], ["anel", "ponta"], ["anel"], [], [],
+    ]
+    # Os mesmos parâmetros (mesmo em texto) dão a mesma forma
+    assert preparados[0]["anel"] is preparados[1]["anel"]
+    assert preparados[2]["anel"] == aneis_circulos([-3.75], [-38.54], [500.0])[0]
+
+
+def test_cache_quente_nao_recalcula(monkeypatch):
+    cache = CacheGeometria()
+    frio = preparar_geometria(_pontos(), cache=cache)
+
+    def falhar(*args):
+        raise AssertionError("forma recalculada")
+    monkeypatch.setattr(geometria, "aneis_setores", falhar)
+    monkeypatch.setattr(geometria, "aneis_circulos", falhar)
+    assert preparar_geometria(_pontos(), cache=cache) == frio
+
+
+def test_cache_descarta_as_formas_menos_usadas():
+    cache = CacheGeometria(maximo_formas=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    assert cache.obter("a") == 1  # "a" passa a ser a mais recente
+    cache.guardar("c", 3)
+    assert (cache.obter("a"), cache.obter("b"), cache.obter("c")) == (1, None, 3)
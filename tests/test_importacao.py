@@ -0,0 +1,169 @@
+import zipfile
+
+from io import BytesIO
+
+import pytest
+
+from openpyxl import Workbook
+
+import importacao
+from cache_extrato import CacheExtratos
+from eventos import AgregadorTorres
+from extrato import (
+    CELULA_OPERADORA,
+    COLUNA_DATA,
+    COLUNA_ENDERECO,
+    COLUNA_HORA,
+    INTERVALO_PROGRESSO,
+    LINHA_INICIO_DADOS,
+    TAMANHO_BLOCO,
+    abrir_planilha,
+)
+from importacao import (
+    TarefaImportacao,
+    TarefaLote,
+    _processar_aba,
+    chave_importacao,
+    digest_arquivo,
+    expandir_arquivos,
+)
+from operadoras import VIVO
+
+
+def gerar_extrato(linhas, abas=None) -> bytes:
+    """Extrato VIVO com linhas de duas torres alternadas, um minuto entre eventos.
+
+    abas: {nome: (linhas, operadora)} para um arquivo com várias abas.
+    """
+    livro = Workbook(write_only=True)
+    for nome, (quantidade, operadora) in (abas or {"Chamadas": (linhas, "TELEFONICA VIVO")}).items():
+        _preencher_aba(livro.create_sheet(nome), quantidade, operadora)
+    buffer = BytesIO()
+    livro.save(buffer)
+    return buffer.getvalue()
+
+
+def _preencher_aba(planilha, linhas, operadora):
+    colunas = max(COLUNA_DATA, COLUNA_HORA, COLUNA_ENDERECO)
+    for numero in range(1, LINHA_INICIO_DADOS):
+        linha = [None] * colunas
+        if numero == CELULA_OPERADORA[0]:
+            linha[CELULA_OPERADORA[1] - 1] = operadora
+        planilha.append(linha)
+    for i in range(linhas):
+        linha = [None] * colunas
+        linha[COLUNA_DATA - 1] = "10/01/2024"
+        linha[COLUNA_HORA - 1] = f"{i // 60 % 24:02d}:{i % 60:02d}:00"
+        linha[COLUNA_ENDERECO - 1] = f"RUA A LATITUDE -03-43-00.00 LONGITUDE -38-31-00.00 AZIMUTE {120 * (i % 2)}"
+        planilha.append(linha)
+
+
+@pytest.fixture
+def cache_isolado(banco, monkeypatch):
+    monkeypatch.setattr(importacao, "cache_extratos", CacheExtratos(caminho_banco=banco))
+
+
+def test_progresso_dentro_do_bloco():
+    linhas = 3 * INTERVALO_PROGRESSO + 10
+    chamadas = []
+    wb = abrir_planilha(BytesIO(gerar_extrato(linhas)))
+    blocos = list(VIVO.ler_em_blocos(wb["Chamadas"], TAMANHO_BLOCO, chamadas.append))
+    wb.close()
+    assert len(blocos) == 1  # tudo cabe em um bloco...
+    assert chamadas == [INTERVALO_PROGRESSO, 2 * INTERVALO_PROGRESSO, 3 * INTERVALO_PROGRESSO, linhas]  # ...mas o progresso anda
+
+
+def test_tarefa_importa_e_agrega(cache_isolado):
+    tarefa = TarefaImportacao("chave", gerar_extrato(100), "Chamadas")
+    tarefa._executar()
+    assert tarefa.status == "concluida", tarefa.erro
+    assert tarefa.linhas_lidas == 100
+    assert sorted(t["contagem"] for t in tarefa.torres) == [50, 50]
+
+
+def test_tarefa_abre_o_arquivo_uma_vez_e_agrega_bloco_a_bloco(cache_isolado, monkeypatch):
+    aberturas, agregacoes = [], []
+    monkeypatch.setattr(importacao, "abrir_planilha", lambda arquivo: aberturas.append(1) or abrir_planilha(arquivo))
+    monkeypatch.setattr(importacao, "TAMANHO_BLOCO", 30)
+    adicionar = AgregadorTorres.adicionar
+    monkeypatch.setattr(AgregadorTorres, "adicionar", lambda self, torres: agregacoes.append(len(torres)) or adicionar(self, torres))
+
+    tarefa = TarefaImportacao("chave", gerar_extrato(100), "Chamadas")
+    tarefa._executar()
+    assert tarefa.status == "concluida", tarefa.erro
+    assert len(aberturas) == 1
+    assert agregacoes == [30, 30, 30, 10]
+    assert sorted(t["contagem"] for t in tarefa.torres) == [50, 50]
+
+
+def test_tarefa_cancelada_no_meio_do_bloco(cache_isolado):
+    tarefa = TarefaImportacao("chave", gerar_extrato(2 * INTERVALO_PROGRESSO), "Chamadas")
+    tarefa.cancelar()
+    tarefa._executar()
+    assert tarefa.status == "cancelada"
+    assert tarefa.torres == []
+    assert tarefa.linhas_lidas == 0
+
+
+# ===============================
+# Importação em lote
+# ===============================
+@pytest.fixture
+def lote_zip():
+    """ZIP com dois extratos, um arquivo de trava do Excel e arquivos que não são XLSX"""
+    a = gerar_extrato(None, {"Chamadas": (4, "TELEFONICA VIVO"), "Notas": (3, "OUTRA")})
+    b = gerar_extrato(6)
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("extratos/", "")
+        zf.writestr("extratos/a.xlsx", a)
+        zf.writestr("extratos/~$a.xlsx", b"trava")
+        zf.writestr("extratos/leia-me.txt", "texto")
+        zf.writestr("__MACOSX/extratos/._a.xlsx", b"metadados")
+        zf.writestr("b.xlsx", b)
+    return [("lote.zip", buffer.getvalue()), ("notas.pdf", b"%PDF")], a, b
+
+
+def test_expandir_arquivos_so_pega_os_xlsx(lote_zip):
+    arquivos, a, b = lote_zip
+    assert expandir_arquivos(arquivos) == [("lote.zip/extratos/a.xlsx", a), ("lote.zip/b.xlsx", b)]
+    assert expandir_arquivos([("c.XLSX", b)]) == [("c.XLSX", b)]
+
+
+def test_processar_aba(lote_zip):
+    _, a, _ = lote_zip
+    operadora, torres, segundos = _processar_aba(a, "Chamadas")
+    assert operadora == "VIVO" and segundos >= 0
+    assert sorted(t["contagem"] for t in torres) == [2, 2]
+    assert _processar_aba(a, "Notas")[:2] == (None, [])
+
+
+def test_lote_com_aba_ruim_e_aba_em_cache(cache_isolado, monkeypatch, lote_zip):
+    arquivos, a, b = lote_zip
+    monkeypatch.setattr(importacao, "PROCESSOS_LOTE", 2)
+    monkeypatch.setattr(importacao, "_processos", None)
+    # A aba de b.xlsx já foi importada antes: vem do cache, sem ir ao pool
+    _, torres_b, _ = _processar_aba(b, "Chamadas")
+    importacao.cache_extratos.guardar(chave_importacao(digest_arquivo(b), "Chamadas"), torres_b)
+
+    tarefa = TarefaLote(arquivos)
+    try:
+        tarefa._executar()
+    finally:
+        if importacao._processos is not None:
+            importacao._processos.shutdown()
+    assert tarefa.status == "concluida", tarefa.erro
+
+    assert [{k: v for k, v in r.items() if k != "segundos"} for r in tarefa.relatorio] == [
+        {"arquivo": "lote.zip/extratos/a.xlsx", "aba": "Chamadas", "operadora": "VIVO", "torres": 2, "erro": None},
+        {"arquivo": "lote.zip/extratos/a.xlsx", "aba": "Notas", "operadora": None, "torres": 0,
+         "erro": "Operadora não reconhecida"},
+        {"arquivo": "lote.zip/b.xlsx", "aba": "Chamadas", "operadora": "cache", "torres": 2, "erro": None},
+    ]
+    assert (tarefa.total_abas, tarefa.abas_concluidas, tarefa.progresso) == (3, 3, 1.0)
+    # Os 4 eventos de a.xlsx também estão em b.xlsx: entram uma vez só
+    assert sorted(t["contagem"] for t in tarefa.torres) == [3, 3]
+    assert tarefa.repetidas == 4
+    # A aba lida no pool fica no cache para o próximo lote
+    assert importacao.cache_extratos.obter(chave_importacao(digest_arquivo(a), "Chamadas")) is not None
+    assert len({t["lote"] for t in tarefa.resultado()}) == 1
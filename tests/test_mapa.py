@@ -0,0 +1,174 @@
+import pytest
+
+from streamlit.testing.v1 import AppTest
+
+import codec
+import encurtador
+import estado
+import exportacao
+
+from banco import conectar
+from conftest import SCRIPT_MAPA
+from eventos import agregar_torres, total_eventos
+from importacao import TarefaImportacao
+from tabela_pontos import normalizar_pontos
+
+
+def abrir_mapa():
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.run()
+    assert not app.exception, app.exception
+    return app
+
+
+def test_botao_importar_abre_o_dialogo():
+    app = abrir_mapa()
+    next(b for b in app.button if b.label == "Importar Extrato 📤").click().run()
+    assert not app.exception, app.exception
+    assert app.radio(key="modo_importacao").options == ["Uma aba", "Lote (vários arquivos ou ZIP)"]
+
+
+@pytest.fixture
+def banco_isolado(monkeypatch, banco):
+    """O app grava em um pontos.db temporário, não no do repositório"""
+    monkeypatch.setattr(estado, "conectar", lambda caminho=None: conectar(banco))
+    monkeypatch.setattr(estado, "_esquema_pronto", set())
+
+
+def _torre(nome):
+    return {"lat": -3.74, "lng": -38.53, "nome": nome, "visivel": True, "tipo": "torre",
+            "margem": 120, "azimute": 240, "distancia": 1500}
+
+
+def test_reimportar_uma_aba_nao_repete_eventos(banco_isolado):
+    tarefa = TarefaImportacao("chave", None, "Chamadas")
+    tarefa.torres = agregar_torres([_torre("10/01/2024 - 09:00:00"), _torre("11/01/2024 - 10:30:00")])
+    tarefa.status = "concluida"
+
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.session_state.pontos = normalizar_pontos(tarefa.resultado())
+    app.session_state.importacao = tarefa
+    app.run()
+    assert not app.exception, app.exception
+    assert total_eventos(app.session_state.pontos) == 2
+
+
+def test_reimportar_junta_os_eventos_no_setor_existente(banco_isolado):
+    tarefa = TarefaImportacao("chave", None, "Chamadas")
+    tarefa.torres = agregar_torres([_torre("10/01/2024 - 11:00:00"), _torre("11/01/2024 - 09:00:00")])
+    tarefa.status = "concluida"
+
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.session_state.pontos = normalizar_pontos(
+        agregar_torres([_torre("10/01/2024 - 10:00:00"), _torre("10/01/2024 - 11:00:00")])
+    )
+    id_existente = app.session_state.pontos[0]["id"]
+    app.session_state.importacao = tarefa
+    app.run()
+    assert not app.exception, app.exception
+
+    (torre,) = app.session_state.pontos
+    assert torre["id"] == id_existente
+    assert torre["eventos"] == ["10/01/2024 - 10:00:00", "10/01/2024 - 11:00:00", "11/01/2024 - 09:00:00"]
+    # Gravado de uma vez: o mapa salvo tem o mesmo registro único
+    (salva,) = estado.carregar_mapa(app.session_state.map_id)[0]
+    assert salva["eventos"] == torre["eventos"]
+
+    # O diálogo mostra o resumo da importação concluída
+    next(b for b in app.button if b.label == "Importar Extrato 📤").click().run()
+    assert not app.exception, app.exception
+    assert [c.value for c in app.caption if "adicionados" in c.value] == [
+        "1 setores (1 eventos) adicionados, 1 eventos repetidos ignorados"
+    ]
+
+
+@pytest.mark.parametrize("pronto", [True, False])
+def test_compartilhar_mostra_o_link_curto(monkeypatch, banco_isolado, pronto):
+    local = encurtador.EncurtadorLocal()
+    servico = encurtador.ServicoEncurtamento(local)
+    if not pronto:
+        # Encurtador lento: o diálogo abre com o link ainda pendente
+        local.atraso = 2
+    monkeypatch.setattr(encurtador, "servico_encurtamento", servico)
+
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.session_state.pontos = normalizar_pontos([_torre("10/01/2024 - 09:00:00")])
+    app.run()
+    if pronto:
+        # Link já encurtado antes (ex.: o diálogo foi aberto de novo)
+        map_id = estado.salvar_mapa(app.session_state.pontos, compartilhado=True)[0]
+        url = f"http://localhost:8503?map={map_id}"
+        app.session_state.versao_mapa = 0
+        app.session_state.mapa_compartilhado = (0, map_id)
+        servico.cache.guardar(url, local.encurtar(url))
+    next(b for b in app.button if b.label == "Compartilhar 🔗").click().run()
+    assert not app.exception, app.exception
+
+    codigos = [c.value for c in app.code]
+    if pronto:
+        assert any(c.startswith("http://curto.local/") for c in codigos)
+        assert not any("Encurtando" in c.value for c in app.caption)
+    else:
+        assert any("Encurtando" in c.value for c in app.caption)
+
+
+def test_link_autocontido_codificado_uma_vez_por_versao(monkeypatch, banco_isolado):
+    chamadas = []
+    original = codec.encode_data_compacto
+    monkeypatch.setattr(codec, "encode_data_compacto", lambda data: chamadas.append(1) or original(data))
+    monkeypatch.setattr(encurtador, "servico_encurtamento", encurtador.ServicoEncurtamento(encurtador.EncurtadorLocal()))
+
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.session_state.pontos = normalizar_pontos([_torre("10/01/2024 - 09:00:00")])
+    app.run()
+    for _ in range(2):
+        next(b for b in app.button if b.label == "Compartilhar 🔗").click().run()
+        assert not app.exception, app.exception
+    assert len(chamadas) == 1
+    assert any("?data=" in c.value for c in app.code)
+
+
+@pytest.mark.parametrize("origem", ["data", "map"])
+def test_exportacao_grande_indica_a_linha_de_comando(monkeypatch, banco_isolado, origem):
+    def muito_grande(*args, **kwargs):
+        raise exportacao.ExportacaoMuitoGrande(0)
+    monkeypatch.setattr(exportacao, "gravar_exportacao", muito_grande)
+
+    pontos = [_torre("10/01/2024 - 09:00:00"), dict(_torre("11/01/2024 - 09:00:00"), visivel=False, azimute=0)]
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    if origem == "data":
+        app.query_params["data"] = codec.encode_data({"pontos": pontos})
+    else:
+        compartilhado = estado.salvar_mapa(pontos, compartilhado=True)[0]
+        app.query_params["map"] = compartilhado
+    app.run()
+    assert not app.exception, app.exception
+    assert "map_id" not in app.session_state
+
+    next(b for b in app.button if b.label == "Exportar 📥").click().run()
+    # O AppTest não reexecuta só o diálogo: tudo é marcado antes de uma única execução
+    next(b for b in app.button if b.label == "Exportar 📥").click()
+    next(c for c in app.checkbox if c.label == "Somente pontos visíveis").check()
+    next(b for b in app.button if b.label == "Gerar arquivo").click().run()
+    assert not app.exception, app.exception
+
+    (comando,) = [c.value for c in app.code if c.value.startswith("python exportacao.py")]
+    map_id = comando.split()[2]
+    assert comando.endswith("--somente-visiveis")
+    if origem == "map":
+        assert map_id == compartilhado
+    # O id existe no banco e tem os pontos da sessão
+    assert len(estado.carregar_mapa(map_id)[0]) == 2
+
+
+def test_rerun_por_st_rerun_tambem_e_medido(banco_isolado):
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.session_state.pontos = normalizar_pontos([_torre("10/01/2024 - 09:00:00")])
+    app.run()
+    # O botão de visibilidade grava a alteração e chama st.rerun()
+    app.button(key="visibility_0").click().run()
+    assert not app.exception, app.exception
+
+    historico = list(app.session_state.historico_desempenho)
+    assert [e.valores.get("fim") for e in historico] == [None, "st.rerun", None]
+    assert all(e.total_ms is not None for e in historico)
@@ -0,0 +1,100 @@
+import re
+
+import pytest
+
+from selecao import aplicar_acao, selecionar_indices
+from tabela_pontos import ColunasPontos, normalizar_pontos
+
+
+def pontos_exemplo():
+    return normalizar_pontos([
+        {"id": "a", "lat": -3.70, "lng": -38.50, "nome": "Casa", "visivel": True, "tipo": "ponto"},
+        {"id": "b", "lat": -3.74, "lng": -38.53, "nome": "10/01/2024 - 09:00:00", "visivel": True,
+         "tipo": "torre", "margem": 120, "azimute": 240, "distancia": 1500},
+        {"id": "c", "lat": -3.80, "lng": -38.60, "nome": "Raio da casa", "visivel": False,
+         "tipo": "circulo", "raio": 500},
+        {"id": "d", "lat": -3.90, "lng": -38.70, "nome": "11/01/2024 - 10:30:00", "visivel": False,
+         "tipo": "torre", "margem": 60, "azimute": 0, "distancia": 800},
+        {"id": "e", "lat": -3.72, "lng": -38.52, "nome": "CASA 2", "visivel": True, "tipo": "ponto"},
+    ])
+
+
+# Com e sem as colunas já calculadas: o resultado tem de ser o mesmo
+@pytest.fixture(params=[False, True], ids=["sem_colunas", "com_colunas"])
+def selecionar(request):
+    def selecionar(pontos, **criterios):
+        colunas = ColunasPontos(pontos) if request.param else None
+        return selecionar_indices(pontos, colunas=colunas, **criterios)
+    return selecionar
+
+
+# ===============================
+# Seleção
+# ===============================
+def test_sem_criterios_seleciona_todos(selecionar):
+    assert selecionar(pontos_exemplo()) == [0, 1, 2, 3, 4]
+
+
+def test_restrita_a_lista_filtrada(selecionar):
+    pontos = pontos_exemplo()
+    assert selecionar(pontos, indices=[4, 1, 3]) == [1, 3, 4]
+    assert selecionar(pontos, indices=[]) == []
+    assert selecionar(pontos, indices=[4, 1, 3], tipos={"torre"}) == [1, 3]
+
+
+def test_por_tipo(selecionar):
+    pontos = pontos_exemplo()
+    assert selecionar(pontos, tipos={"torre"}) == [1, 3]
+    assert selecionar(pontos, tipos={"ponto", "circulo"}) == [0, 2, 4]
+    assert selecionar(pontos, tipos={"outro"}) == []
+
+
+def test_por_padrao_no_nome(selecionar):
+    pontos = pontos_exemplo()
+    # Sem diferenciar maiúsculas, em qualquer parte do nome
+    assert selecionar(pontos, padrao="casa") == [0, 2, 4]
+    assert selecionar(pontos, padrao=r"^\d{2}/01/2024") == [1, 3]
+    assert selecionar(pontos, padrao="casa", tipos={"ponto"}, indices=[0, 2]) == [0]
+
+
+def test_padrao_invalido():
+    with pytest.raises(re.error):
+        selecionar_indices(pontos_exemplo(), padrao="(")
+
+
+def test_por_retangulo(selecionar):
+    pontos = pontos_exemplo()
+    assert selecionar(pontos, limites=(-3.75, -3.70, -38.55, -38.50)) == [0, 1, 4]
+    # As bordas entram
+    assert selecionar(pontos, limites=(-3.80, -3.80, -38.60, -38.60)) == [2]
+    assert selecionar(pontos, limites=(-3.75, -3.70, -38.55, -38.50), padrao="casa") == [0, 4]
+    assert selecionar(pontos, limites=(0, 1, 0, 1)) == []
+
+
+# ===============================
+# Ações
+# ===============================
+def test_mostrar_e_ocultar_alteram_so_os_indices():
+    pontos = pontos_exemplo()
+    resultado = aplicar_acao(pontos, [2, 3], "mostrar")
+    assert resultado is pontos
+    assert [p["visivel"] for p in resultado] == [True, True, True, True, True]
+
+    resultado = aplicar_acao(pontos, [0, 4], "ocultar")
+    assert [p["visivel"] for p in resultado] == [False, True, True, True, False]
+
+
+def test_excluir_devolve_lista_nova():
+    pontos = pontos_exemplo()
+    resultado = aplicar_acao(pontos, [4, 1, 1], "excluir")
+    assert [p["id"] for p in resultado] == ["a", "c", "d"]
+    assert len(pontos) == 5
+    assert [p["id"] for p in aplicar_acao(pontos, [], "excluir")] == ["a", "b", "c", "d", "e"]
+
+
+def test_acao_sobre_a_selecao(selecionar):
+    pontos = pontos_exemplo()
+    torres = selecionar(pontos, tipos={"torre"})
+    pontos = aplicar_acao(pontos, torres, "excluir")
+    assert selecionar(pontos, tipos={"torre"}) == []
+    assert [p["id"] for p in pontos] == ["a", "c", "e"]
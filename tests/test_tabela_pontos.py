@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from conftest import SCRIPT_MAPA
+from tabela_pontos import ColunasPontos, Ponto, normalizar_pontos
+
+
+# ===============================
+# Campos em branco
+# ===============================
+def test_parametros_em_branco_ficam_ausentes():
+    torre = Ponto({"lat": -3.7, "lng": -38.5, "nome": "T", "tipo": "torre", "margem": "60", "azimute": "", "distancia": None})
+    assert torre.get("azimute") is None
+    assert torre.get("distancia") is None
+    assert "azimute" not in torre
+    assert torre["margem"] == 60
+    with pytest.raises(KeyError):
+        torre["azimute"]
+
+
+def test_parametro_invalido_so_falha_no_modo_estrito():
+    assert Ponto({"lat": 0, "lng": 0, "tipo": "circulo", "raio": "abc"}).get("raio") is None
+    with pytest.raises(ValueError):
+        Ponto({"lat": 0, "lng": 0, "tipo": "circulo", "raio": "abc"}, estrito=True)
+
+
+def test_colunas_usam_nan_para_parametros_ausentes():
+    colunas = ColunasPontos([Ponto({"lat": 1, "lng": 2, "tipo": "torre", "azimute": ""})])
+    assert math.isnan(colunas.azimute[0])
+
+
+# ===============================
+# Normalização
+# ===============================
+def test_normalizar_descarta_coordenadas_invalidas():
+    pontos = normalizar_pontos([
+        {"lat": "-3,7", "lng": "-38.5", "nome": "ok"},
+        {"lat": "abc", "lng": 0, "nome": "sem latitude"},
+        {"lat": 0, "lng": 500, "nome": "fora do intervalo"},
+        {"lat": None, "lng": None, "nome": "vazio"},
+    ])
+    assert [p["nome"] for p in pontos] == ["ok"]
+    assert pontos[0]["lat"] == -3.7
+
+
+def test_normalizar_mantem_pontos_existentes():
+    ponto = Ponto({"lat": 1, "lng": 2})
+    assert normalizar_pontos([ponto])[0] is ponto
+
+
+# ===============================
+# Edição pela tela
+# ===============================
+@pytest.mark.parametrize("dados", [
+    {"nome": "Antena", "tipo": "torre", "margem": "", "azimute": "", "distancia": ""},
+    {"nome": "Círculo", "tipo": "circulo", "raio": ""},
+])
+def test_editar_ponto_com_parametros_em_branco(dados):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(SCRIPT_MAPA, default_timeout=60)
+    app.session_state.pontos = normalizar_pontos([{"lat": -3.7, "lng": -38.5, **dados}])
+    app.run()
+    assert not app.exception, app.exception
+    app.button(key="edit_0").click().run()
+    assert not app.exception, app.exception
+    assert app.text_input(key="modal_nome").value == dados["nome"]